@@ -1,60 +1,108 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .db import estimate_row_count
 from .models import User, Coin, Vote, Community, Post, Comment, Note, Rating, Badge, UserBadge, Notification, Analytics
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Avoids COUNT(*) over large tables: unfiltered changelists use the
+    database's row estimate, filtered ones count at most ``exact_limit``
+    rows.
+    """
+    exact_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.exact_limit:
+                return estimate
+        return queryset.order_by()[:self.exact_limit].count()
+
+
+# Changelists for tables that grow without bound: no full counts, related
+# objects joined in, FKs edited through autocomplete and search limited to
+# indexed columns (exact or prefix lookups)
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    date_hierarchy = 'created_at'
+
+
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'role')
-    search_fields = ('username', 'email')
+    search_fields = ('username__startswith', 'email__exact')
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'groups', 'role')
     ordering = ('username',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(Coin)
-class CoinAdmin(admin.ModelAdmin):
+class CoinAdmin(LargeTableAdmin):
     list_display = ('name', 'symbol', 'category', 'created_by', 'total_votes', 'created_at')
-    search_fields = ('name', 'symbol', 'category')
+    list_select_related = ('created_by',)
+    autocomplete_fields = ('created_by',)
+    search_fields = ('name__startswith', 'symbol__exact')
     list_filter = ('category', 'created_at')
     ordering = ('name',)
 
 @admin.register(Vote)
-class VoteAdmin(admin.ModelAdmin):
+class VoteAdmin(LargeTableAdmin):
     list_display = ('user', 'coin', 'vote_type', 'created_at')
-    search_fields = ('user__username', 'coin__name', 'vote_type')
+    list_select_related = ('user', 'coin')
+    autocomplete_fields = ('user', 'coin')
+    search_fields = ('user__username__exact', 'coin__symbol__exact')
     list_filter = ('vote_type', 'created_at')
     ordering = ('-created_at',)
 
 @admin.register(Community)
 class CommunityAdmin(admin.ModelAdmin):
     list_display = ('name', 'description', 'created_by', 'created_at')
-    search_fields = ('name', 'description', 'created_by__username')
+    list_select_related = ('created_by',)
+    autocomplete_fields = ('created_by', 'members')
+    search_fields = ('name', 'description', 'created_by__username__exact')
     list_filter = ('created_at',)
     ordering = ('name',)
+    date_hierarchy = 'created_at'
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = ('title', 'author', 'created_at', 'updated_at')
-    search_fields = ('title', 'content', 'author__username')
+    list_select_related = ('author',)
+    autocomplete_fields = ('author',)
+    search_fields = ('title__startswith', 'author__username__exact')
     list_filter = ('created_at', 'updated_at')
     ordering = ('-created_at',)
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('content', 'author', 'post', 'created_at')
-    search_fields = ('content', 'author__username', 'post__title')
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('author', 'post')
+    search_fields = ('author__username__exact', 'post__title__startswith')
     list_filter = ('created_at',)
     ordering = ('-created_at',)
 
 @admin.register(Note)
-class NoteAdmin(admin.ModelAdmin):
+class NoteAdmin(LargeTableAdmin):
     list_display = ('title', 'user', 'created_at')
-    search_fields = ('title', 'content', 'user__username')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+    search_fields = ('user__username__exact',)
     list_filter = ('created_at',)
     ordering = ('-created_at',)
 
 @admin.register(Rating)
-class RatingAdmin(admin.ModelAdmin):
+class RatingAdmin(LargeTableAdmin):
     list_display = ('user', 'rated_user', 'rating', 'comment', 'created_at')
-    search_fields = ('user__username', 'rated_user__username', 'rating', 'comment')
+    list_select_related = ('user', 'rated_user')
+    autocomplete_fields = ('user', 'rated_user')
+    search_fields = ('user__username__exact', 'rated_user__username__exact')
     list_filter = ('rating', 'created_at')
     ordering = ('-created_at',)
 
@@ -66,22 +114,28 @@ class BadgeAdmin(admin.ModelAdmin):
     ordering = ('name',)
 
 @admin.register(UserBadge)
-class UserBadgeAdmin(admin.ModelAdmin):
+class UserBadgeAdmin(LargeTableAdmin):
     list_display = ('user', 'badge', 'created_at')
-    search_fields = ('user__username', 'badge__name')
+    list_select_related = ('user', 'badge')
+    autocomplete_fields = ('user', 'badge')
+    search_fields = ('user__username__exact', 'badge__name__exact')
     list_filter = ('created_at',)
     ordering = ('-created_at',)
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
+class NotificationAdmin(LargeTableAdmin):
     list_display = ('user', 'content', 'created_at')
-    search_fields = ('user__username', 'content')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+    search_fields = ('user__username__exact',)
     list_filter = ('created_at',)
     ordering = ('-created_at',)
 
 @admin.register(Analytics)
-class AnalyticsAdmin(admin.ModelAdmin):
+class AnalyticsAdmin(LargeTableAdmin):
     list_display = ('coin', 'views', 'upvotes', 'downvotes', 'total_votes', 'created_at')
-    search_fields = ('coin__name', 'views', 'upvotes', 'downvotes', 'total_votes')
+    list_select_related = ('coin',)
+    autocomplete_fields = ('coin',)
+    search_fields = ('coin__symbol__exact', 'coin__name__startswith')
     list_filter = ('created_at',)
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
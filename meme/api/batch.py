@@ -0,0 +1,187 @@
+# batch.py
+"""
+Several API calls in one request (/api/batch/).
+
+The batch is authenticated once: every sub-request is dispatched straight
+to its view with the batch's user forced on it, skipping the middleware
+stack and JWT decoding. Each view still runs its own permission checks
+and throttles, so every sub-request is counted against the user's rate
+limits as if it had been sent alone.
+
+Sub-requests run in order. Consecutive reads (GET, HEAD) do not depend on
+each other and run concurrently on a pool of BATCH_WORKERS threads; a
+write waits for the reads before it and the requests after it wait for
+the write. Once a write has succeeded, the rest of the batch reads from
+the primary, and the client is pinned to it afterwards; a batch of reads
+leaves replica reads on.
+"""
+import contextvars
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from meme.middleware import rate_limit_headers
+from meme.routers import end_replica_reads, start_replica_reads
+
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"}
+READ_METHODS = {"GET", "HEAD"}
+
+# Headers a sub-request may not set: authentication and the client address
+# are the batch's
+FORBIDDEN_HEADERS = {
+    "authorization", "cookie", "host", "content-length", "content-type",
+    "x-forwarded-for", "x-forwarded-host", "x-forwarded-proto", "x-real-ip", "forwarded",
+}
+
+# Response headers copied into each sub-response
+RESPONSE_HEADERS = ("ETag", "Location", "Retry-After")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(settings.BATCH_WORKERS, thread_name_prefix="batch")
+    return _executor
+
+
+def parse(data):
+    """
+    Validate the ``requests`` list of a batch body into (method, path,
+    body, headers) tuples.
+    """
+    requests = data.get("requests") if isinstance(data, dict) else None
+    if not isinstance(requests, list) or not requests:
+        raise ValidationError({"requests": "A non-empty list of requests is required."})
+    if len(requests) > settings.BATCH_MAX_REQUESTS:
+        raise ValidationError({"requests": f"At most {settings.BATCH_MAX_REQUESTS} requests per batch."})
+    parsed = []
+    for index, item in enumerate(requests):
+        if not isinstance(item, dict):
+            raise ValidationError({"requests": {index: "Must be an object."}})
+        method = str(item.get("method", "GET")).upper()
+        path = item.get("path")
+        headers = item.get("headers") or {}
+        if method not in METHODS:
+            raise ValidationError({"requests": {index: f"Unsupported method {method}."}})
+        if not isinstance(path, str) or not path.startswith("/api/"):
+            raise ValidationError({"requests": {index: "path must start with /api/."}})
+        if not isinstance(headers, dict) or any(name.lower() in FORBIDDEN_HEADERS for name in headers):
+            raise ValidationError({"requests": {index: "headers must be an object without authentication or forwarding headers."}})
+        parsed.append((method, path, item.get("body"), headers))
+    return parsed
+
+
+def build_request(parent, method, path, body, headers):
+    """
+    A request for ``path`` carrying the batch's user, client address and
+    cookies, as if the client had sent it on its own.
+    """
+    url = urlsplit(path)
+    content = b"" if body is None else json.dumps(body).encode()
+    environ = {
+        name: value for name, value in parent.META.items()
+        if not name.startswith(("HTTP_", "CONTENT_", "wsgi.", "QUERY_STRING"))
+    }
+    environ.update({
+        "REQUEST_METHOD": method,
+        "PATH_INFO": url.path,
+        "SCRIPT_NAME": "",
+        "QUERY_STRING": url.query,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(content)),
+        "HTTP_ACCEPT": "application/json",
+        "wsgi.input": io.BytesIO(content),
+        "wsgi.url_scheme": parent.scheme,
+    })
+    for name in ("HTTP_HOST", "HTTP_USER_AGENT", "HTTP_COOKIE", "HTTP_X_FORWARDED_FOR"):
+        if name in parent.META:
+            environ[name] = parent.META[name]
+    for name, value in headers.items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = str(value)
+    request = WSGIRequest(environ)
+    request._force_auth_user = parent.user
+    request._force_auth_token = getattr(parent, "auth", None)
+    return request
+
+
+def dispatch(request):
+    """
+    Run ``request`` through its view; return (status, headers, body).
+    """
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return 404, {}, {"detail": "Not found."}
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None or not getattr(view_class, "batchable", True):
+        return 400, {}, {"detail": "This endpoint cannot be batched."}
+    request.resolver_match = match
+    start_replica_reads(request, match.func)
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+    finally:
+        end_replica_reads(request)
+    headers = {name: response[name] for name in RESPONSE_HEADERS if name in response}
+    result = getattr(request, "ratelimit", None)
+    if result is not None:
+        headers = {**rate_limit_headers(result), **headers}
+    if not isinstance(response, Response):
+        return response.status_code, headers, None
+    return response.status_code, headers, response.data
+
+
+def _dispatch_in_worker(context, request):
+    close_old_connections()
+    try:
+        return context.run(dispatch, request)
+    finally:
+        close_old_connections()
+
+
+def wrote(request, result):
+    return request.method not in READ_METHODS and result[0] < 400
+
+
+def run(parent, requests):
+    """
+    Dispatch the sub-requests of ``requests``; return (results, requests
+    built) in order.
+    """
+    built = [build_request(parent, *request) for request in requests]
+    results = [None] * len(built)
+    workers = settings.BATCH_WORKERS
+    index = 0
+    pinned = False
+    while index < len(built):
+        end = index + 1
+        while end < len(built) and built[index].method in READ_METHODS and built[end].method in READ_METHODS:
+            end += 1
+        if pinned:
+            # Read the batch's own writes
+            for request in built[index:end]:
+                request.pin_primary = True
+        if workers and end - index > 1:
+            futures = [
+                get_executor().submit(_dispatch_in_worker, contextvars.copy_context(), request)
+                for request in built[index:end]
+            ]
+            results[index:end] = [future.result() for future in futures]
+        else:
+            results[index:end] = [dispatch(request) for request in built[index:end]]
+        pinned = pinned or any(wrote(request, result) for request, result in zip(built[index:end], results[index:end]))
+        index = end
+    return results, built
@@ -0,0 +1,106 @@
+# fastpath.py
+"""
+Read-only fast path for list endpoints.
+
+Instead of building a model instance and running every serializer field
+per row, rows are fetched with ``values_list()`` and turned into dicts by a
+function generated once per serializer and field set. Fields whose
+representation is the raw column value are copied straight from the tuple;
+the others reuse the serializer field's own ``to_representation``, so the
+output is identical to the regular serializer.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.fields.files import FieldFile
+from rest_framework import serializers
+
+from meme import metrics
+
+# Fields whose to_representation() returns the column value unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+)
+
+_templates = {}
+
+
+def _converter(field, model_field):
+    """
+    Return None when ``field`` can copy the column value as is, a callable
+    converting the column value otherwise, or raise TypeError when the field
+    cannot be rendered from a single column.
+    """
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return None
+    if isinstance(field, serializers.ChoiceField):
+        if all(isinstance(key, str) for key in field.choices):
+            return None
+        return field.to_representation
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        return None
+    if isinstance(field, serializers.FileField):
+        to_representation = field.to_representation
+        return lambda name: to_representation(FieldFile(None, model_field, name))
+    if isinstance(field, (serializers.ManyRelatedField, serializers.SerializerMethodField, serializers.Serializer)):
+        raise TypeError(field)
+    return field.to_representation
+
+
+def _template(names, converted):
+    """
+    Compile (once per shape) a factory producing the row function.
+    """
+    key = (tuple(names), tuple(converted))
+    if key not in _templates:
+        items = []
+        for index, (name, convert) in enumerate(zip(names, converted)):
+            value = f"row[{index}]"
+            if convert:
+                value = f"(None if {value} is None else c[{index}]({value}))"
+            items.append(f"{name!r}: {value}")
+        source = f"def make(c):\n    def render_row(row):\n        return {{{', '.join(items)}}}\n    return render_row\n"
+        namespace = {}
+        exec(compile(source, f"<fastpath {','.join(names)}>", "exec"), namespace)
+        _templates[key] = namespace["make"]
+    return _templates[key]
+
+
+class RowRenderer:
+    """
+    Renders ``values_list(*columns)`` tuples the way ``serializer`` renders
+    model instances.
+    """
+
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        names, columns, converters = [], [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == "*" or "." in field.source:
+                raise TypeError(field)
+            model_field = model._meta.get_field(field.source)
+            if not model_field.concrete or model_field.many_to_many:
+                raise TypeError(field)
+            names.append(name)
+            columns.append(model_field.name)
+            converters.append(_converter(field, model_field))
+        self.columns = columns
+        self.render_row = _template(names, [c is not None for c in converters])(converters)
+
+    def __call__(self, rows):
+        render_row = self.render_row
+        with metrics.timer():
+            return [render_row(row) for row in rows]
+
+
+def get_row_renderer(serializer):
+    """
+    Return a RowRenderer for ``serializer``, or None when one of its fields
+    needs the full serializer.
+    """
+    try:
+        return RowRenderer(serializer)
+    except (TypeError, FieldDoesNotExist):
+        return None
@@ -0,0 +1,35 @@
+# fields.py
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+
+from meme.images import thumbnail_name, validate_image
+
+
+def parse_field_list(value):
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+class ThumbnailImageField(serializers.ImageField):
+    """
+    Image field that validates uploads through the image pipeline and
+    renders the thumbnail picked by the ``?image_size=`` query parameter
+    (small, medium, large); the full image is returned by default.
+    """
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        try:
+            validate_image(file)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
+        return file
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get("request")
+        size = request.query_params.get("image_size") if request is not None else None
+        url = value.storage.url(thumbnail_name(value.name, size))
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
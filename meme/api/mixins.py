@@ -0,0 +1,207 @@
+# mixins.py
+import hashlib
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from meme.models import Vote, VoteArchive
+from meme.votes import user_votes
+from meme.versions import get_versions
+from . import expand
+from .fastpath import get_row_renderer
+from .fields import parse_field_list
+from .permissions import get_policy
+
+
+def serializer_columns(model, fields):
+    """
+    Return the model columns needed to render ``fields``, or None when a
+    field does not map onto a single column of ``model``.
+    """
+    columns = {model._meta.pk.name}
+    for field in fields.values():
+        if field.source == "*" or "." in field.source:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if model_field.concrete and not model_field.many_to_many:
+            columns.add(model_field.name)
+    return columns
+
+
+def response_rows(data):
+    """
+    The rendered objects of a list (paginated or not) or retrieve response.
+    """
+    rows = data.get("results") if isinstance(data, dict) and "results" in data else data
+    return rows if isinstance(rows, list) else [rows]
+
+
+class OwnedQuerysetMixin:
+    """
+    Limits every action to the requesting user's own rows by filtering the
+    queryset on ``owner_field``, so private lists never load other users'
+    rows and other users' objects answer 404.
+    """
+    owner_field = "user"
+
+    def get_queryset(self):
+        return get_policy(self.request).scope(super().get_queryset(), self.owner_field)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Pushes ?fields= / ?exclude= down into the queryset with .only(), so
+    columns the serializer will not render are never fetched.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        params = self.request.query_params
+        if self.request.method in SAFE_METHODS and ("fields" in params or "exclude" in params):
+            columns = serializer_columns(queryset.model, self.get_serializer().fields)
+            if columns is not None:
+                queryset = queryset.only(*columns)
+        return queryset
+
+
+class ExpandViewMixin:
+    """
+    Applies ?expand= (see expand.py) to list and retrieve responses. The
+    parameter is checked before the handler runs, and the expanded tables
+    join the list ETag. Goes before ConditionalListMixin in the bases.
+    """
+    expand_tree = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in ("list", "retrieve") and request.query_params.get("expand"):
+            self.expand_tree = expand.parse(request.query_params["expand"], self.get_serializer_class())
+
+    def get_etag_models(self):
+        models = super().get_etag_models()
+        if self.expand_tree:
+            models = [*models, *expand.models_of(self.expand_tree, self.get_serializer_class())]
+        return models
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.expand_tree and response.status_code == 200 and response.data is not None:
+            expand.expand(response_rows(response.data), self.get_serializer_class(), self.expand_tree, request)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class MyVoteMixin:
+    """
+    Adds the requesting user's vote on each coin to list and retrieve
+    responses as ``my_vote`` ("upvote", "downvote" or None). The votes of a
+    page are looked up in one query after rendering, so the fast list path
+    stays in use. Goes before ConditionalListMixin in the bases.
+    """
+
+    def get_etag_models(self):
+        return [*super().get_etag_models(), Vote, VoteArchive]
+
+    def wants_my_vote(self, request):
+        fields = parse_field_list(request.query_params.get("fields"))
+        exclude = parse_field_list(request.query_params.get("exclude"))
+        return (not fields or "my_vote" in fields) and "my_vote" not in exclude
+
+    def hides_id(self, request):
+        """
+        Whether ?fields= / ?exclude= leave out the ids the votes are looked
+        up by; they are then rendered anyway and dropped after the lookup.
+        """
+        if request is None or request.method not in SAFE_METHODS or not self.wants_my_vote(request):
+            return False
+        fields = parse_field_list(request.query_params.get("fields"))
+        exclude = parse_field_list(request.query_params.get("exclude"))
+        return (bool(fields) and "id" not in fields) or "id" in exclude
+
+    def get_serializer(self, *args, **kwargs):
+        if self.hides_id(self.request):
+            kwargs["keep"] = ("id",)
+        return super().get_serializer(*args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (self.action in ("list", "retrieve") and response.status_code == 200 and response.data is not None
+                and self.wants_my_vote(request)):
+            rows = [row for row in response_rows(response.data) if "id" in row]
+            user_id = get_policy(request).user_id
+            votes = user_votes(user_id, [row["id"] for row in rows]) if user_id and rows else {}
+            hide_id = self.hides_id(request)
+            for row in rows:
+                row["my_vote"] = votes.get(row["id"])
+                if hide_id:
+                    del row["id"]
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class FastListMixin:
+    """
+    Serves list requests from ``values_list()`` rows through a RowRenderer
+    (see fastpath.py), skipping model instances and per-field serializer
+    calls. Falls back to the regular list when the serializer has fields
+    the fast path cannot render.
+    """
+
+    def list(self, request, *args, **kwargs):
+        render_rows = get_row_renderer(self.get_serializer())
+        if render_rows is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*render_rows.columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(render_rows(page))
+        return Response(render_rows(list(queryset)))
+
+
+def etag_matches(header, etag):
+    """
+    Weak comparison of an If-None-Match header against ``etag``.
+    """
+    if not header:
+        return False
+    strip = lambda tag: tag[2:] if tag.startswith("W/") else tag
+    candidates = {strip(tag) for tag in parse_etags(header)}
+    return "*" in candidates or strip(etag) in candidates
+
+
+class ConditionalListMixin:
+    """
+    Tags list responses with an ETag derived from the version stamps of the
+    tables in ``etag_models`` (the queryset's model by default), so a
+    matching If-None-Match is answered with 304 before the queryset is
+    evaluated or serialized.
+    """
+    etag_models = None
+
+    def get_etag_models(self):
+        return self.etag_models or [self.get_queryset().model]
+
+    def get_list_etag(self, request):
+        key = [
+            type(self).__name__,
+            request.get_full_path(),
+            request.user.pk,
+            request.accepted_media_type,
+            get_versions(self.get_etag_models()),
+        ]
+        return '"%s"' % hashlib.md5(json.dumps(key).encode()).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_list_etag(request)
+        if etag_matches(request.META.get("HTTP_IF_NONE_MATCH"), etag):
+            response = Response(status=304)
+        else:
+            response = super().list(request, *args, **kwargs)
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Accept", "Authorization"])
+        return response
@@ -1,23 +1,106 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+# Capabilities granted by each role
+ROLE_CAPABILITIES = {
+    "admin": frozenset({"admin", "moderate"}),
+    "moderator": frozenset({"moderate"}),
+    "user": frozenset({"regular"}),
+}
+
+# Fields naming an object's owner, tried in order when a view sets no owner_field
+OWNER_FIELDS = ("created_by", "author", "user")
+
+
+class Policy:
+    """
+    The requesting user's id, role and capabilities, resolved once per
+    request (see get_policy) so permission checks never touch the user
+    object or the database again.
+    """
+    __slots__ = ("user_id", "role", "capabilities")
+
+    def __init__(self, user):
+        if user is not None and user.is_authenticated:
+            self.user_id = user.pk
+            self.role = user.role
+        else:
+            self.user_id = None
+            self.role = None
+        self.capabilities = ROLE_CAPABILITIES.get(self.role, frozenset())
+
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+
+    def can(self, capability):
+        return capability in self.capabilities
+
+    def owns(self, obj, owner_field=None):
+        """
+        Compare the owner FK column of ``obj`` with the user's id, without
+        loading the related user.
+        """
+        if self.user_id is None:
+            return False
+        field = owner_field_of(type(obj), owner_field)
+        return field is not None and getattr(obj, field.attname) == self.user_id
+
+    def scope(self, queryset, owner_field=None):
+        """
+        Restrict ``queryset`` to rows owned by the user.
+        """
+        field = owner_field_of(queryset.model, owner_field)
+        if self.user_id is None or field is None:
+            return queryset.none()
+        return queryset.filter(**{field.attname: self.user_id})
+
+
+def owner_field_of(model, name=None):
+    """
+    The owner foreign key of ``model``: ``name`` if given, else the first of
+    OWNER_FIELDS the model has, or None.
+    """
+    for candidate in (name,) if name else OWNER_FIELDS:
+        try:
+            return model._meta.get_field(candidate)
+        except FieldDoesNotExist:
+            continue
+    return None
+
+
+def get_policy(request):
+    """
+    Return the Policy of ``request``, building it on first use. It is kept
+    on the underlying HttpRequest so every permission, view and serializer
+    handling the request shares it.
+    """
+    http_request = getattr(request, "_request", request)
+    policy = getattr(http_request, "_policy", None)
+    if policy is None or policy.user_id != getattr(request.user, "pk", None):
+        policy = http_request._policy = Policy(request.user)
+    return policy
+
+
 # IsAdminUser: Grants access only to Admin users
 class IsAdminUser(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == "admin"
+        return get_policy(request).can("admin")
 
 # IsModeratorOrAdmin: Grants access to Moderators or Admins
 class IsModeratorOrAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role in ["moderator", "admin"]
+        return get_policy(request).can("moderate")
 
-# IsOwnerOrReadOnly: Allows only the owner to modify; read-only for others
+# IsOwnerOrReadOnly: Allows only the owner to modify; read-only for others.
+# The owner is the view's owner_field, or the first of created_by/author/user.
 class IsOwnerOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in SAFE_METHODS:
             return True
-        return obj.created_by == request.user or obj.author == request.user
+        return get_policy(request).owns(obj, getattr(view, "owner_field", None))
 
 # IsRegularUser: Grants access to logged-in users with role "user"
 class IsRegularUser(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == "user"
+        return get_policy(request).can("regular")
@@ -0,0 +1,220 @@
+# ratelimit.py
+"""
+Shared storage for API rate limiting.
+
+Every backend keeps a sliding-window counter per key: the hit count of the
+current fixed window, the count of the previous one and the index of the
+current window. The previous count is weighted by how much of it still
+overlaps the sliding window, so a check costs O(1) regardless of the rate,
+and each check is a single round-trip to the backend.
+"""
+import math
+import sqlite3
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.utils.module_loading import import_string
+
+RateLimitResult = namedtuple("RateLimitResult", ["allowed", "limit", "remaining", "reset", "retry_after"])
+
+
+def build_result(limit, duration, now, curr, prev, allowed):
+    """
+    Turn the stored counters for the current window into a RateLimitResult.
+    """
+    elapsed = now % duration
+    estimate = prev * (1 - elapsed / duration) + curr
+    remaining = max(0, math.floor(limit - estimate))
+    reset = duration - elapsed
+    retry_after = None if allowed else retry_delay(limit, duration, elapsed, curr, prev)
+    return RateLimitResult(bool(allowed), limit, remaining, reset, retry_after)
+
+
+def retry_delay(limit, duration, elapsed, curr, prev):
+    """
+    Seconds until one more request would fit in the sliding window.
+    """
+    excess = prev * (1 - elapsed / duration) + curr + 1 - limit
+    if excess <= 0:
+        return 0.0
+    if prev and curr + 1 <= limit:
+        # Waiting for the previous window to decay is enough
+        return min(duration - elapsed, duration * excess / prev)
+    # After the rollover the current count becomes the decaying one
+    return (duration - elapsed) + duration * max(0.0, 1 - (limit - 1) / max(curr, 1))
+
+
+class BaseRateLimitBackend:
+    """
+    Interface for rate limit storage. ``hit`` records one request against
+    ``key`` if it fits within ``limit`` requests per ``duration`` seconds.
+    """
+
+    def __init__(self, location=None, **options):
+        self.location = location
+        self.options = options
+
+    def hit(self, key, limit, duration, now):
+        raise NotImplementedError(".hit() must be overridden")
+
+    def reset(self):
+        raise NotImplementedError(".reset() must be overridden")
+
+
+class LocMemBackend(BaseRateLimitBackend):
+    """
+    Per-process storage. Only correct with a single worker; meant for tests
+    and local development.
+    """
+
+    def __init__(self, location=None, **options):
+        super().__init__(location, **options)
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, duration, now):
+        slot = int(now // duration)
+        frac = (now % duration) / duration
+        with self._lock:
+            old_slot, curr, prev = self._state.get(key, (None, 0, 0))
+            if old_slot == slot - 1:
+                curr, prev = 0, curr
+            elif old_slot != slot:
+                curr, prev = 0, 0
+            allowed = prev * (1 - frac) + curr + 1 <= limit
+            if allowed:
+                curr += 1
+            self._state[key] = (slot, curr, prev)
+        return build_result(limit, duration, now, curr, prev, allowed)
+
+    def reset(self):
+        with self._lock:
+            self._state.clear()
+
+
+class SQLiteBackend(BaseRateLimitBackend):
+    """
+    Storage in a SQLite file shared by every worker on the host. The window
+    rollover, the admission check and the increment all happen inside a
+    single UPSERT statement.
+    """
+    _PREV = "CASE slot WHEN :slot THEN prev WHEN :slot - 1 THEN curr ELSE 0 END"
+    _CURR = "CASE slot WHEN :slot THEN curr ELSE 0 END"
+    _FITS = f"({_PREV}) * (1 - :frac) + ({_CURR}) + 1 <= :limit"
+    HIT_SQL = f"""
+        INSERT INTO ratelimit (key, slot, curr, prev, allowed)
+        VALUES (:key, :slot, :first, 0, :first)
+        ON CONFLICT(key) DO UPDATE SET
+            slot = :slot,
+            prev = {_PREV},
+            curr = ({_CURR}) + ({_FITS}),
+            allowed = {_FITS}
+        RETURNING curr, prev, allowed
+    """
+
+    def __init__(self, location=None, **options):
+        super().__init__(location or ":memory:", **options)
+        self.timeout = options.get("timeout", 5)
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.location), timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ratelimit ("
+                "key TEXT PRIMARY KEY, slot INTEGER NOT NULL, curr INTEGER NOT NULL, "
+                "prev INTEGER NOT NULL, allowed INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self._local.connection = conn
+        return conn
+
+    def hit(self, key, limit, duration, now):
+        params = {
+            "key": key,
+            "slot": int(now // duration),
+            "frac": (now % duration) / duration,
+            "limit": limit,
+            "first": int(limit >= 1),
+        }
+        curr, prev, allowed = self.connection.execute(self.HIT_SQL, params).fetchone()
+        return build_result(limit, duration, now, curr, prev, allowed)
+
+    def reset(self):
+        self.connection.execute("DELETE FROM ratelimit")
+
+
+class RedisBackend(BaseRateLimitBackend):
+    """
+    Storage in Redis (or any server speaking its protocol), for deployments
+    spanning several hosts. The check runs as one server-side Lua script.
+    """
+    HIT_SCRIPT = """
+        local slot, frac, limit = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+        local state = redis.call('HMGET', KEYS[1], 'slot', 'curr', 'prev')
+        local old, curr, prev = tonumber(state[1]), 0, 0
+        if old == slot then
+            curr, prev = tonumber(state[2]), tonumber(state[3])
+        elseif old == slot - 1 then
+            prev = tonumber(state[2])
+        end
+        local allowed = 0
+        if prev * (1 - frac) + curr + 1 <= limit then
+            curr, allowed = curr + 1, 1
+        end
+        redis.call('HSET', KEYS[1], 'slot', slot, 'curr', curr, 'prev', prev)
+        redis.call('EXPIRE', KEYS[1], ARGV[4])
+        return {curr, prev, allowed}
+    """
+
+    def __init__(self, location=None, **options):
+        super().__init__(location, **options)
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisBackend requires the 'redis' package.")
+        self.client = redis.Redis.from_url(location or "redis://localhost:6379/0")
+        self.prefix = options.get("prefix", "ratelimit:")
+        self._hit = self.client.register_script(self.HIT_SCRIPT)
+
+    def hit(self, key, limit, duration, now):
+        args = [int(now // duration), (now % duration) / duration, limit, 2 * duration]
+        curr, prev, allowed = self._hit(keys=[self.prefix + key], args=args)
+        return build_result(limit, duration, now, int(curr), int(prev), allowed)
+
+    def reset(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    Return the backend configured by ``settings.RATELIMIT``.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = dict(getattr(settings, "RATELIMIT", {}))
+                backend_class = import_string(config.pop("BACKEND", "meme.api.ratelimit.LocMemBackend"))
+                _backend = backend_class(config.pop("LOCATION", None), **config.pop("OPTIONS", {}))
+    return _backend
+
+
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting == "RATELIMIT":
+        _backend = None
+
+
+setting_changed.connect(_reset_backend)
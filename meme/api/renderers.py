@@ -0,0 +1,139 @@
+# renderers.py
+import datetime
+import decimal
+
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed, producing
+    the same bytes as the stdlib path. Indented output (the browsable API)
+    and anything orjson cannot encode fall back to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same JavaScript-safe escaping as JSONRenderer
+        return ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+
+def to_columns(rows):
+    """
+    Turn a list of row dicts into a dict of column name -> list of values.
+    """
+    if not rows:
+        return {}
+    return {name: [row[name] for row in rows] for name in rows[0]}
+
+
+class CompactJSONRenderer(FastJSONRenderer):
+    """
+    Column-oriented JSON for large list pages, selected with
+    ?format=compact. Field names are sent once per page instead of once per
+    row; detail responses and errors render as plain JSON.
+    """
+    media_type = "application/vnd.memeplayers.compact+json"
+    format = "compact"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list):
+            data = to_columns(data)
+        elif isinstance(data, dict) and isinstance(data.get("results"), list):
+            data = {**data, "results": to_columns(data["results"])}
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+def _aware(value):
+    if timezone.is_naive(value):
+        return timezone.make_aware(value, datetime.timezone.utc)
+    return value
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack for bots and internal services, selected with
+    ``Accept: application/msgpack`` or ?format=msgpack (registered when
+    msgpack is installed). Serializers hand it datetimes unformatted (see
+    native_datetimes), which become MessagePack timestamps; decimals become
+    strings, as JSON renders them, and anything else the JSON encoder
+    knows (dates, UUIDs, lazy strings) is encoded the same way.
+    """
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+    native_datetimes = True
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, datetime.datetime):
+            return msgpack.Timestamp.from_datetime(_aware(value))
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        return JSONEncoder().default(value)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=self.default, datetime=False)
+
+
+class CBORRenderer(BaseRenderer):
+    """
+    CBOR (RFC 8949), selected with ``Accept: application/cbor`` or
+    ?format=cbor (registered when cbor2 is installed). Datetimes use CBOR's
+    epoch date/time tag; decimals are strings, as with MessagePack.
+    """
+    media_type = "application/cbor"
+    format = "cbor"
+    charset = None
+    render_style = "binary"
+    native_datetimes = True
+
+    @staticmethod
+    def default(encoder, value):
+        encoder.encode(JSONEncoder().default(value))
+
+    @staticmethod
+    def encode_decimal(encoder, value):
+        encoder.encode(str(value))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return cbor2.dumps(
+            data,
+            default=self.default,
+            encoders={decimal.Decimal: self.encode_decimal},
+            timezone=datetime.timezone.utc,
+            datetime_as_timestamp=True,
+        )
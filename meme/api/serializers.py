@@ -1,8 +1,57 @@
+from drf_spectacular.utils import extend_schema_serializer
 from rest_framework import serializers
-from meme.models import User, Coin, Vote, Community, Post, Comment, Note, Rating, Badge, UserBadge, Notification, Analytics
+from rest_framework.permissions import SAFE_METHODS
+from meme import metrics
+from meme.models import User, Coin, Vote, VoteRing, Community, Post, Comment, Note, Rating, Badge, UserBadge, Notification, Analytics
+from . import batch
+from .expand import Related, RelatedCount
+from .fields import ThumbnailImageField, parse_field_list
+
+# Fields of a user shown to other users when expanded
+PUBLIC_USER_FIELDS = ["id", "username", "avatar", "bio", "activity_points"]
+
+
+# Sparse fieldsets: ?fields=id,name keeps only the listed fields and
+# ?exclude=description drops fields, on read requests only. ``only=``
+# fixes the fields instead (expanded objects, see expand.py); ``keep=``
+# names fields the view needs whatever the parameters say
+class SparseFieldsetMixin:
+    expandable_fields = {}
+
+    def __init__(self, *args, only=None, keep=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if getattr(getattr(request, "accepted_renderer", None), "native_datetimes", False):
+            # Binary formats encode datetimes natively instead of as ISO strings
+            for field in self.fields.values():
+                if isinstance(field, serializers.DateTimeField):
+                    field.format = None
+        if only is not None:
+            for name in list(self.fields):
+                if name not in only:
+                    self.fields.pop(name)
+            return
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        fields = parse_field_list(request.query_params.get("fields"))
+        exclude = set(parse_field_list(request.query_params.get("exclude")))
+        if not fields and not exclude:
+            return
+        for name in list(self.fields):
+            if ((fields and name not in fields) or name in exclude) and name not in keep:
+                self.fields.pop(name)
+
+    def to_representation(self, instance):
+        # Timed at the top level (or per list item) for request metrics
+        if self.parent is not None and not isinstance(self.parent, serializers.ListSerializer):
+            return super().to_representation(instance)
+        with metrics.timer():
+            return super().to_representation(instance)
 
 # User Serializer
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    avatar = ThumbnailImageField(required=False, allow_null=True)
+
     class Meta:
         model = User
         fields = [
@@ -16,67 +65,166 @@ class UserSerializer(serializers.ModelSerializer):
         ]
 
 # Coin Serializer
-class CoinSerializer(serializers.ModelSerializer):
+class CoinSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    logo = ThumbnailImageField(required=False, allow_null=True)
+
+    expandable_fields = {"created_by": Related(UserSerializer, PUBLIC_USER_FIELDS)}
+
     class Meta:
         model = Coin
         fields = "__all__"
 
 # Vote Serializer
-class VoteSerializer(serializers.ModelSerializer):
+class VoteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        "user": Related(UserSerializer, PUBLIC_USER_FIELDS),
+        "coin": Related(CoinSerializer, ["id", "name", "symbol", "logo", "total_votes"]),
+    }
+
     class Meta:
         model = Vote
         fields = "__all__"
 
+# VoteRing Serializer
+class VoteRingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = VoteRing
+        fields = "__all__"
+
 # Community Serializer
-class CommunitySerializer(serializers.ModelSerializer):
+class CommunitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {"created_by": Related(UserSerializer, PUBLIC_USER_FIELDS)}
+
     class Meta:
         model = Community
         fields = "__all__"
 
 # Post Serializer
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        "author": Related(UserSerializer, PUBLIC_USER_FIELDS),
+        "comment_count": RelatedCount(Comment, "post"),
+    }
+
     class Meta:
         model = Post
         fields = "__all__"
 
 # Comment Serializer
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        "author": Related(UserSerializer, PUBLIC_USER_FIELDS),
+        "post": Related(PostSerializer, ["id", "title", "author", "created_at"]),
+    }
+
     class Meta:
         model = Comment
         fields = "__all__"
 
 # Note Serializer
-class NoteSerializer(serializers.ModelSerializer):
+class NoteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Note
         fields = "__all__"
+        read_only_fields = ["seq"]
 
 # Rating Serializer
-class RatingSerializer(serializers.ModelSerializer):
+class RatingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        "user": Related(UserSerializer, PUBLIC_USER_FIELDS),
+        "rated_user": Related(UserSerializer, PUBLIC_USER_FIELDS),
+    }
+
     class Meta:
         model = Rating
         fields = "__all__"
 
 # Badge Serializer
-class BadgeSerializer(serializers.ModelSerializer):
+class BadgeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    icon = ThumbnailImageField(required=False, allow_null=True)
+
     class Meta:
         model = Badge
         fields = "__all__"
 
 # UserBadge Serializer
-class UserBadgeSerializer(serializers.ModelSerializer):
+class UserBadgeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        "user": Related(UserSerializer, PUBLIC_USER_FIELDS),
+        "badge": Related(BadgeSerializer, ["id", "name", "description", "icon"]),
+    }
+
     class Meta:
         model = UserBadge
         fields = "__all__"
 
 # Notification Serializer
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = "__all__"
 
 # Analytics Serializer
-class AnalyticsSerializer(serializers.ModelSerializer):
+class AnalyticsSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = {"coin": Related(CoinSerializer, ["id", "name", "symbol", "logo", "total_votes"])}
+
     class Meta:
         model = Analytics
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+# Batch Serializers: describe /api/batch/ (batch.parse() validates it)
+class BatchRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=sorted(batch.METHODS), default="GET")
+    path = serializers.CharField(help_text="An /api/ path, with its query string.")
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    status = serializers.IntegerField()
+    headers = serializers.DictField(child=serializers.CharField())
+    body = serializers.JSONField()
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchRequestSerializer(many=True, write_only=True)
+    responses = BatchResponseSerializer(many=True, read_only=True)
+
+# Change Serializers: describe /api/changes/ and its ack action
+class ChangeEventSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    offset = serializers.IntegerField()
+    label = serializers.CharField()
+    object_id = serializers.CharField()
+    operation = serializers.ChoiceField(choices=["create", "update", "delete"])
+    payload = serializers.JSONField()
+    created_at = serializers.DateTimeField()
+
+
+# A single page object, although it answers the list action
+@extend_schema_serializer(many=False)
+class ChangeFeedSerializer(serializers.Serializer):
+    results = ChangeEventSerializer(many=True)
+    next = serializers.IntegerField(help_text="The offset to read from next.")
+    has_more = serializers.BooleanField()
+
+
+class ChangeAckSerializer(serializers.Serializer):
+    consumer = serializers.CharField()
+    offset = serializers.IntegerField()
+
+# RouteMetrics Serializer: describes a row of /api/metrics/ (see metrics.py)
+class RouteMetricsSerializer(serializers.Serializer):
+    method = serializers.CharField()
+    route = serializers.CharField()
+    requests = serializers.IntegerField()
+    avg_ms = serializers.FloatField()
+    p50_ms = serializers.FloatField()
+    p95_ms = serializers.FloatField()
+    p99_ms = serializers.FloatField()
+    avg_queries = serializers.FloatField()
+    avg_db_ms = serializers.FloatField()
+    avg_serializer_ms = serializers.FloatField()
+    avg_bytes = serializers.FloatField()
+    n_plus_one_requests = serializers.IntegerField()
+    n_plus_one_sql = serializers.CharField(allow_null=True)
@@ -1,23 +1,62 @@
-from django.test import TestCase
+import datetime
+import decimal
+import gzip
+import io
+import json
+import logging
+import logging.handlers
+import os
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from unittest import mock, skipIf
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, transaction
+from django.db.models.deletion import Collector
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image
 from django.contrib.auth import get_user_model
-from rest_framework.test import APIClient
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
-from meme.models import Coin, Vote, Community, Post, Comment, Note, Rating, Badge, UserBadge, Notification, Analytics
+from meme.api.serializers import CoinSerializer, VoteSerializer, PostSerializer, CommentSerializer, NotificationSerializer
+from meme import autocomplete, metrics, outbox, recommendations, routers, voterings
+from meme.benchmarks import compare, latency_summary
+from meme.seeding import seed, update_vote_totals
+from meme.retention import RetentionPolicy, purge
+from meme.views import lazy_view
+from meme.images import thumbnail_name
+from meme.admin import EstimatedCountPaginator
+from meme.api.permissions import Policy, get_policy
+from meme.log import JSONFormatter, QueueHandler, SamplingFilter
+from meme.api.ratelimit import LocMemBackend, SQLiteBackend, get_backend
+from meme.api import parsers, renderers
+from meme.models import Coin, Vote, Community, Post, Comment, Note, NoteTombstone, Rating, Badge, UserBadge, Notification, Analytics, ChangeEvent, CoinNeighbors, VoteArchive, VoteRing
 
 User = get_user_model()
 
 class UserModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
 
     def test_user_creation(self):
         self.assertEqual(self.user.username, "testuser")
         self.assertTrue(self.user.check_password("password123"))
 
 class CoinModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=self.user)
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=cls.user)
 
     def test_coin_creation(self):
         self.assertEqual(self.coin.name, "Test Coin")
@@ -25,10 +64,11 @@ class CoinModelTest(TestCase):
         self.assertEqual(self.coin.created_by.username, "testuser")
 
 class VoteModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=self.user)
-        self.vote = Vote.objects.create(user=self.user, coin=self.coin, vote_type="upvote")
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=cls.user)
+        cls.vote = Vote.objects.create(user=cls.user, coin=cls.coin, vote_type="upvote")
 
     def test_vote_creation(self):
         self.assertEqual(self.vote.user.username, "testuser")
@@ -36,9 +76,10 @@ class VoteModelTest(TestCase):
         self.assertEqual(self.vote.vote_type, "upvote")
 
 class CommunityModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.community = Community.objects.create(name="Test Community", description="Test Description", created_by=self.user)
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.community = Community.objects.create(name="Test Community", description="Test Description", created_by=cls.user)
 
     def test_community_creation(self):
         self.assertEqual(self.community.name, "Test Community")
@@ -46,9 +87,10 @@ class CommunityModelTest(TestCase):
         self.assertEqual(self.community.created_by.username, "testuser")
 
 class PostModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.post = Post.objects.create(title="Test Post", content="Test Content", author=self.user)
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.post = Post.objects.create(title="Test Post", content="Test Content", author=cls.user)
 
     def test_post_creation(self):
         self.assertEqual(self.post.title, "Test Post")
@@ -56,10 +98,11 @@ class PostModelTest(TestCase):
         self.assertEqual(self.post.author.username, "testuser")
 
 class CommentModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.post = Post.objects.create(title="Test Post", content="Test Content", author=self.user)
-        self.comment = Comment.objects.create(content="Test Comment", author=self.user, post=self.post)
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.post = Post.objects.create(title="Test Post", content="Test Content", author=cls.user)
+        cls.comment = Comment.objects.create(content="Test Comment", author=cls.user, post=cls.post)
 
     def test_comment_creation(self):
         self.assertEqual(self.comment.content, "Test Comment")
@@ -67,9 +110,10 @@ class CommentModelTest(TestCase):
         self.assertEqual(self.comment.post.title, "Test Post")
 
 class NoteModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.note = Note.objects.create(user=self.user, title="Test Note", content="Test Content")
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.note = Note.objects.create(user=cls.user, title="Test Note", content="Test Content")
 
     def test_note_creation(self):
         self.assertEqual(self.note.title, "Test Note")
@@ -77,10 +121,11 @@ class NoteModelTest(TestCase):
         self.assertEqual(self.note.user.username, "testuser")
 
 class RatingModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.rated_user = User.objects.create_user(username="rateduser", password="password123", email="rated@example.com")
-        self.rating = Rating.objects.create(user=self.user, rated_user=self.rated_user, rating=5, comment="Great user")
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.rated_user = User.objects.create_user(username="rateduser", password="password123", email="rated@example.com")
+        cls.rating = Rating.objects.create(user=cls.user, rated_user=cls.rated_user, rating=5, comment="Great user")
 
     def test_rating_creation(self):
         self.assertEqual(self.rating.user.username, "testuser")
@@ -89,37 +134,41 @@ class RatingModelTest(TestCase):
         self.assertEqual(self.rating.comment, "Great user")
 
 class BadgeModelTest(TestCase):
-    def setUp(self):
-        self.badge = Badge.objects.create(name="Test Badge", description="Test Description")
+    @classmethod
+    def setUpTestData(cls):
+        cls.badge = Badge.objects.create(name="Test Badge", description="Test Description")
 
     def test_badge_creation(self):
         self.assertEqual(self.badge.name, "Test Badge")
         self.assertEqual(self.badge.description, "Test Description")
 
 class UserBadgeModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.badge = Badge.objects.create(name="Test Badge", description="Test Description")
-        self.user_badge = UserBadge.objects.create(user=self.user, badge=self.badge)
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.badge = Badge.objects.create(name="Test Badge", description="Test Description")
+        cls.user_badge = UserBadge.objects.create(user=cls.user, badge=cls.badge)
 
     def test_user_badge_creation(self):
         self.assertEqual(self.user_badge.user.username, "testuser")
         self.assertEqual(self.user_badge.badge.name, "Test Badge")
 
 class NotificationModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.notification = Notification.objects.create(user=self.user, content="Test Notification")
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.notification = Notification.objects.create(user=cls.user, content="Test Notification")
 
     def test_notification_creation(self):
         self.assertEqual(self.notification.user.username, "testuser")
         self.assertEqual(self.notification.content, "Test Notification")
 
 class AnalyticsModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=self.user)
-        self.analytics = Analytics.objects.create(coin=self.coin, views=100, upvotes=50, downvotes=10, total_votes=60)
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=cls.user)
+        cls.analytics = Analytics.objects.create(coin=cls.coin, views=100, upvotes=50, downvotes=10, total_votes=60)
 
     def test_analytics_creation(self):
         self.assertEqual(self.analytics.coin.name, "Test Coin")
@@ -129,9 +178,12 @@ class AnalyticsModelTest(TestCase):
         self.assertEqual(self.analytics.total_votes, 60)
 
 class UserViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
+
     def setUp(self):
         self.client = APIClient()
-        self.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
         self.client.force_authenticate(user=self.admin_user)
 
     def test_create_user(self):
@@ -146,11 +198,14 @@ class UserViewSetTest(TestCase):
         self.assertEqual(User.objects.get(id=2).username, "newuser")
 
 class CoinViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+
     def setUp(self):
         self.client = APIClient()
-        self.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
         self.client.force_authenticate(user=self.admin_user)
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
 
     def test_create_coin(self):
         data = {
@@ -166,11 +221,14 @@ class CoinViewSetTest(TestCase):
         self.assertEqual(Coin.objects.get(id=1).name, "New Coin")
 
 class VoteViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=cls.user)
+
     def setUp(self):
         self.client = APIClient()
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
         self.client.force_authenticate(user=self.user)
-        self.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=self.user)
 
     def test_create_vote(self):
         data = {
@@ -184,9 +242,12 @@ class VoteViewSetTest(TestCase):
         self.assertEqual(Vote.objects.get(id=1).vote_type, "upvote")
 
 class CommunityViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+
     def setUp(self):
         self.client = APIClient()
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
         self.client.force_authenticate(user=self.user)
 
     def test_create_community(self):
@@ -204,9 +265,12 @@ class CommunityViewSetTest(TestCase):
         self.assertEqual(Community.objects.get(id=1).name, "New Community")
 
 class PostViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+
     def setUp(self):
         self.client = APIClient()
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
         self.client.force_authenticate(user=self.user)
 
     def test_create_post(self):
@@ -221,11 +285,14 @@ class PostViewSetTest(TestCase):
         self.assertEqual(Post.objects.get(id=1).title, "New Post")
 
 class CommentViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.post = Post.objects.create(title="Test Post", content="Test Content", author=cls.user)
+
     def setUp(self):
         self.client = APIClient()
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
         self.client.force_authenticate(user=self.user)
-        self.post = Post.objects.create(title="Test Post", content="Test Content", author=self.user)
 
     def test_create_comment(self):
         data = {
@@ -239,9 +306,12 @@ class CommentViewSetTest(TestCase):
         self.assertEqual(Comment.objects.get(id=1).content, "New Comment")
 
 class NoteViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+
     def setUp(self):
         self.client = APIClient()
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
         self.client.force_authenticate(user=self.user)
 
     def test_create_note(self):
@@ -256,10 +326,13 @@ class NoteViewSetTest(TestCase):
         self.assertEqual(Note.objects.get(id=1).title, "New Note")
 
 class RatingViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.rated_user = User.objects.create_user(username="rateduser", password="password123", email="rated@example.com")
+
     def setUp(self):
         self.client = APIClient()
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.rated_user = User.objects.create_user(username="rateduser", password="password123", email="rated@example.com")
         self.client.force_authenticate(user=self.user)
 
     def test_create_rating(self):
@@ -275,9 +348,12 @@ class RatingViewSetTest(TestCase):
         self.assertEqual(Rating.objects.get(id=1).rating, 5)
 
 class BadgeViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
+
     def setUp(self):
         self.client = APIClient()
-        self.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
         self.client.force_authenticate(user=self.admin_user)
 
     def test_create_badge(self):
@@ -291,12 +367,15 @@ class BadgeViewSetTest(TestCase):
         self.assertEqual(Badge.objects.get(id=1).name, "New Badge")
 
 class UserBadgeViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.badge = Badge.objects.create(name="Test Badge", description="Test Description")
+
     def setUp(self):
         self.client = APIClient()
-        self.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
         self.client.force_authenticate(user=self.admin_user)
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.badge = Badge.objects.create(name="Test Badge", description="Test Description")
 
     def test_create_user_badge(self):
         data = {
@@ -309,9 +388,12 @@ class UserBadgeViewSetTest(TestCase):
         self.assertEqual(UserBadge.objects.get(id=1).user.username, "testuser")
 
 class NotificationViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+
     def setUp(self):
         self.client = APIClient()
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
         self.client.force_authenticate(user=self.user)
 
     def test_create_notification(self):
@@ -325,12 +407,15 @@ class NotificationViewSetTest(TestCase):
         self.assertEqual(Notification.objects.get(id=1).content, "New Notification")
 
 class AnalyticsViewSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=cls.user)
+
     def setUp(self):
         self.client = APIClient()
-        self.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
         self.client.force_authenticate(user=self.admin_user)
-        self.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
-        self.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=self.user)
 
     def test_create_analytics(self):
         data = {
@@ -343,4 +428,1184 @@ class AnalyticsViewSetTest(TestCase):
         response = self.client.post("/api/analytics/", data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Analytics.objects.count(), 1)
-        self.assertEqual(Analytics.objects.get(id=1).views, 100)
\ No newline at end of file
+        self.assertEqual(Analytics.objects.get(id=1).views, 100)
+
+class RateLimitBackendTest(TestCase):
+    def assert_sliding_window(self, backend):
+        for _ in range(3):
+            self.assertTrue(backend.hit("k", 3, 60, 1000.0).allowed)
+        denied = backend.hit("k", 3, 60, 1001.0)
+        self.assertFalse(denied.allowed)
+        self.assertEqual(denied.remaining, 0)
+        self.assertGreater(denied.retry_after, 0)
+        # Halfway through the next window half of the old hits still count
+        self.assertTrue(backend.hit("k", 3, 60, 1050.0).allowed)
+        self.assertFalse(backend.hit("k", 3, 60, 1050.0).allowed)
+        # Two windows later the counter starts fresh
+        self.assertEqual(backend.hit("k", 3, 60, 1300.0).remaining, 2)
+
+    def test_locmem_backend(self):
+        self.assert_sliding_window(LocMemBackend())
+
+    def test_sqlite_backend(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = SQLiteBackend(Path(tmp) / "rl.sqlite3")
+            self.assert_sliding_window(backend)
+            backend.connection.close()
+
+class RateLimitHeadersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+
+    def setUp(self):
+        get_backend().reset()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_rate_limit_headers(self):
+        response = self.client.get("/api/votes/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-RateLimit-Limit"], "10")
+        self.assertEqual(response["X-RateLimit-Remaining"], "9")
+        self.assertIn("X-RateLimit-Reset", response)
+
+class ImagePipelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=self.media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+
+    def upload(self, size=(1200, 800), name="icon.png"):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "orange").save(buffer, "PNG")
+        icon = SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/badges/", {"name": "Shiny", "description": "Badge", "icon": icon})
+
+    def test_upload_is_reencoded_with_thumbnails(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        badge = Badge.objects.get(id=response.data["id"])
+        self.assertRegex(badge.icon.name, r"^badges/[0-9a-f]{2}/[0-9a-f]{20}\.webp$")
+        with Image.open(default_storage.open(badge.icon.name)) as image:
+            self.assertEqual(image.size, (1024, 683))
+
+        response = self.client.get(f"/api/badges/{badge.id}/?image_size=small")
+        self.assertTrue(response.data["icon"].endswith("_64.webp"))
+        with Image.open(default_storage.open(response.data["icon"].split("/media/")[1])) as image:
+            self.assertEqual(image.size, (64, 43))
+
+    def test_upload_named_like_a_processed_file_is_processed(self):
+        response = self.upload(name="0123456789abcdef0123.jpg")
+        badge = Badge.objects.get(id=response.data["id"])
+        self.assertRegex(badge.icon.name, r"^badges/([0-9a-f]{2})/\1[0-9a-f]{18}\.webp$")
+        self.assertFalse(default_storage.exists("badges/0123456789abcdef0123.jpg"))
+        self.assertTrue(default_storage.exists(thumbnail_name(badge.icon.name, "small")))
+
+    def test_identical_uploads_share_files(self):
+        first = Badge.objects.get(id=self.upload().data["id"])
+        second = Badge.objects.get(id=self.upload().data["id"])
+        self.assertEqual(first.icon.name, second.icon.name)
+
+    def test_rejects_non_images(self):
+        icon = SimpleUploadedFile("icon.png", b"not an image", content_type="image/png")
+        response = self.client.post("/api/badges/", {"name": "Broken", "description": "Badge", "icon": icon})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class SparseFieldsetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        for i in range(3):
+            Coin.objects.create(name=f"Coin {i}", symbol=f"C{i}", description="Long description", created_by=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_fields_and_exclude(self):
+        response = self.client.get("/api/coins/?fields=id,name")
+        self.assertEqual(set(response.data[0]), {"id", "name"})
+        response = self.client.get("/api/coins/?exclude=description,logo")
+        self.assertNotIn("description", response.data[0])
+        self.assertIn("symbol", response.data[0])
+
+    def test_unused_columns_are_not_fetched(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/coins/?fields=id,name")
+        coin_query = [q["sql"] for q in queries if 'FROM "meme_coin"' in q["sql"]][0]
+        self.assertNotIn('"description"', coin_query)
+
+    def test_detail_sparse_fieldset(self):
+        coin = Coin.objects.first()
+        response = self.client.get(f"/api/coins/{coin.id}/?fields=name")
+        self.assertEqual(response.data, {"name": coin.name})
+
+    def test_compact_format(self):
+        response = self.client.get("/api/coins/?fields=id,symbol&format=compact")
+        ids = list(Coin.objects.values_list("id", flat=True))
+        self.assertEqual(response.json(), {"id": ids, "symbol": ["C0", "C1", "C2"]})
+
+class FastListPathTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        text = "Ünïcode \u2028 \"quoted\" \x01 ✓"
+        coin = Coin.objects.create(name=text, symbol="TC", description=text, created_by=cls.user)
+        Coin.objects.create(name="Logo", symbol="LG", description="", created_by=cls.user, logo="coin_logos/ab/abababababababababab.webp")
+        Vote.objects.create(user=cls.user, coin=coin, vote_type="upvote")
+        post = Post.objects.create(title=text, content=text, author=cls.user)
+        Post.objects.create(title="Anonymous", content="")
+        Comment.objects.create(content=text, author=cls.user, post=post)
+        Notification.objects.create(user=cls.user, content=text, link="https://example.com/", read=True)
+        Notification.objects.create(user=cls.user, content="Unread")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def assert_same_output(self, url, serializer_class, queryset):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        request = Request(APIRequestFactory().get(url))
+        expected = serializer_class(queryset, many=True, context={"request": request}).data
+        rendered = response.data["results"] if isinstance(response.data, dict) else response.data
+        self.assertEqual(JSONRenderer().render(rendered), JSONRenderer().render(expected))
+        if not isinstance(response.data, dict):
+            self.assertEqual(response.content, JSONRenderer().render(expected))
+
+    def test_outputs_match_serializers(self):
+        # my_vote is added by the view, after rendering
+        self.assert_same_output("/api/coins/?exclude=my_vote", CoinSerializer, Coin.objects.all())
+        self.assert_same_output("/api/coins/?exclude=my_vote&image_size=small", CoinSerializer, Coin.objects.all())
+        self.assert_same_output("/api/votes/", VoteSerializer, Vote.objects.all())
+        self.assert_same_output("/api/posts/", PostSerializer, Post.objects.all())
+        self.assert_same_output("/api/comments/", CommentSerializer, Comment.objects.all())
+        self.assert_same_output("/api/notifications/", NotificationSerializer, Notification.objects.all())
+
+    def test_sparse_fieldsets_use_fast_path(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/coins/?fields=id,created_at")
+        self.assertEqual(list(response.data[0]), ["id", "created_at"])
+        self.assertTrue(response.data[0]["created_at"].endswith("Z"))
+        self.assertIn('SELECT "meme_coin"."id", "meme_coin"."created_at" FROM', queries[-1]["sql"])
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_unchanged_list_returns_304_without_querying_rows(self):
+        etag = self.client.get("/api/coins/")["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/coins/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse([q for q in queries if 'FROM "meme_coin"' in q["sql"]])
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get("/api/coins/")["ETag"]
+        self.coin.total_votes = 5
+        self.coin.save()
+        response = self.client.get("/api/coins/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_depends_on_query(self):
+        self.assertNotEqual(self.client.get("/api/coins/")["ETag"], self.client.get("/api/coins/?fields=id")["ETag"])
+
+    def test_untracked_models_keep_fast_delete(self):
+        self.assertTrue(Collector("default").can_fast_delete(ChangeEvent.objects.all()))
+        self.assertTrue(Collector("default").can_fast_delete(VoteRing.objects.all()))
+        self.assertFalse(Collector("default").can_fast_delete(Coin.objects.all()))
+
+class CompressionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        for i in range(20):
+            Coin.objects.create(name=f"Coin {i}", symbol=f"C{i}", description="Test Description", created_by=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_gzip(self):
+        response = self.client.get("/api/coins/", HTTP_ACCEPT_ENCODING="gzip;q=1.0, identity;q=0.5")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].startswith("W/"))
+        self.assertEqual(json.loads(gzip.decompress(response.content)), json.loads(self.client.get("/api/coins/").content))
+
+    def test_small_or_unrequested_responses_are_not_compressed(self):
+        self.assertFalse(self.client.get("/api/coins/").has_header("Content-Encoding"))
+        response = self.client.get("/api/coins/?fields=id&search=Coin 1", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+class SQLiteConnectionTest(TestCase):
+    def test_pragmas_are_applied(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+@override_settings(REPLICA_DATABASES=["replica"])
+class ReplicaRoutingTest(TestCase):
+    databases = {"default", "replica"}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        Coin.objects.create(name="Primary Coin", symbol="PC", description="Only on the primary", created_by=cls.user)
+
+    def setUp(self):
+        routers._health.clear()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_safe_requests_read_from_replica(self):
+        # The replica database is empty, so replica reads find nothing
+        self.assertEqual(self.client.get("/api/coins/").data, [])
+
+    def test_private_viewsets_read_from_primary(self):
+        Note.objects.create(user=self.user, title="Note", content="Content")
+        self.assertEqual(len(self.client.get("/api/notes/").data), 1)
+
+    def test_writes_pin_reads_to_primary(self):
+        response = self.client.post("/api/communities/", {"name": "Community", "description": "Description", "members": [self.user.id], "created_by": self.user.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        self.assertEqual(len(self.client.get("/api/coins/").data), 1)
+
+    def test_writes_pin_user_without_cookies(self):
+        # JWT clients usually keep no cookies
+        self.client.post("/api/communities/", {"name": "Community", "description": "Description", "members": [self.user.id], "created_by": self.user.id})
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        self.assertEqual(len(client.get("/api/coins/").data), 1)
+        other = APIClient()
+        other.force_authenticate(user=User.objects.create_user(username="other", password="password123", email="other@example.com"))
+        self.assertEqual(other.get("/api/coins/").data, [])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch("meme.routers.replica_lag", return_value=60.0):
+            self.assertEqual(len(self.client.get("/api/coins/").data), 1)
+
+    def test_batch_reads_its_writes_from_primary(self):
+        response = self.client.post("/api/batch/", {"requests": [
+            {"path": "/api/coins/"},
+            {"method": "POST", "path": "/api/notes/", "body": {"title": "Hi", "content": "There", "user": self.user.pk}},
+            {"path": "/api/coins/"},
+        ]}, format="json")
+        self.assertEqual([len(result["body"]) for result in response.data["responses"][::2]], [0, 1])
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_read_only_batch_does_not_pin(self):
+        response = self.client.post("/api/batch/", {"requests": [{"path": "/api/coins/"}]}, format="json")
+        self.assertEqual(response.data["responses"][0]["body"], [])
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+class StructuredLoggingTest(TestCase):
+    def test_queue_handler_formats_on_listener_thread(self):
+        records = []
+        target = logging.Handler()
+        target.emit = lambda record: records.append((JSONFormatter().format(record), threading.current_thread()))
+        handler = QueueHandler(handlers=[target])
+        logger = logging.getLogger("test.structured")
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        try:
+            logger.info("Vote created: %s by %s", "Doge", "alice", extra={"event": "vote.created", "coin_id": 7})
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+            target.close()
+        event, thread = records[0]
+        self.assertIsNot(thread, threading.current_thread())
+        event = json.loads(event)
+        self.assertEqual(event["message"], "Vote created: Doge by alice")
+        self.assertEqual(event["event"], "vote.created")
+        self.assertEqual(event["coin_id"], 7)
+        self.assertEqual(event["level"], "INFO")
+
+    def test_concurrent_emits_start_one_listener(self):
+        handler = QueueHandler(handlers=[logging.NullHandler()])
+        record = logging.LogRecord("test", logging.INFO, "", 0, "Hi", (), None)
+        start = logging.handlers.QueueListener.start
+        with mock.patch.object(logging.handlers.QueueListener, "start", autospec=True, side_effect=start) as started:
+            threads = [threading.Thread(target=handler.emit, args=(record,)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        handler.close()
+        self.assertEqual(started.call_count, 1)
+
+    def test_sampling_filter(self):
+        record = logging.LogRecord("app.votes", logging.INFO, "", 0, "Vote", (), None)
+        self.assertFalse(SamplingFilter(rate=0).filter(record))
+        self.assertTrue(SamplingFilter(rate=1).filter(record))
+        record.levelno = logging.ERROR
+        self.assertTrue(SamplingFilter(rate=0).filter(record))
+
+class RequestMetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_records_route_queries_and_size(self):
+        Coin.objects.create(name="Dogecoin", symbol="DOGE", description="Meme coin", created_by=self.user)
+        response = self.client.get("/api/coins/")
+        route = metrics.registry.routes[("GET", "coin-list")]
+        self.assertEqual(route.count, 1)
+        self.assertGreater(route.queries, 0)
+        self.assertGreater(route.serializer_time, 0)
+        self.assertEqual(route.bytes, len(response.content))
+
+    def test_flags_repeated_sql_shapes(self):
+        for index in range(6):
+            community = Community.objects.create(name=f"Community {index}", description="Description", created_by=self.user)
+            community.members.add(self.user)
+        self.client.get("/api/communities/")
+        self.client.get("/api/coins/")
+        self.assertEqual(metrics.registry.routes[("GET", "community-list")].n_plus_one, 1)
+        self.assertEqual(metrics.registry.routes[("GET", "coin-list")].n_plus_one, 0)
+
+    def test_prometheus_endpoint(self):
+        self.client.get("/api/coins/")
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="coin-list"} 1', body)
+        self.assertIn("# TYPE http_db_queries_total counter", body)
+
+    def test_request_stats_group_queries_by_shape(self):
+        stats = metrics.RequestStats()
+        execute = lambda sql, params, many, context: None
+        stats(execute, "SELECT * FROM coin WHERE id = 1", None, False, None)
+        stats(execute, "SELECT * FROM coin WHERE id = 2", None, False, None)
+        self.assertEqual(stats.shapes, {"SELECT * FROM coin WHERE id = ?": 2})
+
+    def test_prometheus_endpoint_without_token_is_internal_only(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="203.0.113.7").status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(INTERNAL_IPS=["203.0.113.7"]):
+            self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="203.0.113.7").status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_prometheus_endpoint_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret").status_code, status.HTTP_200_OK)
+
+    def test_summary_is_admin_only(self):
+        self.client.get("/api/coins/")
+        self.assertEqual(self.client.get("/api/metrics/").status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.admin_user)
+        routes = {row["route"]: row for row in self.client.get("/api/metrics/").data}
+        self.assertEqual(routes["coin-list"]["requests"], 1)
+        self.assertIn("p95_ms", routes["coin-list"])
+
+class BenchmarkReportTest(TestCase):
+    def test_latency_summary(self):
+        results = latency_summary([i / 1000 for i in range(1, 101)], elapsed=2.0)
+        self.assertEqual(results["throughput_rps"], 50)
+        self.assertAlmostEqual(results["p50_ms"], 50.5)
+        self.assertAlmostEqual(results["p99_ms"], 99.01)
+
+    def test_compare_flags_regressions_by_unit(self):
+        baseline = {"coin_listing": {"throughput_rps": 100.0, "p95_ms": 10.0, "errors": 0}}
+        current = {"coin_listing": {"throughput_rps": 70.0, "p95_ms": 11.0, "errors": 5}}
+        regressions = compare(baseline, current, threshold=0.2)
+        self.assertEqual([(name, metric) for name, metric, *_ in regressions], [("coin_listing", "throughput_rps"), ("coin_listing", "errors")])
+        self.assertEqual(regressions[1][4], float("inf"))
+        self.assertEqual(compare({"a": {"size_bytes": 0, "errors": 2}}, {"a": {"size_bytes": 0, "errors": 1}}, threshold=0.2), [])
+
+class SeedTest(TestCase):
+    def vote_pairs(self, created):
+        users = {pk: index for index, pk in enumerate(created["users"])}
+        coins = {pk: index for index, pk in enumerate(created["coins"])}
+        return sorted((users[user], coins[coin], vote_type) for user, coin, vote_type in
+                      Vote.objects.filter(coin__in=coins).values_list("user", "coin", "vote_type"))
+
+    def test_seed_counts_and_constraints(self):
+        created = seed(users=30, coins=10, votes=120, communities=4, posts=15, comments=40, notifications=20)
+        self.assertEqual(User.objects.filter(username__startswith="seed-").count(), 30)
+        self.assertEqual(Vote.objects.count(), 120)
+        self.assertEqual(Vote.objects.values("user", "coin").distinct().count(), 120)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertTrue(all(community.members.count() >= 5 for community in Community.objects.all()))
+        self.assertFalse(User.objects.get(username="seed-0").has_usable_password())
+        coin = Coin.objects.get(pk=created["coins"][0])
+        score = coin.votes.filter(vote_type="upvote").count() - coin.votes.filter(vote_type="downvote").count()
+        self.assertEqual(coin.total_votes, score)
+
+    def test_seed_is_deterministic(self):
+        first = self.vote_pairs(seed(users=20, coins=8, votes=60, communities=0, posts=0, comments=0, notifications=0, seed=7, prefix="a"))
+        second = self.vote_pairs(seed(users=20, coins=8, votes=60, communities=0, posts=0, comments=0, notifications=0, seed=7, prefix="b"))
+        self.assertEqual(first, second)
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test Description", category="meme", created_by=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_vote_changelist_queries_do_not_grow_with_rows(self):
+        Vote.objects.create(user=self.user, coin=self.coin, vote_type="upvote")
+        before = self.changelist_queries("/admin/meme/vote/")
+        for i in range(5):
+            voter = User.objects.create_user(username=f"voter{i}", password="password123")
+            coin = Coin.objects.create(name=f"Coin {i}", symbol=f"C{i}", description="", created_by=voter)
+            Vote.objects.create(user=voter, coin=coin, vote_type="downvote")
+        self.assertEqual(self.changelist_queries("/admin/meme/vote/"), before)
+
+    def test_search_uses_exact_and_prefix_lookups(self):
+        Vote.objects.create(user=self.user, coin=self.coin, vote_type="upvote")
+        self.assertEqual(self.client.get("/admin/meme/vote/", {"q": "testuser"}).context["cl"].result_count, 1)
+        self.assertEqual(self.client.get("/admin/meme/vote/", {"q": "testus"}).context["cl"].result_count, 0)
+        self.assertEqual(self.client.get("/admin/meme/coin/", {"q": "Test"}).context["cl"].result_count, 1)
+        response = self.client.get("/admin/meme/analytics/", {"q": "50"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_estimated_count(self):
+        for i in range(4):
+            Coin.objects.create(name=f"Coin {i}", symbol=f"C{i}", description="", created_by=self.user)
+        with mock.patch.object(EstimatedCountPaginator, "exact_limit", 2):
+            # Unfiltered: the table estimate (highest rowid on SQLite)
+            self.assertEqual(EstimatedCountPaginator(Coin.objects.all(), 10).count, Coin.objects.order_by("-pk").first().pk)
+            # Filtered: counted up to the limit
+            self.assertEqual(EstimatedCountPaginator(Coin.objects.filter(description=""), 10).count, 2)
+
+class PermissionPolicyTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.other = User.objects.create_user(username="otheruser", password="password123", email="other@example.com")
+        cls.post = Post.objects.create(title="Test Post", content="Test Content", author=cls.owner)
+        cls.comment = Comment.objects.create(content="Test Comment", author=cls.owner, post=cls.post)
+        cls.note = Note.objects.create(user=cls.owner, title="Test Note", content="Test Content")
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_owner_check_compares_ids_without_loading_users(self):
+        comment = Comment.objects.get(pk=self.comment.pk)
+        policy = Policy(self.owner)
+        with self.assertNumQueries(0):
+            self.assertTrue(policy.owns(comment))
+            self.assertFalse(Policy(self.other).owns(comment))
+            self.assertFalse(Policy(None).owns(comment))
+
+    def test_only_owner_can_modify(self):
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.patch(f"/api/posts/{self.post.id}/", {"title": "Hijacked"}).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.delete(f"/api/comments/{self.comment.id}/").status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.owner)
+        self.assertEqual(self.client.patch(f"/api/posts/{self.post.id}/", {"title": "Edited"}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.delete(f"/api/comments/{self.comment.id}/").status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_private_querysets_are_scoped_to_owner(self):
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.get("/api/notes/").data, [])
+        self.assertEqual(self.client.get(f"/api/notes/{self.note.id}/").status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=self.owner)
+        self.assertEqual(len(self.client.get("/api/notes/").data), 1)
+
+    def test_policy_is_built_once_per_request(self):
+        self.client.force_authenticate(user=self.owner)
+        with mock.patch("meme.api.permissions.Policy", wraps=Policy) as policy:
+            self.client.patch(f"/api/posts/{self.post.id}/", {"title": "Edited"})
+        self.assertEqual(policy.call_count, 1)
+
+    def test_roles_map_to_capabilities(self):
+        request = APIRequestFactory().get("/")
+        request.user = User(role="moderator", pk=1)
+        policy = get_policy(request)
+        self.assertTrue(policy.can("moderate"))
+        self.assertFalse(policy.can("admin"))
+        self.assertIs(get_policy(request), policy)
+
+
+
+class StartupTest(TestCase):
+    def test_prebuilt_schema_is_served_from_file(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as schema:
+            schema.write(b'{"openapi": "3.0.3"}')
+            schema.flush()
+            with override_settings(OPENAPI_SCHEMA_FILE=schema.name):
+                response = self.client.get("/api/schema/")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(b"".join(response.streaming_content), b'{"openapi": "3.0.3"}')
+            self.assertIn("max-age", response["Cache-Control"])
+
+    def test_schema_is_generated_without_prebuilt_file(self):
+        with override_settings(OPENAPI_SCHEMA_FILE=""):
+            response = self.client.get("/api/schema/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b"openapi", response.content)
+
+    def test_schema_documents_viewsets_without_models(self):
+        with override_settings(OPENAPI_SCHEMA_FILE=""):
+            paths = json.loads(self.client.get("/api/schema/", HTTP_ACCEPT="application/vnd.oai.openapi+json").content)["paths"]
+        self.assertIn("/api/batch/", paths)
+        self.assertIn("/api/changes/ack/", paths)
+        self.assertIn("/api/metrics/", paths)
+        feed = paths["/api/changes/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        self.assertEqual(feed, {"$ref": "#/components/schemas/ChangeFeed"})
+
+    def test_lazy_view_imports_on_first_call(self):
+        with mock.patch("meme.views.import_string") as import_string:
+            view = lazy_view("some.module.View")
+            import_string.assert_not_called()
+            view(APIRequestFactory().get("/"))
+            view(APIRequestFactory().get("/"))
+        import_string.assert_called_once_with("some.module.View")
+
+
+class ChangeFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username="admin", password="admin123", email="admin@example.com", role="admin")
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+
+    def test_changes_are_recorded_in_order(self):
+        coin = Coin.objects.create(name="Test Coin", symbol="TC", description="Test", created_by=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.client.post("/api/votes/", {"user": self.user.id, "coin": coin.id, "vote_type": "upvote"})
+        coin_id = coin.id
+        coin.delete()
+        events = list(ChangeEvent.objects.order_by("pk").values_list("label", "operation"))
+        self.assertEqual(events, [
+            ("meme.coin", "create"), ("meme.vote", "create"), ("meme.coin", "update"),
+            ("meme.vote", "delete"), ("meme.coin", "delete"),
+        ])
+        self.assertEqual(ChangeEvent.objects.filter(label="meme.vote").first().payload["coin_id"], coin_id)
+
+    def test_rolled_back_change_leaves_no_event(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Coin.objects.create(name="Test Coin", symbol="TC", description="Test", created_by=self.user)
+            raise RuntimeError
+        self.assertFalse(ChangeEvent.objects.exists())
+
+    def test_consumer_reads_in_batches_and_resumes_from_offset(self):
+        for i in range(5):
+            Post.objects.create(title=f"Post {i}", content="Content", author=self.user)
+        response = self.client.get("/api/changes/?limit=3&models=meme.post")
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertTrue(response.data["has_more"])
+        self.client.post("/api/changes/ack/", {"consumer": "search", "offset": response.data["next"]})
+        response = self.client.get("/api/changes/?consumer=search")
+        self.assertEqual([event["payload"]["title"] for event in response.data["results"]], ["Post 3", "Post 4"])
+        self.assertFalse(response.data["has_more"])
+
+    def test_event_committed_after_a_later_id_is_not_skipped(self):
+        # Ids are handed out at insert: id 10 commits and is consumed before
+        # the transaction holding id 5 commits
+        ChangeEvent.objects.create(id=10, label="meme.post", object_id="2", operation="create", payload={})
+        events, _ = outbox.read()
+        outbox.acknowledge("search", events[-1]["offset"])
+        ChangeEvent.objects.create(id=5, label="meme.post", object_id="1", operation="create", payload={})
+        events, _ = outbox.read(outbox.get_offset("search"))
+        self.assertEqual([event["id"] for event in events], [5])
+        self.assertGreater(events[0]["offset"], outbox.get_offset("search"))
+
+    def test_compaction_keeps_latest_event_per_object(self):
+        post = Post.objects.create(title="Draft", content="Content", author=self.user)
+        for title in ("Edit 1", "Edit 2"):
+            post.title = title
+            post.save()
+        self.assertEqual(outbox.compact(), 2)
+        event = ChangeEvent.objects.get()
+        self.assertEqual((event.operation, event.payload["title"]), ("update", "Edit 2"))
+
+    def test_change_feed_is_admin_only(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get("/api/changes/").status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RetentionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.coins = [Coin.objects.create(name=f"Coin {i}", symbol=f"C{i}", description="Test", created_by=cls.user) for i in range(3)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def age(self, queryset, days):
+        queryset.update(created_at=timezone.now() - datetime.timedelta(days=days))
+
+    def test_purges_only_old_read_notifications_in_batches(self):
+        for read in (True, True, True, False):
+            Notification.objects.create(user=self.user, content="Hello", read=read)
+        self.age(Notification.objects.all(), 60)
+        Notification.objects.create(user=self.user, content="Recent", read=True)
+        policy = RetentionPolicy("meme.notification", days=30, filter={"read": True})
+        report = purge(policy, dry_run=True)
+        self.assertEqual(report.rows, 3)
+        self.assertEqual(Notification.objects.count(), 5)
+        self.assertEqual(purge(policy, batch_size=2).rows, 3)
+        self.assertEqual(sorted(Notification.objects.values_list("content", "read")), [("Hello", False), ("Recent", True)])
+
+    def test_archived_votes_still_count(self):
+        for coin in self.coins:
+            Vote.objects.create(user=self.user, coin=coin, vote_type="upvote")
+        self.age(Vote.objects.filter(coin__in=self.coins[:2]), 400)
+        self.assertEqual(purge(RetentionPolicy("meme.vote", days=365, archive=True)).rows, 2)
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(VoteArchive.objects.count(), 2)
+        update_vote_totals([coin.pk for coin in self.coins])
+        self.assertEqual(list(Coin.objects.order_by("pk").values_list("total_votes", flat=True)), [1, 1, 1])
+
+    def test_archived_votes_are_recorded_in_the_change_feed(self):
+        votes = [Vote.objects.create(user=self.user, coin=coin, vote_type="upvote") for coin in self.coins]
+        self.age(Vote.objects.filter(coin__in=self.coins[:2]), 400)
+        after = outbox.latest_offset()
+        purge(RetentionPolicy("meme.vote", days=365, archive=True), batch_size=1)
+        events, _ = outbox.read(after, labels=["meme.vote"])
+        self.assertEqual([(event["operation"], event["object_id"]) for event in events], [("delete", str(vote.pk)) for vote in votes[:2]])
+        self.assertEqual(events[0]["payload"]["coin_id"], self.coins[0].pk)
+
+    def test_voting_again_on_an_archived_vote_unvotes(self):
+        coin = self.coins[0]
+        self.client.post("/api/votes/", {"user": self.user.id, "coin": coin.id, "vote_type": "upvote"})
+        self.age(Vote.objects.all(), 400)
+        purge(RetentionPolicy("meme.vote", days=365, archive=True))
+        self.client.post("/api/votes/", {"user": self.user.id, "coin": coin.id, "vote_type": "upvote"})
+        self.assertFalse(Vote.objects.exists())
+        self.assertFalse(VoteArchive.objects.exists())
+        coin.refresh_from_db()
+        self.assertEqual(coin.total_votes, 0)
+
+    def test_purges_old_rotated_log_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log = Path(directory) / "debug.log"
+            for name in ("debug.log", "debug.log.1", "debug.log.2"):
+                (Path(directory) / name).write_text("x" * 10)
+            old = (timezone.now() - datetime.timedelta(days=30)).timestamp()
+            os.utime(log.with_name("debug.log.2"), (old, old))
+            report = purge(RetentionPolicy("logs", days=14, path=log))
+            self.assertEqual((report.rows, report.bytes), (1, 10))
+            self.assertEqual(sorted(path.name for path in Path(directory).iterdir()), ["debug.log", "debug.log.1"])
+
+
+class NoteSyncTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.other = User.objects.create_user(username="other", password="password123", email="other@example.com")
+        cls.notes = [Note.objects.create(user=cls.user, title=f"Note {i}", content="Content") for i in range(3)]
+        Note.objects.create(user=cls.other, title="Private", content="Content")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_full_sync_returns_every_note(self):
+        response = self.client.get("/api/notes/sync/")
+        self.assertTrue(response.data["reset"])
+        self.assertEqual([note["title"] for note in response.data["changed"]], ["Note 0", "Note 1", "Note 2"])
+        self.assertEqual(response.data["deleted"], [])
+
+    def test_delta_contains_only_changes_since_token(self):
+        token = self.client.get("/api/notes/sync/").data["token"]
+        self.notes[1].title = "Edited"
+        self.notes[1].save()
+        deleted_id = self.notes[2].pk
+        self.client.delete(f"/api/notes/{deleted_id}/")
+        response = self.client.get("/api/notes/sync/", {"since": token})
+        self.assertFalse(response.data["reset"])
+        self.assertEqual([note["title"] for note in response.data["changed"]], ["Edited"])
+        self.assertEqual(response.data["deleted"], [deleted_id])
+        response = self.client.get("/api/notes/sync/", {"since": response.data["token"]})
+        self.assertEqual((response.data["changed"], response.data["deleted"]), ([], []))
+
+    def test_delta_pages_with_limit(self):
+        token = self.client.get("/api/notes/sync/").data["token"]
+        for note in self.notes:
+            note.save()
+        response = self.client.get("/api/notes/sync/", {"since": token, "limit": 2})
+        self.assertEqual(len(response.data["changed"]), 2)
+        self.assertTrue(response.data["has_more"])
+        response = self.client.get("/api/notes/sync/", {"since": response.data["token"], "limit": 2})
+        self.assertEqual([note["id"] for note in response.data["changed"]], [self.notes[2].pk])
+        self.assertFalse(response.data["has_more"])
+
+    def test_changes_committed_during_a_sync_wait_for_the_next_one(self):
+        token = self.client.get("/api/notes/sync/").data["token"]
+        deleted_id = self.notes[1].pk
+        filter_tombstones = NoteTombstone.objects.filter
+
+        def other_device(*args, **kwargs):
+            # Another device saves a note, then deletes one, between the two reads
+            self.notes[0].title = "Edited"
+            self.notes[0].save()
+            self.notes[1].delete()
+            return filter_tombstones(*args, **kwargs)
+
+        with mock.patch.object(NoteTombstone.objects, "filter", side_effect=other_device):
+            response = self.client.get("/api/notes/sync/", {"since": token})
+        self.assertEqual((response.data["changed"], response.data["deleted"]), ([], []))
+        response = self.client.get("/api/notes/sync/", {"since": response.data["token"]})
+        self.assertEqual([note["title"] for note in response.data["changed"]], ["Edited"])
+        self.assertEqual(response.data["deleted"], [deleted_id])
+
+    def test_invalid_and_expired_tokens(self):
+        self.assertEqual(self.client.get("/api/notes/sync/", {"since": "forged"}).status_code, status.HTTP_400_BAD_REQUEST)
+        token = self.client.get("/api/notes/sync/").data["token"]
+        with override_settings(NOTES_SYNC_MAX_AGE_DAYS=-1):
+            self.assertTrue(self.client.get("/api/notes/sync/", {"since": token}).data["reset"])
+
+
+class CoinAutocompleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        for name, symbol, votes in [("Doge Coin", "DOGE", 50), ("Dogelon Mars", "ELON", 80), ("Shiba Inu", "SHIB", 30), ("Pepe", "PEPE", 10)]:
+            Coin.objects.create(name=name, symbol=symbol, description="Test", created_by=cls.user, total_votes=votes)
+
+    def setUp(self):
+        autocomplete.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def search(self, query):
+        return [coin["symbol"] for coin in self.client.get("/api/coins/autocomplete/", {"q": query}).data]
+
+    def test_prefix_matches_ranked_by_votes(self):
+        self.assertEqual(self.search("dog"), ["ELON", "DOGE"])
+        self.assertEqual(self.search("SHI"), ["SHIB"])
+        self.assertEqual(self.search("mars"), ["ELON"])
+
+    def test_answers_without_queries_once_built(self):
+        autocomplete.coin_index()
+        with self.assertNumQueries(0):
+            autocomplete.coin_index().search("pe")
+
+    def test_typo_fallback(self):
+        self.assertEqual(self.search("shoba"), ["SHIB"])
+        self.assertEqual(self.search("xyz"), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        autocomplete.coin_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            coin = Coin.objects.create(name="Bonk", symbol="BNK", description="Test", created_by=self.user, total_votes=100)
+        self.assertEqual(self.search("bo"), ["BNK"])
+        coin.name = "Wif"
+        with self.captureOnCommitCallbacks(execute=True):
+            coin.save()
+        self.assertEqual((self.search("bo"), self.search("wi")), ([], ["BNK"]))
+        with self.captureOnCommitCallbacks(execute=True):
+            Coin.objects.get(symbol="PEPE").delete()
+        self.assertEqual(self.search("pep"), [])
+
+    def test_rolled_back_changes_leave_the_index_alone(self):
+        autocomplete.coin_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Coin.objects.create(name="Phantom", symbol="PHAN", description="Test", created_by=self.user)
+                    Coin.objects.get(symbol="PEPE").delete()
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+        self.assertEqual((self.search("phan"), self.search("pep")), ([], ["PEPE"]))
+
+    def test_search_waits_for_updates(self):
+        index = autocomplete.coin_index()
+        results = []
+        with index.lock:
+            searcher = threading.Thread(target=lambda: results.append(index.search("pep")))
+            searcher.start()
+            searcher.join(0.05)
+            self.assertTrue(searcher.is_alive())
+            # What remove() does once it holds the lock
+            pk = Coin.objects.get(symbol="PEPE").pk
+            index._remove_keys(pk, index.coins.pop(pk))
+        searcher.join()
+        self.assertEqual(results, [[]])
+
+    def test_catches_up_with_changes_from_other_processes(self):
+        autocomplete.coin_index()
+        # As another worker would: the change reaches this process only through the outbox
+        with mock.patch("meme.autocomplete.apply_change"):
+            Coin.objects.create(name="Bonk", symbol="BONK", description="Test", created_by=self.user)
+        self.assertEqual(self.search("bonk"), [])
+        with override_settings(AUTOCOMPLETE_REFRESH_SECONDS=0):
+            self.assertEqual(self.search("bonk"), ["BONK"])
+
+
+class RecommendationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f"user{i}", password="password123") for i in range(4)]
+        cls.coins = [Coin.objects.create(name=f"Coin {i}", symbol=f"C{i}", description="Test", created_by=cls.users[0]) for i in range(4)]
+        # Coins 0 and 1 share three upvoters, 0 and 2 one; coin 3 only gets downvotes
+        for user, coin in [(0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1), (3, 1), (0, 2)]:
+            Vote.objects.create(user=cls.users[user], coin=cls.coins[coin], vote_type="upvote")
+        Vote.objects.create(user=cls.users[3], coin=cls.coins[3], vote_type="downvote")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.users[0])
+
+    def neighbors(self, vectorized):
+        matrix = recommendations.build_matrix(recommendations.stream_upvotes(chunk_size=3), vectorized)
+        ids = [coin.pk for coin in self.coins]
+        return {ids.index(coin): [(ids.index(other), round(score, 4)) for other, score in best]
+                for coin, best in matrix.neighbors(ids).items()}
+
+    def test_cosine_similarity_of_upvoters(self):
+        self.assertEqual(self.neighbors(vectorized=False), {
+            0: [(1, 0.866), (2, 0.5774)],
+            1: [(0, 0.866), (2, 0.5)],
+            2: [(0, 0.5774), (1, 0.5)],
+            3: [],
+        })
+
+    @skipIf(recommendations.np is None, "numpy and scipy are not installed")
+    def test_vectorized_matches_python(self):
+        self.assertEqual(self.neighbors(vectorized=True), self.neighbors(vectorized=False))
+
+    def test_similar_endpoint_and_incremental_refresh(self):
+        self.assertEqual(recommendations.refresh(full=True, vectorized=False), 3)
+        response = self.client.get(f"/api/coins/{self.coins[0].pk}/similar/")
+        self.assertEqual([coin["id"] for coin in response.data], [self.coins[1].pk, self.coins[2].pk])
+        self.assertEqual(recommendations.refresh(vectorized=False), 0)
+        Vote.objects.create(user=self.users[3], coin=self.coins[2], vote_type="upvote")
+        # Only the new vote's voters are read, not the whole vote table
+        with mock.patch("meme.recommendations.stream_upvotes") as stream_upvotes:
+            self.assertEqual(recommendations.refresh(vectorized=False), 1)
+        stream_upvotes.assert_not_called()
+        incremental = recommendations.similar(self.coins[2].pk)
+        recommendations.refresh(full=True, vectorized=False)
+        self.assertEqual(incremental, recommendations.similar(self.coins[2].pk))
+        self.assertEqual(CoinNeighbors.objects.get(coin=self.coins[2]).voters, 2)
+
+
+class VoteRingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f"user{i}", password="password123") for i in range(5)]
+        cls.moderator = User.objects.create_user(username="mod", password="password123", role="moderator")
+        cls.coins = [Coin.objects.create(name=f"Coin {i}", symbol=f"C{i}", description="Test", created_by=cls.users[0]) for i in range(4)]
+        # Start on a slot boundary so votes a minute apart share a slot
+        start = timezone.now() - datetime.timedelta(days=1)
+        start -= datetime.timedelta(seconds=start.timestamp() % voterings.WINDOW)
+        # Users 0-2 upvote coins 0-2 within minutes of each other, one coin
+        # an hour; user 3 upvotes the same coins hours later and user 4 joins
+        # them on one coin only, too little to be linked
+        votes = [(user, coin, coin * 60 + user) for user in range(3) for coin in range(3)]
+        votes += [(3, coin, 600 + coin * 60) for coin in range(3)] + [(4, 0, 1)]
+        for user, coin, minutes in votes:
+            vote = Vote.objects.create(user=cls.users[user], coin=cls.coins[coin], vote_type="upvote")
+            Vote.objects.filter(pk=vote.pk).update(created_at=start + datetime.timedelta(minutes=minutes))
+        Coin.objects.filter(pk=cls.coins[0].pk).update(total_votes=5)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.moderator)
+
+    def rings(self, vectorized):
+        return voterings.build_detector(voterings.stream_votes(chunk_size=4), vectorized=vectorized).rings()
+
+    def test_finds_accounts_voting_together(self):
+        ids = [user.pk for user in self.users]
+        coins = [coin.pk for coin in self.coins]
+        self.assertEqual(self.rings(vectorized=False), [
+            voterings.Ring(ids[:3], {coins[0]: 3, coins[1]: 3, coins[2]: 3}, 9, 3),
+        ])
+
+    @skipIf(voterings.np is None, "numpy and scipy are not installed")
+    def test_vectorized_matches_python(self):
+        self.assertEqual(self.rings(vectorized=True), self.rings(vectorized=False))
+
+    def test_review_keeps_decision_across_runs(self):
+        voterings.detect(vectorized=False)
+        ring = VoteRing.objects.get()
+        response = self.client.get("/api/vote-rings/tallies/")
+        self.assertEqual(response.data[0], {"coin": self.coins[0].pk, "total_votes": 5, "ring_votes": 3, "corrected_votes": 2})
+        response = self.client.post(f"/api/vote-rings/{ring.pk}/dismiss/")
+        self.assertEqual(response.data["status"], "dismissed")
+        voterings.detect(vectorized=False)
+        self.assertEqual(VoteRing.objects.get().status, "dismissed")
+        self.assertEqual(self.client.get("/api/vote-rings/tallies/").data, [])
+
+    def test_confirmed_ring_that_gains_a_member_is_not_counted_twice(self):
+        voterings.detect(vectorized=False)
+        ring = VoteRing.objects.get()
+        self.client.post(f"/api/vote-rings/{ring.pk}/confirm/")
+        # User 4 now votes along with the ring on coins 1 and 2 as well
+        for coin in self.coins[1:3]:
+            moment = Vote.objects.filter(user=self.users[0], coin=coin).values_list("created_at", flat=True).get()
+            vote = Vote.objects.create(user=self.users[4], coin=coin, vote_type="upvote")
+            Vote.objects.filter(pk=vote.pk).update(created_at=moment + datetime.timedelta(minutes=4))
+        voterings.detect(vectorized=False)
+        ring = VoteRing.objects.get()
+        self.assertEqual((ring.status, len(ring.member_ids)), ("confirmed", 4))
+        response = self.client.get("/api/vote-rings/tallies/")
+        self.assertEqual(response.data[0]["ring_votes"], 4)
+
+    def test_moderators_only(self):
+        self.client.force_authenticate(user=self.users[0])
+        self.assertEqual(self.client.get("/api/vote-rings/").status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BatchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.coin = Coin.objects.create(name="Dogecoin", symbol="DOGE", description="Test", created_by=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def batch(self, *requests):
+        return self.client.post("/api/batch/", {"requests": list(requests)}, format="json")
+
+    def test_sub_requests_run_in_order(self):
+        response = self.batch(
+            {"path": "/api/coins/?fields=id,name"},
+            {"method": "POST", "path": "/api/notes/", "body": {"title": "Hi", "content": "There", "user": self.user.pk}},
+            {"path": "/api/notes/"},
+            {"path": "/api/coins/999/"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["responses"]
+        self.assertEqual([result["status"] for result in results], [200, 201, 200, 404])
+        self.assertEqual(results[0]["body"], [{"id": self.coin.pk, "name": "Dogecoin"}])
+        self.assertEqual([note["title"] for note in results[2]["body"]], ["Hi"])
+        self.assertIn("ETag", results[0]["headers"])
+
+    def test_each_sub_request_is_throttled(self):
+        response = self.batch({"path": "/api/votes/"}, {"path": "/api/votes/"})
+        remaining = [result["headers"]["X-RateLimit-Remaining"] for result in response.data["responses"]]
+        self.assertEqual(remaining, ["9", "8"])
+        self.assertEqual(response["X-RateLimit-Remaining"], "8")
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_limits(self):
+        self.assertEqual(self.batch(*[{"path": "/api/coins/"}] * 3).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.batch({"path": "/admin/"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.batch({"path": "/api/coins/", "headers": {"Authorization": "x"}}).status_code, status.HTTP_400_BAD_REQUEST)
+        for header in ("X-Forwarded-For", "X-Real-IP", "Forwarded"):
+            response = self.batch({"path": "/api/coins/", "headers": {header: "203.0.113.7"}})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.batch({"method": "POST", "path": "/api/batch/", "body": {"requests": []}})
+        self.assertEqual(response.data["responses"][0]["status"], status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.batch({"path": "/api/coins/"}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(BATCH_WORKERS=2)
+class BatchConcurrencyTest(TransactionTestCase):
+    def test_reads_run_on_worker_threads(self):
+        user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        Coin.objects.create(name="Dogecoin", symbol="DOGE", description="Test", created_by=user)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        threads = []
+        with mock.patch("meme.api.batch.dispatch", side_effect=lambda request: threads.append(threading.current_thread().name) or (200, {}, None)):
+            client.post("/api/batch/", {"requests": [{"path": "/api/coins/"}, {"path": "/api/posts/"}]}, format="json")
+        self.assertTrue(all(name.startswith("batch") for name in threads))
+        response = client.post("/api/batch/", {"requests": [{"path": "/api/coins/"}, {"path": "/api/posts/"}]}, format="json")
+        self.assertEqual([result["status"] for result in response.data["responses"]], [200, 200])
+        self.assertEqual(response.data["responses"][0]["body"][0]["name"], "Dogecoin")
+
+
+class ExpandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f"user{i}", password="password123", email=f"user{i}@example.com") for i in range(3)]
+        for i, user in enumerate(cls.users):
+            Coin.objects.create(name=f"Coin {i}", symbol=f"C{i}", description="Test", created_by=user)
+        cls.post = Post.objects.create(title="Hello", content="World", author=cls.users[0])
+        for user in cls.users:
+            Comment.objects.create(content="Nice", author=user, post=cls.post)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.users[0])
+
+    def test_expands_with_whitelisted_fields(self):
+        response = self.client.get("/api/coins/?expand=created_by")
+        creator = response.data[0]["created_by"]
+        self.assertEqual(creator["username"], "user0")
+        self.assertNotIn("email", creator)
+        self.assertNotIn("role", creator)
+
+    def test_one_query_per_relation(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get("/api/comments/?expand=author,post.author")
+        for user in self.users:
+            Comment.objects.create(content="More", author=user, post=Post.objects.create(title="Again", content="Hi", author=user))
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get("/api/comments/?expand=author,post.author")
+        self.assertEqual(len(few), len(many))
+        comment = response.data["results"][0]
+        self.assertEqual(comment["author"]["username"], "user0")
+        self.assertEqual(comment["post"]["author"]["username"], "user0")
+
+    def test_related_count(self):
+        response = self.client.get(f"/api/posts/{self.post.pk}/?expand=author,comment_count")
+        self.assertEqual(response.data["comment_count"], 3)
+        self.assertEqual(response.data["author"]["id"], self.users[0].pk)
+
+    def test_invalid_expansions(self):
+        for expand in ("description", "created_by.email", "post.author.posts"):
+            self.assertEqual(self.client.get(f"/api/coins/?expand={expand}").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get("/api/posts/?expand=comment_count.id").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_etag_follows_expanded_tables(self):
+        etag = self.client.get("/api/coins/?expand=created_by")["ETag"]
+        self.users[1].username = "renamed"
+        self.users[1].save()
+        self.assertNotEqual(self.client.get("/api/coins/?expand=created_by")["ETag"], etag)
+
+
+class BinaryFormatTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        for i in range(3):
+            Coin.objects.create(name=f"Coin {i}", symbol=f"C{i}", description="Test", created_by=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def round_trip(self, renderer, parser):
+        moment = timezone.now()
+        data = {"at": moment, "price": decimal.Decimal("1.25"), "id": uuid.UUID(int=1), "rows": [{"n": 1}]}
+        parsed = parser.parse(io.BytesIO(renderer.render(data)))
+        self.assertEqual(parsed["at"], moment)
+        self.assertEqual(parsed["rows"], [{"n": 1}])
+        return parsed
+
+    def same_as_json(self, renderer, parser):
+        expected = self.client.get("/api/coins/").json()
+        response = self.client.get("/api/coins/", HTTP_ACCEPT=renderer.media_type)
+        self.assertEqual(response["Content-Type"], renderer.media_type)
+        coins = parser.parse(io.BytesIO(response.content))
+        # Timestamps arrive as native datetimes, everything else as in JSON
+        for coin, json_coin in zip(coins, expected):
+            self.assertIsInstance(coin["created_at"], datetime.datetime)
+            self.assertEqual(coin.pop("created_at"), parse_datetime(json_coin.pop("created_at")))
+        self.assertEqual(coins, expected)
+        body = renderer.render({"title": "Hi", "content": "There", "user": self.user.pk})
+        response = self.client.generic("POST", "/api/notes/", body, content_type=renderer.media_type, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    @skipIf(renderers.msgpack is None, "msgpack is not installed")
+    def test_msgpack(self):
+        parsed = self.round_trip(renderers.MessagePackRenderer(), parsers.MessagePackParser())
+        self.assertEqual(parsed["price"], "1.25")
+        self.assertEqual(parsed["id"], str(uuid.UUID(int=1)))
+        self.same_as_json(renderers.MessagePackRenderer(), parsers.MessagePackParser())
+
+    @skipIf(renderers.cbor2 is None, "cbor2 is not installed")
+    def test_cbor(self):
+        parsed = self.round_trip(renderers.CBORRenderer(), parsers.CBORParser())
+        self.assertEqual(parsed["price"], "1.25")
+        self.assertEqual(parsed["id"], uuid.UUID(int=1))
+        self.same_as_json(renderers.CBORRenderer(), parsers.CBORParser())
+
+class MyVoteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123", email="test@example.com")
+        cls.other = User.objects.create_user(username="other", password="password123", email="other@example.com")
+        cls.coins = [Coin.objects.create(name=f"Coin {i}", symbol=f"C{i}", description="Test", created_by=cls.user) for i in range(3)]
+        Vote.objects.create(user=cls.user, coin=cls.coins[0], vote_type="upvote")
+        VoteArchive.objects.create(id=1000, user=cls.user, coin=cls.coins[1], vote_type="downvote", created_at=timezone.now())
+        cls.other_vote = Vote.objects.create(user=cls.other, coin=cls.coins[2], vote_type="upvote")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_coin_list_and_retrieve(self):
+        response = self.client.get("/api/coins/")
+        self.assertEqual([coin["my_vote"] for coin in response.data], ["upvote", "downvote", None])
+        response = self.client.get(f"/api/coins/{self.coins[0].pk}/")
+        self.assertEqual(response.data["my_vote"], "upvote")
+        self.assertNotIn("my_vote", self.client.get("/api/coins/?fields=id,name").data[0])
+
+    def test_sparse_fieldsets_without_id(self):
+        response = self.client.get("/api/coins/?fields=name,my_vote")
+        self.assertEqual(response.data[:2], [{"name": "Coin 0", "my_vote": "upvote"}, {"name": "Coin 1", "my_vote": "downvote"}])
+        self.assertEqual(self.client.get("/api/coins/?fields=my_vote").data[0], {"my_vote": "upvote"})
+        response = self.client.get(f"/api/coins/{self.coins[1].pk}/?exclude=id")
+        self.assertNotIn("id", response.data)
+        self.assertEqual(response.data["my_vote"], "downvote")
+
+    def test_one_query_per_page(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get("/api/coins/")
+        for i in range(5):
+            Vote.objects.create(user=self.user, coin=Coin.objects.create(name=f"More {i}", symbol=f"M{i}", description="Test", created_by=self.user), vote_type="upvote")
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get("/api/coins/")
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(response.data[-1]["my_vote"], "upvote")
+
+    def test_vote_changes_list_etag(self):
+        etag = self.client.get("/api/coins/")["ETag"]
+        Vote.objects.create(user=self.user, coin=self.coins[2], vote_type="downvote")
+        response = self.client.get("/api/coins/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[2]["my_vote"], "downvote")
+
+    def test_vote_list_is_scoped_to_user(self):
+        response = self.client.get("/api/votes/")
+        self.assertEqual([vote["coin"] for vote in response.data], [self.coins[0].pk])
+        response = self.client.get(f"/api/votes/{self.other_vote.pk}/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_mine(self):
+        ids = [coin.pk for coin in reversed(self.coins)]
+        response = self.client.get(f"/api/votes/mine/?coins={','.join(map(str, ids))}")
+        self.assertEqual(response.data, [
+            {"coin": ids[0], "vote_type": None},
+            {"coin": ids[1], "vote_type": "downvote"},
+            {"coin": ids[2], "vote_type": "upvote"},
+        ])
+        # Not counted against the voting rate limit
+        self.assertEqual(response["X-RateLimit-Limit"], "1000")
+        self.assertEqual(self.client.get("/api/votes/mine/?coins=1,x").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get("/api/votes/mine/").status_code, status.HTTP_400_BAD_REQUEST)
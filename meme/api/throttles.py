@@ -1,5 +1,46 @@
 # throttles.py
-from rest_framework.throttling import UserRateThrottle
+from rest_framework import throttling
+
+from .ratelimit import get_backend
+
+
+class SlidingWindowThrottleMixin:
+    """
+    Replaces DRF's cached list of request timestamps with a sliding-window
+    counter kept in the shared rate limit backend (see ratelimit.py).
+    """
+    result = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        self.result = get_backend().hit(self.key, self.num_requests, self.duration, self.now)
+
+        # Keep the tightest limit for the X-RateLimit-* headers
+        current = getattr(request._request, "ratelimit", None)
+        if current is None or self.result.remaining < current.remaining or not self.result.allowed:
+            request._request.ratelimit = self.result
+        return self.result.allowed
+
+    def wait(self):
+        if self.result is None:
+            return None
+        return self.result.retry_after
+
+
+class UserRateThrottle(SlidingWindowThrottleMixin, throttling.UserRateThrottle):
+    pass
+
+
+class AnonRateThrottle(SlidingWindowThrottleMixin, throttling.AnonRateThrottle):
+    pass
+
 
 class VoteThrottle(UserRateThrottle):
     scope = "vote"  # Custom scope for voting
@@ -1,58 +1,109 @@
 import logging
 from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from django.utils import timezone
 
-from ..models import User, Coin, Vote, Community, Post, Comment, Note, Rating, Badge, UserBadge, Notification, Analytics
-from .serializers import UserSerializer, CoinSerializer, VoteSerializer, CommunitySerializer, PostSerializer, CommentSerializer, NoteSerializer, RatingSerializer, BadgeSerializer, UserBadgeSerializer, NotificationSerializer, AnalyticsSerializer
+from . import batch
+from .. import autocomplete, metrics, outbox, recommendations, sync, voterings
+from ..votes import restore_vote, user_votes
+from ..models import User, Coin, Vote, VoteRing, Community, Post, Comment, Note, Rating, Badge, UserBadge, Notification, Analytics
+from .serializers import parse_field_list, UserSerializer, CoinSerializer, VoteSerializer, VoteRingSerializer, CommunitySerializer, PostSerializer, CommentSerializer, NoteSerializer, RatingSerializer, BadgeSerializer, UserBadgeSerializer, NotificationSerializer, AnalyticsSerializer, BatchSerializer, ChangeAckSerializer, ChangeFeedSerializer, RouteMetricsSerializer
 
-from .permissions import IsAdminUser, IsModeratorOrAdmin, IsOwnerOrReadOnly
-from .throttles import VoteThrottle, PostThrottle
+from .mixins import ConditionalListMixin, ExpandViewMixin, FastListMixin, MyVoteMixin, OwnedQuerysetMixin, SparseFieldsetViewMixin
+from .permissions import IsAdminUser, IsModeratorOrAdmin, IsOwnerOrReadOnly, get_policy
+from .throttles import UserRateThrottle, VoteThrottle, PostThrottle
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.pagination import PageNumberPagination
 
-# Configure logging
-logger = logging.getLogger("django")
+# Configure logging: messages are formatted lazily on the logging thread,
+# vote events go to a sampled logger
+logger = logging.getLogger("app")
+vote_logger = logging.getLogger("app.votes")
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+
+def int_param(data, name, default=None):
+    value = data.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: "A valid integer is required."})
+
 # User ViewSet
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]  # Only Admins can manage users
 
 # Coin ViewSet
-class CoinViewSet(viewsets.ModelViewSet):
+class CoinViewSet(ExpandViewMixin, MyVoteMixin, ConditionalListMixin, FastListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Coin.objects.all()
     serializer_class = CoinSerializer
+    read_from_replica = True
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['category']
     search_fields = ['name', 'symbol']
     ordering_fields = ['total_votes', 'created_at']
 
     def get_permissions(self):
-        if self.action in ["create", "update", "destroy"]:
+        if self.action in ["create", "update", "partial_update", "destroy"]:
             return [IsAdminUser()]  # Only Admins can modify coins
         return [permissions.IsAuthenticated()]  # Authenticated users can view coins
 
+    @action(detail=False, methods=["get"], url_path="autocomplete")
+    def complete(self, request):
+        # Coin picker: ?q= prefix matches from the in-process index, no SQL
+        limit = int_param(request.query_params, "limit", autocomplete.DEFAULT_LIMIT)
+        limit = max(1, min(limit, autocomplete.MAX_LIMIT))
+        return Response(autocomplete.coin_index().search(request.query_params.get("q", ""), limit))
+
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        # Coins most upvoted by this coin's upvoters, precomputed by `manage.py recommendations`
+        neighbors = recommendations.similar(self.get_object().pk)
+        coins = Coin.objects.in_bulk([coin_id for coin_id, _ in neighbors])
+        neighbors = [(coins[coin_id], score) for coin_id, score in neighbors if coin_id in coins]
+        data = self.get_serializer([coin for coin, _ in neighbors], many=True).data
+        return Response([{**coin, "score": score} for coin, (_, score) in zip(data, neighbors)])
+
     def perform_destroy(self, instance):
         # Allow only the creator to delete their coin
-        if instance.created_by != self.request.user:
+        if not get_policy(self.request).owns(instance, "created_by"):
             raise PermissionDenied("You cannot delete a coin you did not create.")
-        logger.info(f"Coin deleted: {instance.name} by {self.request.user.username}")
+        logger.info("Coin deleted: %s by %s", instance.name, self.request.user.username,
+                    extra={"event": "coin.deleted", "coin_id": instance.pk, "user_id": self.request.user.pk})
         instance.delete()
 
 # Vote ViewSet
-class VoteViewSet(viewsets.ModelViewSet):
-    queryset = Vote.objects.all()
+class VoteViewSet(ExpandViewMixin, ConditionalListMixin, FastListMixin, OwnedQuerysetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    queryset = Vote.objects.all()  # Scoped to the requesting user's votes
     serializer_class = VoteSerializer
+    read_from_replica = True
     permission_classes = [permissions.IsAuthenticated]  # Only authenticated users can vote
     throttle_classes = [VoteThrottle]  # Apply vote throttling
+    max_lookup_coins = 100
+
+    @action(detail=False, methods=["get"], throttle_classes=[UserRateThrottle])
+    def mine(self, request):
+        # The user's vote on each coin of ?coins=1,2,3 (None when not voted), archived votes included
+        try:
+            coin_ids = list(dict.fromkeys(int(coin) for coin in parse_field_list(request.query_params.get("coins"))))
+        except ValueError:
+            raise ValidationError({"coins": "A comma-separated list of coin ids is required."})
+        if not coin_ids or len(coin_ids) > self.max_lookup_coins:
+            raise ValidationError({"coins": f"Between 1 and {self.max_lookup_coins} coin ids are required."})
+        votes = user_votes(request.user.pk, coin_ids)
+        return Response([{"coin": coin, "vote_type": votes.get(coin)} for coin in coin_ids])
 
     def perform_create(self, serializer):
         """
@@ -65,129 +116,283 @@ class VoteViewSet(viewsets.ModelViewSet):
 
         # Check if the user has already voted
         existing_vote = Vote.objects.filter(user=user, coin=coin).first()
+        if existing_vote is None:
+            # Votes moved out by the retention job still count
+            existing_vote = restore_vote(user, coin)
         if existing_vote:
             if existing_vote.vote_type == vote_type:
                 # Unvote if the vote type matches
                 existing_vote.delete()
                 coin.total_votes -= 1 if vote_type == "upvote" else -1
-                logger.info(f"Vote removed: {coin.name} by {user.username}")
+                vote_logger.info("Vote removed: %s by %s", coin.name, user.username,
+                                 extra={"event": "vote.removed", "coin_id": coin.pk, "user_id": user.pk})
             else:
                 # Update the vote type
                 existing_vote.vote_type = vote_type
                 existing_vote.save()
-                logger.info(f"Vote updated: {coin.name} by {user.username}")
+                vote_logger.info("Vote updated: %s by %s", coin.name, user.username,
+                                 extra={"event": "vote.updated", "coin_id": coin.pk, "user_id": user.pk})
         else:
             # Create a new vote
             serializer.save(user=user)
             coin.total_votes += 1 if vote_type == "upvote" else -1
-            logger.info(f"Vote created: {coin.name} by {user.username}")
+            vote_logger.info("Vote created: %s by %s", coin.name, user.username,
+                             extra={"event": "vote.created", "coin_id": coin.pk, "user_id": user.pk})
         coin.save()
 
+# VoteRing ViewSet
+class VoteRingViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = VoteRing.objects.order_by("-votes", "pk")
+    serializer_class = VoteRingSerializer
+    permission_classes = [IsModeratorOrAdmin]  # Moderators review rings found by `manage.py vote_rings`
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status']
+
+    def review(self, request, decision):
+        ring = self.get_object()
+        ring.status = decision
+        ring.reviewed_by = request.user
+        ring.reviewed_at = timezone.now()
+        ring.save(update_fields=["status", "reviewed_by", "reviewed_at"])
+        logger.info("Vote ring %s: %s by %s", decision, ring.pk, request.user.username,
+                    extra={"event": f"votering.{decision}", "ring_id": ring.pk, "user_id": request.user.pk})
+        return Response(self.get_serializer(ring).data)
+
+    @action(detail=True, methods=["post"])
+    def confirm(self, request, pk=None):
+        return self.review(request, "confirmed")
+
+    @action(detail=True, methods=["post"])
+    def dismiss(self, request, pk=None):
+        return self.review(request, "dismissed")
+
+    @action(detail=False, methods=["get"])
+    def tallies(self, request):
+        # Coin tallies without the votes of rings that were not dismissed
+        limit = max(1, min(int_param(request.query_params, "limit", 100), 1000))
+        return Response([
+            {"coin": coin, "total_votes": total, "ring_votes": ring_votes, "corrected_votes": corrected}
+            for coin, total, ring_votes, corrected in voterings.corrected_tallies(limit)
+        ])
+
 # Community ViewSet
-class CommunityViewSet(viewsets.ModelViewSet):
+class CommunityViewSet(ExpandViewMixin, ConditionalListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Community.objects.all()
     serializer_class = CommunitySerializer
+    read_from_replica = True
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, SearchFilter]
     search_fields = ['name', 'description']
 
     def get_permissions(self):
-        if self.action in ["update", "destroy"]:
+        if self.action in ["update", "partial_update", "destroy"]:
             return [IsModeratorOrAdmin()]  # Moderators or Admins can modify communities
         return [permissions.IsAuthenticated()]  # Authenticated users can view communities
 
     def perform_create(self, serializer):
         # Automatically set the creator of the community
         community = serializer.save(created_by=self.request.user)
-        logger.info(f"Community created: {community.name} by {self.request.user.username}")
+        logger.info("Community created: %s by %s", community.name, self.request.user.username,
+                    extra={"event": "community.created", "community_id": community.pk, "user_id": self.request.user.pk})
 
 # Post ViewSet
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ExpandViewMixin, ConditionalListMixin, FastListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
+    read_from_replica = True
     permission_classes = [permissions.IsAuthenticated]
     throttle_classes = [PostThrottle]  # Apply post throttling
+    owner_field = "author"  # Checked by IsOwnerOrReadOnly
     pagination_class = StandardResultsSetPagination
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['title', 'content']
     ordering_fields = ['created_at']
 
     def get_permissions(self):
-        if self.action in ["update", "destroy"]:
+        if self.action in ["update", "partial_update", "destroy"]:
             return [IsOwnerOrReadOnly()]  # Only post owners can modify or delete posts
         return super().get_permissions()
 
     def perform_create(self, serializer):
         post = serializer.save(author=self.request.user)
-        logger.info(f"Post created: {post.title} by {self.request.user.username}")
+        logger.info("Post created: %s by %s", post.title, self.request.user.username,
+                    extra={"event": "post.created", "post_id": post.pk, "user_id": self.request.user.pk})
 
     def perform_update(self, serializer):
         post = serializer.save()
-        logger.info(f"Post updated: {post.title} by {self.request.user.username}")
+        logger.info("Post updated: %s by %s", post.title, self.request.user.username,
+                    extra={"event": "post.updated", "post_id": post.pk, "user_id": self.request.user.pk})
 
     def perform_destroy(self, instance):
-        logger.info(f"Post deleted: {instance.title} by {self.request.user.username}")
+        logger.info("Post deleted: %s by %s", instance.title, self.request.user.username,
+                    extra={"event": "post.deleted", "post_id": instance.pk, "user_id": self.request.user.pk})
         instance.delete()
 
 # Comment ViewSet
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ExpandViewMixin, ConditionalListMixin, FastListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    read_from_replica = True
     pagination_class = StandardResultsSetPagination
+    owner_field = "author"  # Checked by IsOwnerOrReadOnly
 
     def get_permissions(self):
-        if self.action in ["update", "destroy"]:
+        if self.action in ["update", "partial_update", "destroy"]:
             return [IsOwnerOrReadOnly()]  # Only comment owners can modify or delete comments
         return [permissions.IsAuthenticated()]  # Authenticated users can view and create comments
 
     def perform_create(self, serializer):
         comment = serializer.save(author=self.request.user)
-        logger.info(f"Comment created by {self.request.user.username}")
+        logger.info("Comment created by %s", self.request.user.username,
+                    extra={"event": "comment.created", "comment_id": comment.pk, "user_id": self.request.user.pk})
 
 # Note ViewSet
-class NoteViewSet(viewsets.ModelViewSet):
+class NoteViewSet(ConditionalListMixin, OwnedQuerysetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Note.objects.all()
     serializer_class = NoteSerializer
     permission_classes = [permissions.IsAuthenticated]
-
-    def get_queryset(self):
-        # Restrict users to their own notes
-        return Note.objects.filter(user=self.request.user)
+    owner_field = "user"  # Restrict users to their own notes
 
     def perform_create(self, serializer):
         note = serializer.save(user=self.request.user)
-        logger.info(f"Note created: {note.title} by {self.request.user.username}")
+        logger.info("Note created: %s by %s", note.title, self.request.user.username,
+                    extra={"event": "note.created", "note_id": note.pk, "user_id": self.request.user.pk})
+
+    @action(detail=False, methods=["get"])
+    def sync(self, request):
+        """
+        Notes saved and deleted since ?since=<token>, or every note without
+        it (and when the token has expired). Follow ``token`` while
+        ``has_more`` is true.
+        """
+        token = request.query_params.get("since")
+        since = None
+        if token:
+            try:
+                since = sync.read_token(token)
+            except sync.InvalidToken:
+                raise ValidationError({"since": "Invalid sync token."})
+        user_id = get_policy(request).user_id
+        limit = int_param(request.query_params, "limit", sync.DEFAULT_LIMIT)
+        notes, deleted, seq, has_more = sync.changes(self.get_queryset(), user_id, since, limit)
+        return Response({
+            "reset": since is None,
+            "changed": self.get_serializer(notes, many=True).data,
+            "deleted": deleted,
+            "token": sync.make_token(seq),
+            "has_more": has_more,
+        })
 
 # Rating ViewSet
-class RatingViewSet(viewsets.ModelViewSet):
+class RatingViewSet(ExpandViewMixin, ConditionalListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Rating.objects.all()
     serializer_class = RatingSerializer
+    read_from_replica = True
     permission_classes = [permissions.IsAuthenticated]  # Any authenticated user can rate others
 
 # Badge ViewSet
-class BadgeViewSet(viewsets.ModelViewSet):
+class BadgeViewSet(ConditionalListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Badge.objects.all()
     serializer_class = BadgeSerializer
+    read_from_replica = True
     permission_classes = [IsAdminUser]  # Only Admins can manage badges
 
 # UserBadge ViewSet
-class UserBadgeViewSet(viewsets.ModelViewSet):
+class UserBadgeViewSet(ExpandViewMixin, ConditionalListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = UserBadge.objects.all()
     serializer_class = UserBadgeSerializer
+    read_from_replica = True
     permission_classes = [IsAdminUser]  # Only Admins can assign badges
 
 # Notification ViewSet
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ConditionalListMixin, FastListMixin, OwnedQuerysetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]  # Notifications are private to users
-
-    def get_queryset(self):
-        # Restrict notifications to the logged-in user
-        return Notification.objects.filter(user=self.request.user)
+    owner_field = "user"  # Restrict notifications to the logged-in user
 
 # Analytics ViewSet
-class AnalyticsViewSet(viewsets.ModelViewSet):
+class AnalyticsViewSet(ExpandViewMixin, ConditionalListMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Analytics.objects.all()
     serializer_class = AnalyticsSerializer
-    permission_classes = [IsAdminUser]  # Only Admins can view analytics
\ No newline at end of file
+    read_from_replica = True
+    permission_classes = [IsAdminUser]  # Only Admins can view analytics
+
+# Metrics ViewSet
+class MetricsViewSet(viewsets.ViewSet):
+    serializer_class = RouteMetricsSerializer  # Documents the rows for the schema
+    permission_classes = [IsAdminUser]  # Only Admins can see request metrics
+
+    def list(self, request):
+        # Per-endpoint latency, query and payload summary for this worker
+        return Response(metrics.registry.summary())
+
+
+# Change ViewSet
+class ChangeViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdminUser]  # Only Admins (downstream services) can read the change feed
+
+    def get_serializer_class(self):
+        # Documents the feed page and the ack body for the schema
+        return ChangeAckSerializer if self.action == "ack" else ChangeFeedSerializer
+
+    @extend_schema(parameters=[
+        OpenApiParameter("after", int, description="Offset to read after."),
+        OpenApiParameter("consumer", str, description="Read after the offset this consumer acknowledged."),
+        OpenApiParameter("limit", int, description=f"Events per page, at most {outbox.MAX_LIMIT}."),
+        OpenApiParameter("models", str, description="Comma-separated model labels, e.g. meme.vote,meme.coin."),
+    ])
+    def list(self, request):
+        """
+        Events after ?after=<offset> (or the stored offset of ?consumer=),
+        at most ?limit=, optionally only for ?models=meme.vote,meme.coin.
+        """
+        params = request.query_params
+        consumer = params.get("consumer")
+        after = int_param(params, "after")
+        if after is None:
+            after = outbox.get_offset(consumer) if consumer else 0
+        limit = int_param(params, "limit", outbox.DEFAULT_LIMIT)
+        events, has_more = outbox.read(after, limit, parse_field_list(params.get("models")))
+        return Response({
+            "results": events,
+            "next": events[-1]["offset"] if events else after,
+            "has_more": has_more,
+        })
+
+    @action(detail=False, methods=["post"])
+    def ack(self, request):
+        # Durable offsets: a consumer stores the last offset it processed
+        consumer = request.data.get("consumer")
+        if not consumer:
+            raise ValidationError({"consumer": "This field is required."})
+        offset = int_param(request.data, "offset")
+        if offset is None:
+            raise ValidationError({"offset": "This field is required."})
+        return Response({"consumer": consumer, "offset": outbox.acknowledge(consumer, offset)})
+
+
+# Batch ViewSet
+class BatchViewSet(viewsets.ViewSet):
+    serializer_class = BatchSerializer  # Documents the body for the schema
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = []  # Each sub-request is throttled by its own view
+    batchable = False
+
+    def create(self, request):
+        """
+        Run {"requests": [{"method", "path", "body", "headers"}, ...]} and
+        answer {"responses": [{"status", "headers", "body"}, ...]} in the
+        same order.
+        """
+        results, built = batch.run(request, batch.parse(request.data))
+        # Pin the client to the primary only when a sub-request wrote
+        request._request.pin_primary = any(batch.wrote(sub, result) for sub, result in zip(built, results))
+        # Report the tightest rate limit a sub-request ran into
+        limits = [sub.ratelimit for sub in built if getattr(sub, "ratelimit", None) is not None]
+        if limits:
+            request._request.ratelimit = min(limits, key=lambda result: (result.allowed, result.remaining))
+        return Response({"responses": [
+            {"status": code, "headers": headers, "body": body} for code, headers, body in results
+        ]})
@@ -0,0 +1,266 @@
+"""
+In-process prefix index for the coin picker (/api/coins/autocomplete/).
+
+Coin names, the words in them and symbols are kept lowercased in one
+sorted list of (key, coin id) pairs, so the coins matching a prefix are a
+contiguous slice found with bisect. Matches are ranked by total_votes.
+When nothing matches, keys within one typo of the query are tried.
+
+The index is built from the database on first use (at startup when the app
+is preloaded, see meme.startup). Coin saves and deletes in this process
+update it through signals; changes made by other processes are picked up
+from the change feed (meme.outbox) at most every AUTOCOMPLETE_REFRESH_SECONDS,
+or by a rebuild when the outbox is disabled. AUTOCOMPLETE_MAX_COINS bounds
+memory: beyond it only the most voted coins are indexed.
+"""
+import bisect
+import heapq
+import itertools
+import string
+import threading
+import time
+
+from django.conf import settings
+
+from . import outbox
+from .models import Coin
+from .versions import get_versions
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Keys are cut to this many characters; longer queries match on the cut
+KEY_LENGTH = 32
+
+# Entries looked at per query: ranking a huge slice or a typo search stops
+# here
+MAX_SCAN = 2000
+
+# Prefixes this short match large slices; their top MAX_LIMIT coins are
+# ranked over the whole slice once and cached until one of them changes.
+# The cache is emptied when it holds more than MAX_CACHED_PREFIXES.
+CACHED_PREFIX_LENGTH = 3
+MAX_CACHED_PREFIXES = 20000
+
+# Characters tried by the typo fallback
+ALPHABET = string.ascii_lowercase + string.digits
+
+
+def keys_for(name, symbol):
+    name = name.lower()
+    keys = {name[:KEY_LENGTH], symbol.lower()[:KEY_LENGTH]}
+    keys.update(word[:KEY_LENGTH] for word in name.split()[1:])
+    keys.discard("")
+    return keys
+
+
+def typo_variants(query):
+    """
+    Strings one deletion, substitution or insertion away from ``query``;
+    keys starting with one of them are one typo from matching it.
+    """
+    variants = set()
+    for i in range(len(query)):
+        variants.add(query[:i] + query[i + 1:])
+        for char in ALPHABET:
+            variants.add(query[:i] + char + query[i + 1:])
+            variants.add(query[:i] + char + query[i:])
+    variants.discard(query)
+    variants.discard("")
+    return variants
+
+
+class CoinIndex:
+    """
+    Sorted (key, coin id) entries plus the name, symbol and total_votes of
+    every indexed coin. At most ``max_coins`` coins are held; new coins
+    beyond that wait for the next rebuild. Searches and updates hold
+    ``lock``, so a search never sees an entry whose coin was just removed.
+    """
+
+    def __init__(self, rows=(), max_coins=None):
+        self.entries = []
+        self.coins = {}
+        self.top = {}
+        self.max_coins = max_coins
+        self.lock = threading.Lock()
+        entries = []
+        for pk, name, symbol, total_votes in rows:
+            self.coins[pk] = (name, symbol, total_votes)
+            entries.extend((key, pk) for key in keys_for(name, symbol))
+        entries.sort()
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.coins)
+
+    def update(self, pk, name, symbol, total_votes):
+        with self.lock:
+            old = self.coins.get(pk)
+            if old is None and self.max_coins is not None and len(self.coins) >= self.max_coins:
+                return
+            self.coins[pk] = (name, symbol, total_votes)
+            self._invalidate(keys_for(name, symbol))
+            if old is not None and (old[0], old[1]) == (name, symbol):
+                return
+            self._remove_keys(pk, old)
+            for key in keys_for(name, symbol):
+                bisect.insort(self.entries, (key, pk))
+
+    def remove(self, pk):
+        with self.lock:
+            self._remove_keys(pk, self.coins.pop(pk, None))
+
+    def _invalidate(self, keys):
+        for key in keys:
+            for length in range(1, CACHED_PREFIX_LENGTH + 1):
+                self.top.pop(key[:length], None)
+
+    def _remove_keys(self, pk, coin):
+        if coin is None:
+            return
+        keys = keys_for(coin[0], coin[1])
+        self._invalidate(keys)
+        for key in keys:
+            index = bisect.bisect_left(self.entries, (key, pk))
+            if index < len(self.entries) and self.entries[index] == (key, pk):
+                del self.entries[index]
+
+    def _best(self, ids, limit):
+        coins = self.coins
+        return heapq.nsmallest(limit, ids, key=lambda pk: (-coins[pk][2], pk))
+
+    def _render(self, ids):
+        coins = self.coins
+        return [{"id": pk, "name": coins[pk][0], "symbol": coins[pk][1], "total_votes": coins[pk][2]} for pk in ids]
+
+    def _prefix(self, query, scan):
+        entries = self.entries
+        start = bisect.bisect_left(entries, (query,))
+        ids = set()
+        for key, pk in entries[start:start + scan] if scan else itertools.islice(entries, start, None):
+            if not key.startswith(query):
+                break
+            ids.add(pk)
+        return ids
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Up to ``limit`` coins whose name, a word of the name or symbol
+        starts with ``query`` (case-insensitive), most voted first; coins
+        within one typo of it when none does.
+        """
+        query = query.strip().lower()[:KEY_LENGTH]
+        if not query:
+            return []
+        with self.lock:
+            return self._search(query, limit)
+
+    def _search(self, query, limit):
+        if len(query) <= CACHED_PREFIX_LENGTH:
+            top = self.top.get(query)
+            if top is None:
+                if len(self.top) >= MAX_CACHED_PREFIXES:
+                    self.top.clear()
+                top = self.top[query] = self._best(self._prefix(query, None), MAX_LIMIT)
+            if top or len(query) < CACHED_PREFIX_LENGTH:
+                return self._render(top[:limit])
+            ids = set()
+        else:
+            ids = self._prefix(query, MAX_SCAN)
+        if not ids:
+            ids = self._typo_matches(query)
+        return self._render(self._best(ids, limit))
+
+    def _typo_matches(self, query):
+        entries = self.entries
+        ids = set()
+        for variant in typo_variants(query):
+            start = bisect.bisect_left(entries, (variant,))
+            if start == len(entries) or not entries[start][0].startswith(variant):
+                continue
+            ids.update(self._prefix(variant, MAX_LIMIT))
+            if len(ids) >= MAX_SCAN // 4:
+                break
+        return ids
+
+
+def load(max_coins=None):
+    """
+    Build a CoinIndex from the database.
+    """
+    if max_coins is None:
+        max_coins = settings.AUTOCOMPLETE_MAX_COINS
+    rows = Coin.objects.order_by("-total_votes", "pk").values_list("pk", "name", "symbol", "total_votes")
+    return CoinIndex(rows[:max_coins].iterator(), max_coins)
+
+
+class State:
+    def __init__(self):
+        self.index = None
+        self.offset = 0
+        self.version = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+
+_state = State()
+
+
+def _rebuild():
+    # Read the position first so no change slips in between
+    _state.offset = outbox.latest_offset() if settings.OUTBOX_ENABLED else 0
+    _state.version = get_versions([Coin])
+    _state.index = load()
+    _state.checked = time.monotonic()
+
+
+def _catch_up():
+    """
+    Apply coin changes made by other processes since the last check.
+    """
+    if not settings.OUTBOX_ENABLED:
+        version = get_versions([Coin])
+        if version != _state.version:
+            _rebuild()
+        return
+    while True:
+        events, has_more = outbox.read(_state.offset, outbox.MAX_LIMIT, ["meme.coin"])
+        for event in events:
+            apply_change(event["operation"], event["payload"])
+        if events:
+            _state.offset = events[-1]["offset"]
+        if not has_more:
+            return
+
+
+def coin_index():
+    """
+    The process-wide CoinIndex, built on first use and refreshed from other
+    processes' changes every AUTOCOMPLETE_REFRESH_SECONDS.
+    """
+    if _state.index is None or time.monotonic() - _state.checked > settings.AUTOCOMPLETE_REFRESH_SECONDS:
+        with _state.lock:
+            if _state.index is None:
+                _rebuild()
+            elif time.monotonic() - _state.checked > settings.AUTOCOMPLETE_REFRESH_SECONDS:
+                _catch_up()
+                _state.checked = time.monotonic()
+    return _state.index
+
+
+def apply_change(operation, payload):
+    index = _state.index
+    if index is None:
+        return
+    if operation == "delete":
+        index.remove(payload["id"])
+    elif "name" in payload:
+        index.update(payload["id"], payload["name"], payload["symbol"], payload["total_votes"])
+
+
+def reset():
+    """
+    Drop the index; the next query rebuilds it.
+    """
+    _state.index = None
@@ -0,0 +1,93 @@
+"""
+Micro-benchmarks for performance-sensitive code paths.
+
+Modules in this package register functions with ``@benchmark("name")``.
+Each function returns a dict of measurements and is run by
+``python manage.py benchmark [name ...]`` against a throwaway test database.
+Metric names end in a unit; the suffix tells ``compare()`` whether a
+larger value is better. Error counts (``errors``, ``*_errors``) have no
+unit: any increase is a regression.
+"""
+import importlib
+import pkgutil
+import statistics
+import time
+
+REGISTRY = {}
+
+# Run options set by the management command (--scale, --requests, --seed)
+CONFIG = {"scale": 1.0, "requests": 200, "seed": 0}
+
+HIGHER_IS_BETTER = ("_per_s", "_rps")
+LOWER_IS_BETTER = ("_ms", "_us", "_bytes")
+ERROR_COUNTS = ("errors", "_errors")
+
+
+def benchmark(name):
+    def register(func):
+        REGISTRY[name] = func
+        return func
+    return register
+
+
+def discover():
+    """
+    Import every benchmark module so their functions get registered.
+    """
+    for module in pkgutil.iter_modules(__path__):
+        importlib.import_module(f"{__name__}.{module.name}")
+    return REGISTRY
+
+
+def per_call(func, number):
+    """
+    Return the average wall-clock seconds of ``number`` calls to ``func``.
+    """
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) / number
+
+
+def latency_summary(samples, elapsed):
+    """
+    Throughput and p50/p95/p99 latencies for per-request ``samples`` (in
+    seconds) taken over ``elapsed`` seconds.
+    """
+    if len(samples) < 2:
+        cuts = [samples[0] if samples else 0.0] * 99
+    else:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Return (benchmark, metric, old, new, change) for every metric that got
+    worse than ``baseline`` by more than ``threshold`` (a fraction), and
+    every error count that went up at all. Growth from a zero baseline is
+    an infinite change.
+    """
+    regressions = []
+    for name, metrics in current.items():
+        for metric, new in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if not isinstance(old, (int, float)):
+                continue
+            change = (new - old) / abs(old) if old else (float("inf") if new > old else 0.0)
+            if metric.endswith(ERROR_COUNTS):
+                worse = new > old
+            elif metric.endswith(HIGHER_IS_BETTER):
+                worse = change < -threshold
+            elif metric.endswith(LOWER_IS_BETTER):
+                worse = change > threshold
+            else:
+                continue
+            if worse:
+                regressions.append((name, metric, old, new, change))
+    return regressions
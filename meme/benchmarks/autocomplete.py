@@ -0,0 +1,95 @@
+import random
+import time
+import tracemalloc
+
+from django.db.models import Q
+from rest_framework.test import APIClient
+
+from meme import autocomplete
+from meme.models import User, Coin
+from . import CONFIG, benchmark, per_call
+
+COINS = 20000
+QUERIES = 200
+SYLLABLES = ["do", "ge", "shi", "ba", "pe", "mo", "on", "ka", "lu", "na", "bo", "nk", "fl", "ok", "ti", "ra", "zu", "mi"]
+
+
+def _name(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def _queries(names, rng):
+    """
+    What a user types: prefixes of one to five letters of real names, one
+    in ten with a typo.
+    """
+    queries = []
+    for _ in range(QUERIES):
+        query = rng.choice(names)[:rng.randint(1, 5)].lower()
+        if len(query) >= 3 and rng.random() < 0.1:
+            position = rng.randrange(1, len(query))
+            query = query[:position] + "x" + query[position + 1:]
+        queries.append(query)
+    return queries
+
+
+@benchmark("autocomplete")
+def coin_autocomplete():
+    """
+    Per-keystroke cost of the coin picker: SearchFilter's icontains query
+    and the ?search= endpoint versus the in-process prefix index and the
+    /autocomplete/ endpoint.
+    """
+    rng = random.Random(CONFIG["seed"])
+    count = int(COINS * CONFIG["scale"])
+    user = User.objects.create_user(username="bench-autocomplete", password="x")
+    names = [_name(rng) for _ in range(count)]
+    Coin.objects.bulk_create(
+        Coin(name=f"{name} {rng.choice(['Coin', 'Inu', 'Token'])}", symbol=name[:5].upper(), description="",
+             created_by=user, total_votes=int(rng.paretovariate(1.2)))
+        for name in names
+    )
+    queries = _queries(names, rng)
+    autocomplete.reset()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = autocomplete.load()
+    build = time.perf_counter() - start
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    def icontains():
+        for query in queries:
+            list(Coin.objects.filter(Q(name__icontains=query) | Q(symbol__icontains=query))
+                 .order_by("-total_votes").values("id", "name", "symbol", "total_votes")[:10])
+
+    def prefix_index():
+        for query in queries:
+            index.search(query)
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    autocomplete.coin_index()
+
+    def search_endpoint():
+        for query in queries[:20]:
+            client.get("/api/coins/", {"search": query})
+
+    def autocomplete_endpoint():
+        for query in queries[:20]:
+            client.get("/api/coins/autocomplete/", {"q": query})
+
+    results = {
+        "coins": count,
+        "build_ms": build * 1000,
+        "index_bytes": index_bytes,
+        "icontains_query_us": per_call(icontains, 1) / len(queries) * 1e6,
+        "index_search_us": per_call(prefix_index, 5) / len(queries) * 1e6,
+        "search_endpoint_ms": per_call(search_endpoint, 1) / 20 * 1000,
+        "autocomplete_endpoint_ms": per_call(autocomplete_endpoint, 1) / 20 * 1000,
+    }
+    autocomplete.reset()
+    Coin.objects.filter(created_by=user).delete()
+    user.delete()
+    return results
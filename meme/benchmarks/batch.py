@@ -0,0 +1,55 @@
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from meme.api.ratelimit import get_backend
+from meme.models import User
+from meme.seeding import seed
+from . import benchmark, per_call
+
+ROUNDS = 20
+
+# What the app's home screen loads
+HOME_SCREEN = [
+    "/api/coins/?ordering=-total_votes",
+    "/api/communities/",
+    "/api/posts/?ordering=-created_at",
+    "/api/notifications/",
+    "/api/notes/",
+    "/api/comments/",
+    "/api/coins/?category=meme",
+    "/api/ratings/",
+]
+
+
+@benchmark("batch")
+def batch_requests():
+    """
+    Loading the home screen's eight endpoints with a JWT: one request each
+    through the full middleware stack versus one /api/batch/ call, inline
+    and with reads on worker threads. Network round-trips, which the batch
+    saves most of, are not included.
+    """
+    created = seed(users=200, coins=200, votes=2000, communities=20, posts=200, comments=500, notifications=500,
+                   prefix="bench-batch")
+    user = User.objects.get(pk=created["users"][0])
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+    body = {"requests": [{"path": path} for path in HOME_SCREEN]}
+
+    def separate():
+        for path in HOME_SCREEN:
+            assert client.get(path).status_code == 200
+
+    def batched():
+        response = client.post("/api/batch/", body, content_type="application/json")
+        assert all(result["status"] == 200 for result in response.json()["responses"])
+
+    # Every sub-request counts against the user's rate limit
+    get_backend().reset()
+    results = {"separate_ms": per_call(separate, ROUNDS) * 1000}
+    get_backend().reset()
+    with override_settings(BATCH_WORKERS=0):
+        results["batch_inline_ms"] = per_call(batched, ROUNDS) * 1000
+    get_backend().reset()
+    results["batch_threads_ms"] = per_call(batched, ROUNDS) * 1000
+    get_backend().reset()
+    return results
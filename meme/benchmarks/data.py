@@ -0,0 +1,29 @@
+"""
+Synthetic data for the endpoint workloads, generated once per run with
+meme.seeding at CONFIG["scale"].
+"""
+from meme.seeding import seed
+from . import CONFIG
+
+# Rows per unit of --scale
+SIZES = {
+    "users": 1000,
+    "coins": 100,
+    "votes": 20000,
+    "communities": 20,
+    "posts": 2000,
+    "comments": 10000,
+    "notifications": 5000,
+}
+
+_dataset = {}
+
+
+def dataset():
+    """
+    Populate the database on first use; return the created ids by model.
+    """
+    if not _dataset:
+        counts = {name: int(size * CONFIG["scale"]) for name, size in SIZES.items()}
+        _dataset.update(seed(**counts, seed=CONFIG["seed"], prefix="bench"))
+    return _dataset
@@ -0,0 +1,108 @@
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+
+from meme.db import apply_sqlite_pragmas
+from . import benchmark
+
+WRITERS = 4
+READERS = 4
+OPS = 200
+
+
+def _workload(connect, placeholder, reconnect=False):
+    """
+    Run WRITERS threads inserting votes next to READERS threads aggregating
+    them. Returns throughput, p95 latencies and failed operations.
+    """
+    setup = connect()
+    cursor = setup.cursor()
+    cursor.execute("DROP TABLE IF EXISTS bench_vote")
+    cursor.execute("CREATE TABLE bench_vote (coin_id INTEGER NOT NULL, vote_type VARCHAR(10) NOT NULL)")
+    cursor.execute("CREATE INDEX bench_vote_coin ON bench_vote (coin_id)")
+    setup.commit()
+
+    latencies = {"write": [], "read": []}
+    errors = []
+    insert = f"INSERT INTO bench_vote (coin_id, vote_type) VALUES ({placeholder}, {placeholder})"
+    select = "SELECT coin_id, COUNT(*) FROM bench_vote GROUP BY coin_id ORDER BY 2 DESC LIMIT 20"
+
+    def worker(kind, seed):
+        conn = None if reconnect else connect()
+        for i in range(OPS):
+            start = time.perf_counter()
+            try:
+                if reconnect:
+                    conn = connect()
+                cursor = conn.cursor()
+                if kind == "write":
+                    cursor.execute(insert, ((seed * OPS + i) % 100, "upvote"))
+                    conn.commit()
+                else:
+                    cursor.execute(select)
+                    cursor.fetchall()
+                if reconnect:
+                    conn.close()
+            except Exception as exc:
+                errors.append(exc)
+                continue
+            latencies[kind].append(time.perf_counter() - start)
+        if not reconnect:
+            conn.close()
+
+    threads = [threading.Thread(target=worker, args=("write", n)) for n in range(WRITERS)]
+    threads += [threading.Thread(target=worker, args=("read", n)) for n in range(READERS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    cursor = setup.cursor()
+    cursor.execute("DROP TABLE bench_vote")
+    setup.commit()
+    setup.close()
+    p95 = lambda values: statistics.quantiles(values, n=20)[-1] * 1000 if len(values) > 1 else 0.0
+    return {
+        "ops_per_s": (len(latencies["write"]) + len(latencies["read"])) / elapsed,
+        "write_p95_ms": p95(latencies["write"]),
+        "read_p95_ms": p95(latencies["read"]),
+        "errors": len(errors),
+    }
+
+
+@benchmark("database")
+def database_profiles():
+    """
+    Concurrent read/write throughput of SQLite with default journaling
+    versus the tuned WAL profile, plus per-request versus persistent
+    connections when the configured database is PostgreSQL.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in ("default", "tuned"):
+            path = Path(tmp) / f"{profile}.sqlite3"
+
+            def connect():
+                conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+                if profile == "tuned":
+                    apply_sqlite_pragmas(conn.cursor(), settings.SQLITE_PRAGMAS)
+                return conn
+
+            for metric, value in _workload(connect, "?").items():
+                results[f"sqlite_{profile}_{metric}"] = value
+
+    if connection.vendor == "postgresql":
+        params = connection.get_connection_params()
+        connect = lambda: connection.get_new_connection(params)
+        for label, reconnect in (("per_request", True), ("persistent", False)):
+            for metric, value in _workload(connect, "%s", reconnect=reconnect).items():
+                results[f"postgres_{label}_{metric}"] = value
+    return results
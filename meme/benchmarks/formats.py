@@ -0,0 +1,71 @@
+import datetime
+import gzip
+import io
+
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from meme.api import parsers, renderers
+from meme.api.serializers import VoteSerializer
+from meme.models import User, Vote
+from meme.seeding import seed
+from . import benchmark, per_call
+
+ROUNDS = 20
+
+
+def _formats():
+    formats = {
+        "json": (JSONRenderer(), JSONParser()),
+        "fastjson": (renderers.FastJSONRenderer(), JSONParser()),
+    }
+    if renderers.msgpack is not None:
+        formats["msgpack"] = (renderers.MessagePackRenderer(), parsers.MessagePackParser())
+    if renderers.cbor2 is not None:
+        formats["cbor"] = (renderers.CBORRenderer(), parsers.CBORParser())
+    return formats
+
+
+def _events(count):
+    """
+    A change feed page as /api/changes/ returns it, with datetimes still
+    datetime objects.
+    """
+    now = timezone.now()
+    return [
+        {"id": i, "label": "meme.vote", "object_id": str(i), "operation": "create", "created_at": now - datetime.timedelta(seconds=i),
+         "payload": {"id": i, "user_id": i % 977, "coin_id": i % 101, "vote_type": "upvote", "created_at": now.isoformat()}}
+        for i in range(count)
+    ]
+
+
+@benchmark("formats")
+def binary_formats():
+    """
+    Size and encode/decode time of three realistic pages (1000 coins, 1000
+    votes, 1000 change events) as JSON (stdlib and orjson), MessagePack and
+    CBOR, the binary formats when their packages are installed. Decoding
+    uses the matching request parser.
+    """
+    created = seed(users=500, coins=1000, votes=1000, communities=0, posts=0, comments=0, notifications=0,
+                   prefix="bench-formats")
+    client = APIClient()
+    client.force_authenticate(user=User.objects.get(pk=created["users"][0]))
+    pages = {
+        "coins": client.get("/api/coins/").data,
+        # /api/votes/ only lists the user's own votes
+        "votes": VoteSerializer(Vote.objects.filter(coin__in=created["coins"]), many=True).data,
+        "events": _events(1000),
+    }
+
+    results = {}
+    for page, data in pages.items():
+        for name, (renderer, parser) in _formats().items():
+            content = renderer.render(data)
+            results[f"{page}_{name}_bytes"] = len(content)
+            results[f"{page}_{name}_gzip_bytes"] = len(gzip.compress(content, 6))
+            results[f"{page}_{name}_encode_us"] = per_call(lambda: renderer.render(data), ROUNDS) * 1e6
+            results[f"{page}_{name}_decode_us"] = per_call(lambda: parser.parse(io.BytesIO(content)), ROUNDS) * 1e6
+    return results
@@ -0,0 +1,46 @@
+import logging
+import logging.handlers
+import os
+import tempfile
+from pathlib import Path
+
+from meme.log import JSONFormatter, QueueHandler
+from . import benchmark, per_call
+
+CALLS = 20000
+
+
+def _logger(name, handlers):
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers[:] = handlers
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+@benchmark("logging")
+def logging_latency():
+    """
+    Caller-side cost of one log call: synchronous file + console handlers
+    with f-string messages versus the queue handler with lazy formatting.
+    """
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        file_handler = logging.FileHandler(Path(tmp) / "sync.log")
+        file_handler.setFormatter(logging.Formatter("{levelname} {asctime} {module} {message}", style="{"))
+        console = logging.StreamHandler(devnull)
+        sync = _logger("sync", [file_handler, console])
+        name, user = "Doge", "alice"
+        before = per_call(lambda: sync.info(f"Vote created: {name} by {user}"), CALLS)
+
+        queued_file = logging.handlers.RotatingFileHandler(Path(tmp) / "queued.log", maxBytes=10 * 1024 * 1024, backupCount=1)
+        queued_file.setFormatter(JSONFormatter())
+        queued_console = logging.StreamHandler(devnull)
+        queue_handler = QueueHandler(handlers=[queued_file, queued_console])
+        queued = _logger("queued", [queue_handler])
+        after = per_call(
+            lambda: queued.info("Vote created: %s by %s", name, user, extra={"event": "vote.created"}), CALLS
+        )
+        queue_handler.close()
+        for handler in (file_handler, console, queued_file, queued_console):
+            handler.close()
+    return {"sync_us": before * 1e6, "queued_us": after * 1e6}
@@ -0,0 +1,36 @@
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from meme import metrics
+from meme.models import User, Coin
+from . import benchmark, per_call
+
+CALLS = 300
+
+
+def _request_time(user):
+    # A new client builds its own middleware chain, picking up METRICS_ENABLED
+    client = APIClient()
+    client.force_authenticate(user=user)
+    client.get("/api/coins/?page_size=20")
+    return per_call(lambda: client.get("/api/coins/?page_size=20"), CALLS)
+
+
+@benchmark("metrics")
+def metrics_overhead():
+    """
+    Full request cost of a coin list page with and without the metrics
+    middleware.
+    """
+    user = User.objects.create_user(username="bench-metrics", password="x")
+    Coin.objects.bulk_create(
+        Coin(name=f"Coin {i}", symbol=f"C{i}", description="lorem ipsum", created_by=user) for i in range(100)
+    )
+    with override_settings(METRICS_ENABLED=False):
+        before = _request_time(user)
+    with override_settings(METRICS_ENABLED=True):
+        after = _request_time(user)
+    metrics.registry.reset()
+    Coin.objects.all().delete()
+    user.delete()
+    return {"without_us": before * 1e6, "with_us": after * 1e6, "overhead_us": (after - before) * 1e6}
@@ -0,0 +1,35 @@
+from django.db.models import Count
+from rest_framework.test import APIClient
+
+from meme.api.ratelimit import get_backend
+from meme.models import Coin, User
+from meme.seeding import seed
+from . import CONFIG, benchmark, per_call
+
+ROUNDS = 20
+
+
+@benchmark("my_vote")
+def my_vote():
+    """
+    A page of coins with and without the requesting user's ``my_vote``,
+    and the user's votes on that page looked up through
+    /api/votes/mine/, over a vote table of 200000 rows (at --scale 1).
+    """
+    created = seed(users=2000, coins=2000, votes=int(200000 * CONFIG["scale"]), communities=0, posts=0, comments=0,
+                   notifications=0, prefix="bench-myvote")
+    # The most active voter, so the page has votes to find
+    user = User.objects.filter(pk__in=created["users"]).annotate(n=Count("votes")).order_by("-n").first()
+    client = APIClient()
+    client.force_authenticate(user=user)
+    page = "/api/coins/?ordering=-total_votes"
+    ids = ",".join(map(str, Coin.objects.order_by("-total_votes").values_list("pk", flat=True)[:100]))
+
+    get_backend().reset()
+    results = {
+        "list_ms": per_call(lambda: client.get(page + "&exclude=my_vote"), ROUNDS) * 1000,
+        "list_my_vote_ms": per_call(lambda: client.get(page), ROUNDS) * 1000,
+        "mine_100_coins_ms": per_call(lambda: client.get(f"/api/votes/mine/?coins={ids}"), ROUNDS) * 1000,
+    }
+    get_backend().reset()
+    return results
@@ -0,0 +1,42 @@
+import time
+
+from rest_framework.test import APIClient
+
+from meme.models import User, Coin
+from . import benchmark
+
+COINS = 1000
+REQUESTS = 20
+
+VARIANTS = {
+    "full": "",
+    "sparse": "?fields=id,name,symbol",
+    "compact": "?format=compact",
+    "sparse_compact": "?fields=id,name,symbol&format=compact",
+}
+
+
+@benchmark("sparse_fields")
+def sparse_fields():
+    """
+    Payload size and latency of the coin list with sparse fieldsets and
+    the compact column-oriented format.
+    """
+    user = User.objects.create_user(username="bench-payload", password="x")
+    Coin.objects.bulk_create(
+        Coin(name=f"Coin {i}", symbol=f"C{i}", description="lorem ipsum " * 40, created_by=user)
+        for i in range(COINS)
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    results = {}
+    for label, query in VARIANTS.items():
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            response = client.get(f"/api/coins/{query}")
+        results[f"{label}_ms"] = (time.perf_counter() - start) / REQUESTS * 1000
+        results[f"{label}_bytes"] = len(response.content)
+    Coin.objects.all().delete()
+    user.delete()
+    return results
@@ -0,0 +1,72 @@
+from rest_framework.permissions import BasePermission, SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from meme.api.permissions import IsAdminUser, IsModeratorOrAdmin, IsOwnerOrReadOnly, IsRegularUser
+from meme.models import User, Community
+from . import benchmark, per_call
+
+CALLS = 2000
+
+
+# The role and owner checks as they were before the policy layer
+class LegacyIsAdminUser(BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role == "admin"
+
+
+class LegacyIsModeratorOrAdmin(BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role in ["moderator", "admin"]
+
+
+class LegacyIsRegularUser(BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role == "user"
+
+
+class LegacyIsOwnerOrReadOnly(BasePermission):
+    def has_object_permission(self, request, view, obj):
+        if request.method in SAFE_METHODS:
+            return True
+        return obj.created_by == request.user
+
+
+def _request_cost(user, community_id, role_checks, owner_check):
+    """
+    Permission work of one write request: fetch the object (as the view
+    would), run the role checks and the owner check.
+    """
+    factory = APIRequestFactory()
+
+    def handle():
+        http_request = factory.patch(f"/api/communities/{community_id}/")
+        force_authenticate(http_request, user=user)
+        request = Request(http_request)
+        obj = Community.objects.get(pk=community_id)
+        for permission in role_checks:
+            permission.has_permission(request, None)
+        owner_check.has_object_permission(request, None, obj)
+
+    baseline = per_call(lambda: Community.objects.get(pk=community_id), CALLS)
+    return per_call(handle, CALLS) - baseline
+
+
+@benchmark("permissions")
+def permission_overhead():
+    """
+    Per-request cost of three role checks plus an owner check on a write,
+    string role comparisons with FK loading versus the cached policy.
+    """
+    user = User.objects.create_user(username="bench-permissions", password="x", role="moderator")
+    community = Community.objects.create(name="Bench", description="", created_by=user)
+    legacy = _request_cost(
+        user, community.pk,
+        [LegacyIsAdminUser(), LegacyIsModeratorOrAdmin(), LegacyIsRegularUser()], LegacyIsOwnerOrReadOnly(),
+    )
+    policy = _request_cost(
+        user, community.pk, [IsAdminUser(), IsModeratorOrAdmin(), IsRegularUser()], IsOwnerOrReadOnly(),
+    )
+    community.delete()
+    user.delete()
+    return {"legacy_us": legacy * 1e6, "policy_us": policy * 1e6}
@@ -0,0 +1,89 @@
+import itertools
+import random
+import time
+
+from meme import recommendations
+from . import CONFIG, benchmark
+
+# Matrix size at --scale 1
+USERS = 1000000
+COINS = 100000
+UPVOTES = 3000000
+
+# Coins whose neighbours are computed; the full run time is projected
+SAMPLE = 1000
+CHUNK = 100000
+
+# Coins with new votes in an incremental run
+CHANGED = 100
+
+
+def _upvotes(users, coins, count, rng):
+    """
+    ``count`` distinct (user, coin) pairs in chunks, coin popularity
+    following a Zipf distribution.
+    """
+    weights = list(itertools.accumulate(1 / rank ** 1.1 for rank in range(1, coins + 1)))
+    seen = set()
+    while len(seen) < count:
+        user = rng.randrange(users)
+        coin = rng.choices(range(coins), cum_weights=weights)[0]
+        seen.add(user * coins + coin)
+    pairs = [divmod(code, coins) for code in seen]
+    return [pairs[start:start + CHUNK] for start in range(0, len(pairs), CHUNK)]
+
+
+def _measure(chunks, sample, coins, vectorized):
+    start = time.perf_counter()
+    matrix = recommendations.build_matrix(chunks, vectorized)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    matrix.neighbors(sample)
+    per_coin = (time.perf_counter() - start) / len(sample)
+    return build, per_coin, build + per_coin * coins
+
+
+def _measure_incremental(chunks, changed, counts, vectorized):
+    """
+    An incremental run over ``changed`` coins: the matrix of their voters'
+    upvotes, scored with the stored voter counts of the other coins.
+    Reading the voters' upvotes from the database is not included.
+    """
+    changed = set(changed)
+    voters = {user for chunk in chunks for user, coin in chunk if coin in changed}
+    rows = [[(user, coin) for user, coin in chunk if user in voters] for chunk in chunks]
+    start = time.perf_counter()
+    matrix = recommendations.build_matrix(rows, vectorized)
+    matrix.set_voter_counts({coin: counts[coin] for coin in matrix.coins if coin not in changed})
+    matrix.neighbors(sorted(changed))
+    return time.perf_counter() - start, sum(map(len, rows))
+
+
+@benchmark("recommendations")
+def covote_recommendations():
+    """
+    Building the user x coin upvote matrix and computing top-20 neighbours
+    with the pure Python path and, when NumPy/SciPy are installed, the
+    vectorized one. Neighbours are computed for a sample of coins (the
+    most popular half, a random half) and a full refresh is projected.
+    An incremental run recomputes CHANGED random coins from their voters'
+    upvotes only.
+    """
+    rng = random.Random(CONFIG["seed"])
+    users, coins = int(USERS * CONFIG["scale"]), int(COINS * CONFIG["scale"])
+    chunks = _upvotes(users, coins, int(UPVOTES * CONFIG["scale"]), rng)
+    sample = list(range(SAMPLE // 2)) + rng.sample(range(SAMPLE // 2, coins), SAMPLE // 2)
+    changed = rng.sample(range(coins), CHANGED)
+
+    results = {"users": users, "coins": coins, "upvotes": sum(map(len, chunks))}
+    paths = [("python", False)] + ([("vectorized", True)] if recommendations.np is not None else [])
+    for name, vectorized in paths:
+        build, per_coin, total = _measure(chunks, sample, coins, vectorized)
+        results[f"{name}_build_ms"] = build * 1000
+        results[f"{name}_per_coin_us"] = per_coin * 1e6
+        results[f"{name}_full_refresh_ms"] = total * 1000
+        counts = recommendations.build_matrix(chunks, vectorized).voter_counts(range(coins))
+        incremental, read = _measure_incremental(chunks, changed, counts, vectorized)
+        results[f"{name}_incremental_ms"] = incremental * 1000
+    results["incremental_upvotes_read"] = read
+    return results
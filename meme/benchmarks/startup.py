@@ -0,0 +1,24 @@
+import statistics
+
+from meme.startup import cold_start, profile_imports
+from . import benchmark
+
+RUNS = 5
+
+
+@benchmark("cold_start")
+def cold_start_time():
+    """
+    Fresh-process startup: import time to a loaded WSGI application, then
+    load and first-request times with and without preloading, as medians
+    over RUNS processes. With preloading the first request no longer pays
+    for importing the URLconf and API modules.
+    """
+    imports = sum(item.cumulative_us for item in profile_imports("wsgi") if item.depth == 0)
+    results = {"wsgi_import_ms": imports / 1000}
+    for label, preload in (("lazy", "False"), ("preloaded", "True")):
+        runs = [cold_start("/api/", PRELOAD_APP=preload) for _ in range(RUNS)]
+        results[f"{label}_load_ms"] = statistics.median(run[1] for run in runs) * 1000
+        results[f"{label}_first_request_ms"] = statistics.median(run[2] for run in runs) * 1000
+        results[f"{label}_process_ms"] = statistics.median(run[0] for run in runs) * 1000
+    return results
@@ -0,0 +1,48 @@
+import tempfile
+from pathlib import Path
+
+from django.test import RequestFactory, override_settings
+from rest_framework import throttling
+from rest_framework.request import Request
+
+from meme.api.ratelimit import get_backend
+from meme.api.throttles import UserRateThrottle
+from . import benchmark, per_call
+
+RATE = "100000/hour"
+CHECKS = 5000
+
+
+def _throttle_cost(throttle_class):
+    request = Request(RequestFactory().get("/api/coins/", REMOTE_ADDR="10.0.0.1"))
+    throttle_class.rate = RATE
+    try:
+        return per_call(lambda: throttle_class().allow_request(request, None), CHECKS)
+    finally:
+        del throttle_class.rate
+
+
+@benchmark("throttle")
+def throttle_overhead():
+    """
+    Per-request cost of a throttle check after CHECKS requests from one
+    client, comparing DRF's timestamp history with the sliding-window
+    backends.
+    """
+    class DRFThrottle(throttling.UserRateThrottle):
+        pass
+
+    class WindowThrottle(UserRateThrottle):
+        pass
+
+    results = {"drf_cache_history_us": _throttle_cost(DRFThrottle) * 1e6}
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "locmem_us": {"BACKEND": "meme.api.ratelimit.LocMemBackend"},
+            "sqlite_us": {"BACKEND": "meme.api.ratelimit.SQLiteBackend", "LOCATION": str(Path(tmp) / "rl.sqlite3")},
+        }
+        for label, config in backends.items():
+            with override_settings(RATELIMIT=config):
+                results[label] = _throttle_cost(WindowThrottle) * 1e6
+                get_backend().reset()
+    return results
@@ -0,0 +1,107 @@
+import itertools
+import random
+import time
+from array import array
+
+from meme import voterings
+from . import CONFIG, benchmark
+
+# Votes at --scale 1, cast over DAYS days
+USERS = 2000000
+COINS = 100000
+VOTES = 20000000
+DAYS = 30
+
+# Planted rings: RINGS groups of RING_SIZE accounts, each upvoting
+# RING_COINS coins together
+RINGS = 100
+RING_SIZE = (3, 30)
+RING_COINS = (5, 20)
+
+# The pure Python path only gets this share of the votes; its full run
+# time is projected from it
+PYTHON_SHARE = 0.05
+CHUNK = 100000
+
+
+def _votes(users, coins, count, rng, rings):
+    """
+    Organic votes (random users, Zipf-distributed coins, times spread over
+    DAYS days) followed by the votes of ``rings``, as compact columns.
+    """
+    weights = list(itertools.accumulate(1 / rank ** 1.1 for rank in range(1, coins + 1)))
+    span = DAYS * 24 * 3600
+    columns = array("i"), array("i"), array("b"), array("i")
+    for start in range(0, count, CHUNK):
+        size = min(CHUNK, count - start)
+        columns[0].extend(rng.randrange(users) for _ in range(size))
+        columns[1].extend(rng.choices(range(coins), cum_weights=weights, k=size))
+        columns[2].extend(1 if rng.random() < 0.8 else -1 for _ in range(size))
+        columns[3].extend(rng.randrange(span) for _ in range(size))
+    for members, ring_coins in rings:
+        for coin in ring_coins:
+            moment = rng.randrange(span - voterings.WINDOW)
+            for user in members:
+                for column, value in zip(columns, (user, coin, 1, moment + rng.randrange(60))):
+                    column.append(value)
+    return columns
+
+
+def _chunks(columns, count):
+    """
+    The first ``count`` votes as lists of tuples, as stream_votes() yields
+    them.
+    """
+    for start in range(0, count, CHUNK):
+        yield list(zip(*(column[start:min(start + CHUNK, count)] for column in columns)))
+
+
+def _rings(users, coins, rng):
+    accounts = rng.sample(range(users, users + RINGS * RING_SIZE[1]), RINGS * RING_SIZE[1])
+    rings = []
+    for i in range(RINGS):
+        members = accounts[i * RING_SIZE[1]:i * RING_SIZE[1] + rng.randint(*RING_SIZE)]
+        rings.append((sorted(members), rng.sample(range(coins), rng.randint(*RING_COINS))))
+    return rings
+
+
+def _measure(columns, count, vectorized):
+    start = time.perf_counter()
+    detector = voterings.build_detector(_chunks(columns, count), vectorized=vectorized)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    found = detector.rings()
+    return build, time.perf_counter() - start, found
+
+
+@benchmark("voterings")
+def vote_ring_detection():
+    """
+    Finding vote rings in DAYS days of votes with the vectorized path
+    (when NumPy/SciPy are installed) and, on a PYTHON_SHARE sample, the
+    pure Python one, projected to all votes. Recall is the share
+    of planted rings found with exactly their members; extra rings are
+    clusters found among organic voters.
+    """
+    users, coins = int(USERS * CONFIG["scale"]), int(COINS * CONFIG["scale"])
+    votes = int(VOTES * CONFIG["scale"])
+    rng = random.Random(CONFIG["seed"])
+    rings = _rings(users, coins, rng)
+    planted = {tuple(members) for members, _ in rings}
+    columns = _votes(users, coins, votes, rng, rings)
+    ring_votes = len(columns[0]) - votes
+
+    results = {"users": users, "coins": coins, "votes": votes}
+    paths = [("python", False, PYTHON_SHARE)] + ([("vectorized", True, 1)] if voterings.np is not None else [])
+    for name, vectorized, share in paths:
+        # The planted votes come last: a sample keeps them and drops organic ones
+        count = int(votes * share)
+        sample = [column[:count] + column[votes:] for column in columns] if share < 1 else columns
+        build, analyse, found = _measure(sample, count + ring_votes, vectorized)
+        found = {tuple(ring.members) for ring in found}
+        results[f"{name}_build_ms"] = build * 1000 / share
+        results[f"{name}_analyse_ms"] = analyse * 1000 / share
+        results[f"{name}_votes_per_s"] = votes * share / (build + analyse)
+        results[f"{name}_recall"] = len(found & planted) / len(planted)
+        results[f"{name}_extra_rings"] = len(found - planted)
+    return results
@@ -0,0 +1,106 @@
+"""
+Scripted per-endpoint workloads over the synthetic dataset (see data.py).
+Each runs CONFIG["requests"] requests through the full middleware stack and
+reports throughput and latency percentiles.
+"""
+import itertools
+import random
+import time
+
+from rest_framework.test import APIClient
+
+from meme.models import User
+from . import CONFIG, benchmark, latency_summary
+from .data import dataset
+
+
+def _client(user_id):
+    client = APIClient()
+    client.force_authenticate(user=User.objects.get(pk=user_id))
+    return client
+
+
+def _run(requests, on_response=None):
+    """
+    Send every (client, method, path, kwargs) in ``requests``; responses
+    with status 400 or more are counted as errors.
+    """
+    samples, errors = [], 0
+    start = time.perf_counter()
+    for client, method, path, kwargs in requests:
+        began = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        samples.append(time.perf_counter() - began)
+        errors += response.status_code >= 400
+        if on_response is not None:
+            on_response(client, response)
+    results = latency_summary(samples, time.perf_counter() - start)
+    results["errors"] = errors
+    return results
+
+
+@benchmark("coin_listing")
+def coin_listing():
+    """
+    Coin list sorted by votes, alternating full and sparse field sets.
+    """
+    client = _client(dataset()["users"][0])
+    paths = itertools.cycle(["/api/coins/?ordering=-total_votes", "/api/coins/?ordering=-total_votes&fields=id,name,symbol,total_votes"])
+    return _run((client, "get", next(paths), {}) for _ in range(CONFIG["requests"]))
+
+
+@benchmark("voting_storm")
+def voting_storm():
+    """
+    Many users voting on a handful of hot coins.
+    """
+    data = dataset()
+    rng = random.Random(CONFIG["seed"])
+    voters = [(_client(user_id), user_id) for user_id in data["users"][:50]]
+    hot = data["coins"][:5]
+
+    def requests():
+        for _ in range(CONFIG["requests"]):
+            client, user_id = rng.choice(voters)
+            payload = {"user": user_id, "coin": rng.choice(hot), "vote_type": rng.choice(("upvote", "downvote"))}
+            yield client, "post", "/api/votes/", {"data": payload}
+
+    return _run(requests())
+
+
+@benchmark("post_feed")
+def post_feed():
+    """
+    Paging through the newest posts.
+    """
+    client = _client(dataset()["users"][0])
+    pages = itertools.cycle(range(1, 11))
+    return _run((client, "get", f"/api/posts/?ordering=-created_at&page={next(pages)}", {}) for _ in range(CONFIG["requests"]))
+
+
+@benchmark("notification_polling")
+def notification_polling():
+    """
+    Clients polling their notifications with If-None-Match, as a frontend
+    would; unchanged lists are answered with 304.
+    """
+    clients = [_client(user_id) for user_id in dataset()["users"][:20]]
+    etags = {}
+
+    def requests():
+        for i in range(CONFIG["requests"]):
+            client = clients[i % len(clients)]
+            headers = {"HTTP_IF_NONE_MATCH": etags[client]} if client in etags else {}
+            yield client, "get", "/api/notifications/", headers
+
+    not_modified = []
+
+    def remember(client, response):
+        if response.status_code == 304:
+            not_modified.append(client)
+        elif "ETag" in response:
+            etags[client] = response["ETag"]
+
+    results = _run(requests(), remember)
+    results["not_modified"] = len(not_modified)
+    return results
@@ -0,0 +1,65 @@
+"""
+Database helpers: connection tuning shared by the connection_created hook
+and the database benchmark, and cheap row count and size estimates.
+"""
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+def apply_sqlite_pragmas(cursor, pragmas=None):
+    """
+    Apply ``settings.SQLITE_PRAGMAS`` (WAL journaling, relaxed fsync, busy
+    timeout, memory-mapped I/O) to a new SQLite connection.
+    """
+    if pragmas is None:
+        pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    for pragma, value in pragmas.items():
+        cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+def estimate_row_count(model, using="default"):
+    """
+    Approximate number of rows in ``model``'s table without scanning it:
+    the planner statistics on PostgreSQL, the highest rowid on SQLite.
+    Returns None when no estimate is available.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        elif connection.vendor == "sqlite":
+            cursor.execute(f"SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}")
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples is -1 for tables that were never analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def table_size_bytes(model, using="default"):
+    """
+    On-disk size of ``model``'s table including its indexes: the relation
+    size on PostgreSQL, the sum of its b-tree pages (dbstat) on SQLite.
+    Returns None when the size is not available.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT pg_total_relation_size(to_regclass(%s))", [table])
+            elif connection.vendor == "sqlite":
+                cursor.execute(
+                    "SELECT SUM(dbstat.pgsize) FROM dbstat JOIN sqlite_master ON dbstat.name = sqlite_master.name "
+                    "WHERE sqlite_master.tbl_name = %s", [table]
+                )
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        # SQLite built without the dbstat virtual table
+        return None
+    return row[0] if row else None
@@ -0,0 +1,167 @@
+"""
+Upload pipeline for avatars, coin logos and badge icons.
+
+Uploads are stored as received, then re-encoded off the request thread:
+the original is normalised (EXIF orientation applied, metadata stripped,
+bounded dimensions) and a thumbnail is generated for every entry in
+``settings.IMAGE_SIZES``. Files are named after the hash of the uploaded
+bytes, so identical uploads are stored once and URLs can be cached forever.
+"""
+import hashlib
+import io
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+
+from .versions import bump_versions
+
+logger = logging.getLogger("app")
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+# The layout process_image() writes: {upload_to}/{digest[:2]}/{digest}.{ext}.
+# Uploads are stored under upload_to itself, so they never match even when
+# named like a digest.
+PROCESSED_NAME = re.compile(r"^(?P<stem>(?P<directory>.+)/(?P<prefix>[0-9a-f]{2})/(?P=prefix)[0-9a-f]{18})\.(?P<ext>webp|jpg)$")
+HASHED_FILE = re.compile(r"/(?P<prefix>[0-9a-f]{2})/(?P=prefix)[0-9a-f]{18}(_\d+)?\.(webp|jpg)$")
+
+_executor = None
+
+
+def get_sizes():
+    return getattr(settings, "IMAGE_SIZES", {"small": 64, "medium": 256, "large": 512})
+
+
+def output_format():
+    """
+    Return the (Pillow format, extension) used for processed images.
+    """
+    if features.check("webp"):
+        return "WEBP", "webp"
+    return "JPEG", "jpg"
+
+
+def validate_image(file):
+    """
+    Reject uploads that are too large, not an allowed format or not
+    decodable, without fully decoding them.
+    """
+    max_bytes = getattr(settings, "IMAGE_MAX_UPLOAD_BYTES", 10 * 1024 * 1024)
+    if file.size > max_bytes:
+        raise ValidationError(f"Images may be at most {max_bytes // (1024 * 1024)} MB.")
+    try:
+        with Image.open(file) as image:
+            image_format = image.format
+            image.verify()
+    except (Image.DecompressionBombError, OSError, SyntaxError):
+        raise ValidationError("Upload a valid image.")
+    finally:
+        file.seek(0)
+    if image_format not in ALLOWED_FORMATS:
+        raise ValidationError(f"Unsupported image format: {image_format}.")
+
+
+def is_processed(name, directory):
+    """
+    Whether ``name`` is a file process_image() wrote under ``directory``.
+    """
+    match = PROCESSED_NAME.match(name or "")
+    return match is not None and match["directory"] == directory.strip("/")
+
+
+def thumbnail_name(name, size):
+    """
+    Return the storage name of the ``size`` thumbnail of a processed image,
+    or ``name`` itself when no such thumbnail exists.
+    """
+    match = PROCESSED_NAME.match(name or "")
+    if not match or size not in get_sizes():
+        return name
+    return f"{match['stem']}_{get_sizes()[size]}.{match['ext']}"
+
+
+def _encode(image, image_format):
+    if image_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, quality=getattr(settings, "IMAGE_QUALITY", 82), method=4)
+    return ContentFile(buffer.getvalue())
+
+
+def _store(name, image, image_format):
+    if not default_storage.exists(name):
+        default_storage.save(name, _encode(image, image_format))
+
+
+def process_image(data, directory):
+    """
+    Re-encode ``data`` and its thumbnails under ``directory``. Returns the
+    storage name of the processed original.
+    """
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    image_format, ext = output_format()
+    stem = f"{directory.strip('/')}/{digest[:2]}/{digest}"
+    name = f"{stem}.{ext}"
+    if default_storage.exists(name):
+        return name
+
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    for px in sorted(get_sizes().values(), reverse=True):
+        thumb = image.copy()
+        thumb.thumbnail((px, px), Image.LANCZOS)
+        _store(f"{stem}_{px}.{ext}", thumb, image_format)
+    max_dimension = getattr(settings, "IMAGE_MAX_DIMENSION", 1024)
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    # The original goes last: its presence marks the set as complete
+    _store(name, image, image_format)
+    return name
+
+
+def _process_field(model, pk, field_name, raw_name):
+    try:
+        with default_storage.open(raw_name) as file:
+            data = file.read()
+        directory = model._meta.get_field(field_name).upload_to
+        name = process_image(data, directory)
+        if model.objects.filter(pk=pk, **{field_name: raw_name}).update(**{field_name: name}):
+            bump_versions(model)
+        default_storage.delete(raw_name)
+    except Exception:
+        logger.exception("Image processing failed for %s %s.%s", model.__name__, pk, field_name)
+    finally:
+        if _executor is not None:
+            close_old_connections()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS, thread_name_prefix="image-pipeline"
+        )
+    return _executor
+
+
+def schedule_processing(instance, field_name):
+    """
+    Queue processing of a freshly uploaded image once the surrounding
+    transaction commits. With ``IMAGE_WORKERS = 0`` it runs inline.
+    """
+    raw_name = getattr(instance, field_name).name
+    if not raw_name or is_processed(raw_name, instance._meta.get_field(field_name).upload_to):
+        return
+    args = (type(instance), instance.pk, field_name, raw_name)
+    if getattr(settings, "IMAGE_WORKERS", 0) > 0:
+        transaction.on_commit(lambda: get_executor().submit(_process_field, *args))
+    else:
+        transaction.on_commit(lambda: _process_field(*args))
@@ -0,0 +1,112 @@
+"""
+Logging helpers: a QueueHandler that runs the real handlers on a background
+thread, a JSON formatter for structured events and a sampling filter for
+high-volume loggers.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else came from ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on an in-memory queue and lets a QueueListener thread pass
+    them to ``handlers``, so file and console I/O never runs on the request
+    thread. Records are queued unformatted; the message is only built by
+    the listener.
+
+    ``handlers`` are handler objects. In dictConfig, list them as
+    ``cfg://handlers.<name>`` references: they are resolved when the
+    listener starts, after every handler is configured, so the order of
+    the handlers in the config does not matter.
+    """
+
+    def __init__(self, handlers=(), respect_handler_level=True):
+        super().__init__(queue.SimpleQueue())
+        self.targets = handlers
+        self.respect_handler_level = respect_handler_level
+        self.listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def resolve_targets(self):
+        # Indexing a dictConfig list (rather than iterating it) converts its
+        # cfg:// references into the configured handlers
+        handlers = [self.targets[i] for i in range(len(self.targets))]
+        for handler in handlers:
+            if not isinstance(handler, logging.Handler):
+                raise ValueError(f"{handler!r} is not a configured handler.")
+        return handlers
+
+    def _start_listener(self):
+        # Forked workers do not inherit the listener thread, so it is
+        # started on first use in each process
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.listener = logging.handlers.QueueListener(
+                self.queue, *self.resolve_targets(), respect_handler_level=self.respect_handler_level
+            )
+            self.listener.start()
+            self._pid = os.getpid()
+        atexit.register(self.close)
+
+    def prepare(self, record):
+        return record
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._start_listener()
+        super().emit(record)
+
+    def close(self):
+        with self._lock:
+            if self.listener is not None and self._pid == os.getpid():
+                self.listener.stop()
+                self.listener = None
+                self._pid = None
+        super().close()
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line with the timestamp, level, logger, message and
+    any ``extra=`` fields of the record.
+    """
+
+    def format(self, record):
+        event = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                event[key] = value
+        if record.exc_info:
+            event["exception"] = self.formatException(record.exc_info)
+        return json.dumps(event, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through roughly ``rate`` of the records below WARNING; attached to
+    a logger it drops the rest before they are queued.
+    """
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
@@ -0,0 +1,92 @@
+import json
+import platform
+import subprocess
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from rest_framework.views import APIView
+
+from meme.benchmarks import CONFIG, compare, discover
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Run performance benchmarks against a throwaway test database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help="Benchmarks to run (default: all).")
+        parser.add_argument("--list", action="store_true", help="List the available benchmarks and exit.")
+        parser.add_argument("--scale", type=float, default=CONFIG["scale"], help="Synthetic dataset size multiplier for the workloads.")
+        parser.add_argument("--requests", type=int, default=CONFIG["requests"], help="Requests per workload.")
+        parser.add_argument("--seed", type=int, default=CONFIG["seed"], help="Random seed for data and workloads.")
+        parser.add_argument("--json", metavar="PATH", help="Write the results as JSON to PATH ('-' for stdout).")
+        parser.add_argument("--compare", metavar="PATH", help="Fail if results regressed against a previous --json file.")
+        parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression for --compare (default 0.2).")
+
+    def handle(self, *args, **options):
+        registry = discover()
+        if options["list"]:
+            for name, func in sorted(registry.items()):
+                summary = (func.__doc__ or "").strip().split("\n")[0]
+                self.stdout.write(f"{name}: {summary}")
+            return
+
+        names = options["names"] or sorted(registry)
+        unknown = [name for name in names if name not in registry]
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(unknown)}")
+
+        CONFIG.update(scale=options["scale"], requests=options["requests"], seed=options["seed"])
+        results = {}
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        # Repeated requests should measure the endpoints, not the rate limits
+        unthrottled = mock.patch.object(APIView, "check_throttles", lambda self, request: None)
+        unthrottled.start()
+        try:
+            for name in names:
+                results[name] = registry[name]()
+                if options["json"] == "-":
+                    continue
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                for metric, value in results[name].items():
+                    value = f"{value:.2f}" if isinstance(value, float) else value
+                    self.stdout.write(f"  {metric}: {value}")
+            vendor = connection.vendor
+        finally:
+            unthrottled.stop()
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options["json"]:
+            report = json.dumps({
+                "commit": current_commit(),
+                "python": platform.python_version(),
+                "database": vendor,
+                "config": CONFIG,
+                "results": results,
+            }, indent=2)
+            if options["json"] == "-":
+                self.stdout.write(report)
+            else:
+                with open(options["json"], "w") as f:
+                    f.write(report + "\n")
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+            regressions = compare(baseline["results"], results, options["threshold"])
+            for name, metric, old, new, change in regressions:
+                self.stderr.write(f"{name}.{metric}: {old:.2f} -> {new:.2f} ({change:+.0%})")
+            if regressions:
+                raise CommandError(f"{len(regressions)} metric(s) regressed by more than {options['threshold']:.0%}.")
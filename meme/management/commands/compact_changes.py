@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from meme.outbox import compact
+
+
+class Command(BaseCommand):
+    help = "Remove change feed events superseded by a later event for the same object."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--horizon", type=int, default=None,
+            help="Only compact events up to this offset (default: the lowest acknowledged consumer offset).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        removed = compact(options["horizon"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} superseded change events."))
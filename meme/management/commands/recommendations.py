@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from meme.recommendations import CHUNK_SIZE, TOP_K, refresh
+
+
+class Command(BaseCommand):
+    help = "Recompute the co-vote neighbours served by /api/coins/{id}/similar/."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recompute every coin, not only those with new votes.")
+        parser.add_argument("--top", type=int, default=TOP_K, help="Neighbours kept per coin.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Votes read per query.")
+        parser.add_argument("--python", action="store_true", help="Use the pure Python path even when NumPy/SciPy are installed.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = refresh(
+            full=options["full"], k=options["top"], chunk_size=options["chunk_size"],
+            vectorized=False if options["python"] else None, log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {count} coins in {time.perf_counter() - start:.1f}s."))
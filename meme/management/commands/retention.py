@@ -0,0 +1,51 @@
+import datetime
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from meme.retention import BATCH_SIZE, get_policies, partition_sql, purge
+
+
+def format_bytes(value):
+    if value is None:
+        return "unknown size"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024 or unit == "GiB":
+            return f"{value:,.0f} {unit}" if unit == "B" else f"{value:,.1f} {unit}"
+        value /= 1024
+
+
+class Command(BaseCommand):
+    help = "Purge or archive rows and log files past the ages set in settings.RETENTION."
+
+    def add_arguments(self, parser):
+        parser.add_argument("labels", nargs="*", help="Only apply these policies (e.g. meme.notification logs).")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be removed without removing it.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between batches.")
+        parser.add_argument(
+            "--partition-sql", metavar="LABEL",
+            help="Print the PostgreSQL statements converting LABEL's table to monthly partitions and exit.",
+        )
+        parser.add_argument("--start", default=None, help="First partition month (YYYY-MM); defaults to this month.")
+        parser.add_argument("--months", type=int, default=12, help="Number of monthly partitions to create.")
+
+    def handle(self, *args, **options):
+        if options["partition_sql"]:
+            start = datetime.datetime.strptime(options["start"], "%Y-%m").date() if options["start"] else datetime.date.today()
+            for statement in partition_sql(apps.get_model(options["partition_sql"]), start, options["months"]):
+                self.stdout.write(f"{statement};")
+            return
+
+        policies = get_policies(options["labels"])
+        if not policies:
+            raise CommandError("No retention policies to apply.")
+        verb = "would remove" if options["dry_run"] else "removed"
+        for policy in policies:
+            report = purge(policy, batch_size=options["batch_size"], dry_run=options["dry_run"], pause=options["pause"])
+            action = "archive" if policy.archive else "purge"
+            unit = "files" if policy.label == "logs" else "rows"
+            self.stdout.write(
+                f"{report.label} ({action}, older than {policy.days} days): {verb} "
+                f"{report.rows} {unit}, {format_bytes(report.bytes)} in {report.seconds:.1f}s"
+            )
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from meme.models import User
+from meme.seeding import BATCH_SIZE, seed
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic users, coins, votes, communities, posts and comments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--coins", type=int, default=1000)
+        parser.add_argument("--votes", type=int, default=200000)
+        parser.add_argument("--communities", type=int, default=200)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=100000)
+        parser.add_argument("--notifications", type=int, default=50000)
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same data.")
+        parser.add_argument("--prefix", default="seed", help="Prefix of generated usernames and names.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of coin, author and post popularity.")
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if User.objects.filter(username=f"{prefix}-0").exists():
+            raise CommandError(f"Data with prefix '{prefix}' already exists; pick another --prefix.")
+
+        def log(table, rows, seconds):
+            rate = rows / seconds if seconds else 0
+            self.stdout.write(f"{table}: {rows} rows in {seconds:.1f}s ({rate:,.0f} rows/s)")
+
+        start = time.perf_counter()
+        seed(
+            users=options["users"], coins=options["coins"], votes=options["votes"],
+            communities=options["communities"], posts=options["posts"], comments=options["comments"],
+            notifications=options["notifications"], seed=options["seed"], prefix=prefix,
+            batch_size=options["batch_size"], zipf_s=options["zipf"], log=log,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {time.perf_counter() - start:.1f}s."))
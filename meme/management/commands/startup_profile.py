@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from meme.startup import STAGES, cold_start, profile_imports
+
+
+class Command(BaseCommand):
+    help = "Show which modules dominate import time at startup, and the cold-start time to a first response."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stage", choices=sorted(STAGES), default="wsgi", help="How far to start the process (default: wsgi).")
+        parser.add_argument("--top", type=int, default=25, help="Number of modules to list.")
+        parser.add_argument("--path", default="/api/", help="Path of the first request for the cold-start timing.")
+
+    def handle(self, *args, **options):
+        times = profile_imports(options["stage"])
+        total = sum(item.cumulative_us for item in times if item.depth == 0)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Imports ({options['stage']}): {len(times)} modules, {total / 1000:.1f} ms"))
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>8}  module")
+        for item in times[:options["top"]]:
+            self.stdout.write(f"{item.cumulative_us / 1000:14.1f} {item.self_us / 1000:8.1f}  {item.module}")
+
+        total, load, first_request = cold_start(options["path"])
+        self.stdout.write(self.style.MIGRATE_HEADING("Cold start"))
+        self.stdout.write(f"  load application: {load * 1000:.1f} ms")
+        self.stdout.write(f"  first request ({options['path']}): {first_request * 1000:.1f} ms")
+        self.stdout.write(f"  process total: {total * 1000:.1f} ms")
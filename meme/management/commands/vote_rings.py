@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from meme.voterings import CHUNK_SIZE, DAYS, MIN_RING_SIZE, MIN_SHARED, WINDOW, detect
+
+
+class Command(BaseCommand):
+    help = "Look for vote rings in recent votes and store them for moderators (/api/vote-rings/)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=DAYS, help="Votes of the last DAYS days are analysed.")
+        parser.add_argument("--window", type=int, default=WINDOW, help="Seconds within which votes count as cast together.")
+        parser.add_argument("--min-shared", type=int, default=MIN_SHARED, help="Coins two accounts must vote on together to be linked.")
+        parser.add_argument("--min-size", type=int, default=MIN_RING_SIZE, help="Smallest ring reported.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Votes read per query.")
+        parser.add_argument("--python", action="store_true", help="Use the pure Python path even when NumPy/SciPy are installed.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rings = detect(
+            days=options["days"], window=options["window"], min_shared=options["min_shared"],
+            min_size=options["min_size"], chunk_size=options["chunk_size"],
+            vectorized=False if options["python"] else None, log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Stored {len(rings)} vote rings in {time.perf_counter() - start:.1f}s."))
@@ -0,0 +1,202 @@
+"""
+Per-route request metrics.
+
+MetricsMiddleware records, for every request, the latency, the number and
+duration of database queries, the time spent serializing and the response
+size, keyed by the resolved URL name. Queries that repeat with the same SQL
+shape within one request are reported as N+1 suspects. Metrics live in
+process memory: each worker exports its own series.
+"""
+import bisect
+import contextvars
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def sql_shape(sql):
+    """
+    Normalise ``sql`` so queries differing only in literals or IN-list
+    length compare equal.
+    """
+    return _NUMBER.sub("?", _IN_LIST.sub("(%s...)", sql))
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "serializer_time", "shapes")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.shapes[sql_shape(sql)] += 1
+
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timer():
+    """
+    Add the time spent in the block to the current request's serializer
+    time. A no-op outside of a recorded request.
+    """
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_time += time.perf_counter() - start
+
+
+class RouteMetrics:
+    __slots__ = ("buckets", "count", "latency", "queries", "db_time", "serializer_time", "bytes", "n_plus_one", "last_n_plus_one")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.latency = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.bytes = 0
+        self.n_plus_one = 0
+        self.last_n_plus_one = None
+
+    def quantile(self, q):
+        """
+        Estimate a latency quantile from the histogram (bucket upper bound).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else float("inf")
+        return float("inf")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, method, route, latency, stats, size):
+        threshold = getattr(settings, "METRICS_N_PLUS_ONE_THRESHOLD", 5)
+        repeated = None
+        if stats.shapes:
+            shape, times = stats.shapes.most_common(1)[0]
+            if times >= threshold:
+                repeated = shape
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, latency)
+        with self._lock:
+            metrics = self.routes.get((method, route))
+            if metrics is None:
+                metrics = self.routes[(method, route)] = RouteMetrics()
+            metrics.buckets[bucket] += 1
+            metrics.count += 1
+            metrics.latency += latency
+            metrics.queries += stats.queries
+            metrics.db_time += stats.db_time
+            metrics.serializer_time += stats.serializer_time
+            metrics.bytes += size
+            if repeated is not None:
+                metrics.n_plus_one += 1
+                metrics.last_n_plus_one = repeated
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+
+    def summary(self):
+        """
+        Per-route averages and latency quantiles, slowest routes first.
+        """
+        rows = []
+        with self._lock:
+            for (method, route), m in self.routes.items():
+                rows.append({
+                    "method": method,
+                    "route": route,
+                    "requests": m.count,
+                    "avg_ms": m.latency / m.count * 1000,
+                    "p50_ms": m.quantile(0.5) * 1000,
+                    "p95_ms": m.quantile(0.95) * 1000,
+                    "p99_ms": m.quantile(0.99) * 1000,
+                    "avg_queries": m.queries / m.count,
+                    "avg_db_ms": m.db_time / m.count * 1000,
+                    "avg_serializer_ms": m.serializer_time / m.count * 1000,
+                    "avg_bytes": m.bytes / m.count,
+                    "n_plus_one_requests": m.n_plus_one,
+                    "n_plus_one_sql": m.last_n_plus_one,
+                })
+        return sorted(rows, key=lambda row: row["avg_ms"], reverse=True)
+
+    def prometheus(self):
+        """
+        Render all series in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            routes = sorted(self.routes.items())
+            header("http_request_duration_seconds", "histogram", "Request latency by route.")
+            for (method, route), m in routes:
+                labels = f'method="{method}",route="{route}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), m.buckets):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {m.latency}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {m.count}")
+            for name, attr, help_text in (
+                ("http_db_queries_total", "queries", "Database queries by route."),
+                ("http_db_query_seconds_total", "db_time", "Time spent in database queries by route."),
+                ("http_serializer_seconds_total", "serializer_time", "Time spent serializing by route."),
+                ("http_response_bytes_total", "bytes", "Response body bytes by route."),
+                ("http_n_plus_one_requests_total", "n_plus_one", "Requests repeating one SQL shape by route."),
+            ):
+                header(name, "counter", help_text)
+                for (method, route), m in routes:
+                    lines.append(f'{name}{{method="{method}",route="{route}"}} {getattr(m, attr)}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
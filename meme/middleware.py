@@ -0,0 +1,197 @@
+import math
+import time
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _gzip_compressor():
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return compressor.compress, compressor.flush
+
+
+def _brotli_compressor():
+    compressor = brotli.Compressor(quality=5)
+    return compressor.process, compressor.finish
+
+
+def _zstd_compressor():
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    return compressor.compress, compressor.flush
+
+
+# Supported encodings in order of preference
+COMPRESSORS = {}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = _zstd_compressor
+if brotli is not None:
+    COMPRESSORS["br"] = _brotli_compressor
+COMPRESSORS["gzip"] = _gzip_compressor
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick the supported encoding with the highest q-value in an
+    Accept-Encoding header, or None.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    for coding in COMPRESSORS:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with zstd, brotli (when their packages are
+    installed) or gzip, following the client's Accept-Encoding. Bodies
+    under COMPRESSION_MIN_SIZE bytes are sent as is; streaming responses
+    are compressed chunk by chunk.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 512)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header("Content-Encoding") or response.status_code in (204, 304):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        compress, flush = COMPRESSORS[encoding]()
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async(response.streaming_content, compress, flush)
+            else:
+                response.streaming_content = self._compress_stream(response.streaming_content, compress, flush)
+            del response["Content-Length"]
+        else:
+            content = compress(response.content) + flush()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response["Content-Length"] = str(len(content))
+
+        # The body changed, so a strong ETag no longer applies
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def _compress_stream(chunks, compress, flush):
+        for chunk in chunks:
+            data = compress(chunk)
+            if data:
+                yield data
+        yield flush()
+
+    @staticmethod
+    async def _compress_async(chunks, compress, flush):
+        async for chunk in chunks:
+            data = compress(chunk)
+            if data:
+                yield data
+        yield flush()
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Adds X-RateLimit-* headers describing the tightest throttle that was
+    checked while handling the request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        result = getattr(request, "ratelimit", None)
+        if result is not None:
+            for name, value in rate_limit_headers(result).items():
+                if name != "Retry-After" or name not in response:
+                    response[name] = value
+        return response
+
+
+def rate_limit_headers(result):
+    """
+    The X-RateLimit-* (and Retry-After) headers describing a RateLimitResult.
+    """
+    headers = {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(math.ceil(result.reset)),
+    }
+    if result.retry_after is not None:
+        headers["Retry-After"] = str(math.ceil(result.retry_after))
+    return headers
+
+
+class MetricsMiddleware:
+    """
+    Records latency, database queries, serializer time and response size
+    per route (see metrics.py). Goes first in MIDDLEWARE so the latency and
+    size cover the whole stack, compression included.
+    """
+
+    # Anything else is reported as OTHER to keep the label set bounded
+    METHODS = {"GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "METRICS_ENABLED", True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        stats, token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        latency = time.perf_counter() - start
+        match = request.resolver_match
+        route = (match.view_name or match.route) if match is not None else "<unresolved>"
+        size = 0 if response.streaming else len(response.content)
+        method = request.method if request.method in self.METHODS else "OTHER"
+        metrics.registry.record(method, route, latency, stats, size)
+        return response
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meme', '0005_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('vote_type', models.CharField(choices=[('upvote', 'Upvote'), ('downvote', 'Downvote')], max_length=10)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('coin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_votes', to='meme.coin')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_votes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'coin'], name='meme_votear_user_id_a5d4fa_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def number_existing_notes(apps, schema_editor):
+    # Give existing notes sequence numbers 1..n per user, oldest change first
+    Note = apps.get_model('meme', 'Note')
+    NoteSequence = apps.get_model('meme', 'NoteSequence')
+    counters = {}
+    batch = []
+    for note in Note.objects.order_by('user_id', 'updated_at', 'pk').only('pk', 'user_id').iterator():
+        counters[note.user_id] = note.seq = counters.get(note.user_id, 0) + 1
+        batch.append(note)
+        if len(batch) == 1000:
+            Note.objects.bulk_update(batch, ['seq'])
+            batch = []
+    Note.objects.bulk_update(batch, ['seq'])
+    NoteSequence.objects.bulk_create([NoteSequence(user_id=user_id, value=value) for user_id, value in counters.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meme', '0006_vote_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteSequence',
+            fields=[
+                ('user', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NoteTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('note_id', models.BigIntegerField()),
+                ('seq', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['user', 'seq'], name='meme_note_user_id_1d5f2d_idx'),
+        ),
+        migrations.AddField(
+            model_name='notetombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notetombstone',
+            index=models.Index(fields=['user', 'seq'], name='meme_noteto_user_id_660544_idx'),
+        ),
+        migrations.RunPython(number_existing_notes, migrations.RunPython.noop),
+    ]
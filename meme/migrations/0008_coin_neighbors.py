@@ -0,0 +1,23 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meme', '0007_note_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoinNeighbors',
+            fields=[
+                ('coin', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='neighbors', serialize=False, to='meme.coin')),
+                ('neighbor_ids', models.JSONField(default=list)),
+                ('scores', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
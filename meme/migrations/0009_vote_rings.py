@@ -0,0 +1,30 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meme', '0008_coin_neighbors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteRing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True)),
+                ('member_ids', models.JSONField(default=list)),
+                ('coin_votes', models.JSONField(default=dict)),
+                ('votes', models.IntegerField(default=0)),
+                ('pairs', models.IntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('dismissed', 'Dismissed')], db_index=True, default='pending', max_length=10)),
+                ('detected_at', models.DateTimeField()),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('reviewed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
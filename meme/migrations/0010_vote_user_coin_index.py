@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-19 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meme', '0009_vote_rings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['user', 'coin'], name='meme_vote_user_id_820947_idx'),
+        ),
+    ]
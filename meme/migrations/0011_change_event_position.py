@@ -0,0 +1,37 @@
+# Generated by Django 4.2.17 on 2026-10-19 19:18
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def position_existing_events(apps, schema_editor):
+    # Existing events are committed: their ids are valid positions
+    ChangeEvent = apps.get_model('meme', 'ChangeEvent')
+    ChangeSequence = apps.get_model('meme', 'ChangeSequence')
+    db = schema_editor.connection.alias
+    ChangeEvent.objects.using(db).update(position=F('id'))
+    last = ChangeEvent.objects.using(db).aggregate(last=Max('id'))['last'] or 0
+    ChangeSequence.objects.using(db).create(pk=1, value=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meme', '0010_vote_user_coin_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='changeevent',
+            name='position',
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+        migrations.RunPython(position_existing_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-19 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meme', '0011_change_event_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coinneighbors',
+            name='voters',
+            field=models.IntegerField(null=True),
+        ),
+    ]
@@ -1,7 +1,20 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router, transaction
 from django.contrib.auth.models import AbstractUser
 
 
+class AtomicSaveMixin:
+    '''
+    Runs save() in a transaction so rows written by the save signal
+    handlers (change events, see meme.outbox; note sequence numbers, see
+    meme.sync) commit or roll back with the row
+    '''
+    def save(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
 class User(AbstractUser):
     '''
     AbstractUser Class for the general model
@@ -32,8 +45,12 @@ class User(AbstractUser):
         verbose_name='user permissions'
     )
 
+    class Meta(AbstractUser.Meta):
+        # Admin search looks users up by exact email
+        indexes = [models.Index(fields=["email"])]
 
-class Coin(models.Model):
+
+class Coin(AtomicSaveMixin, models.Model):
     '''
     Coin class
     '''
@@ -41,8 +58,8 @@ class Coin(models.Model):
         ("meme", "Meme"), 
         ("utility", "Utility")
     ]
-    name = models.CharField(max_length=100)
-    symbol = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
+    symbol = models.CharField(max_length=100, db_index=True)
     description = models.TextField()
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default="meme")
     logo = models.ImageField(upload_to="coin_logos/", null=True, blank=True)
@@ -51,7 +68,7 @@ class Coin(models.Model):
     total_votes = models.IntegerField(default=0)
 
 
-class Vote(models.Model):
+class Vote(AtomicSaveMixin, models.Model):
     '''
     Vote Class
     '''
@@ -62,10 +79,71 @@ class Vote(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="votes")
     coin = models.ForeignKey(Coin, on_delete=models.CASCADE, related_name="votes")
     vote_type = models.CharField(max_length=10, choices=VOTE_TYPE_CHOICES)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        # Voting and the per-user vote lookups (my_vote, /api/votes/mine/)
+        # find a user's vote on given coins
+        indexes = [models.Index(fields=["user", "coin"])]
+
+
+class VoteArchive(models.Model):
+    '''
+    Vote Archive Class: cold votes moved out of the vote table by the
+    retention job, keeping their id and timestamps. Still counted when
+    vote totals are recomputed
+    '''
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_votes")
+    coin = models.ForeignKey(Coin, on_delete=models.CASCADE, related_name="archived_votes")
+    vote_type = models.CharField(max_length=10, choices=Vote.VOTE_TYPE_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Re-voting looks up the archived vote of a user on a coin
+        indexes = [models.Index(fields=["user", "coin"])]
+
 
+class CoinNeighbors(models.Model):
+    '''
+    Coin Neighbors Class: the coins most often upvoted by the voters of a
+    coin, best first, with their similarity scores, and the coin's voter
+    count the scores of incremental runs use. Written by the
+    recommendations job (see meme.recommendations)
+    '''
+    coin = models.OneToOneField(Coin, on_delete=models.CASCADE, primary_key=True, related_name="neighbors")
+    neighbor_ids = models.JSONField(default=list)
+    scores = models.JSONField(default=list)
+    voters = models.IntegerField(null=True)
+    computed_at = models.DateTimeField()
+
+
+class VoteRing(models.Model):
+    '''
+    Vote Ring Class: a cluster of users who repeatedly cast the same vote
+    on the same coins within minutes of each other, found by the vote ring
+    job (see meme.voterings) and reviewed by moderators. coin_votes maps
+    coin ids to the net votes the ring cast on them together
+    '''
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("confirmed", "Confirmed"),
+        ("dismissed", "Dismissed"),
+    ]
+    # Hash of the member ids: a ring found again updates its row
+    fingerprint = models.CharField(max_length=40, unique=True)
+    member_ids = models.JSONField(default=list)
+    coin_votes = models.JSONField(default=dict)
+    votes = models.IntegerField(default=0)
+    pairs = models.IntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending", db_index=True)
+    detected_at = models.DateTimeField()
+    reviewed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    reviewed_at = models.DateTimeField(null=True, blank=True)
 
-class Community(models.Model):
+
+class Community(AtomicSaveMixin, models.Model):
     '''
     Community Class
     '''
@@ -76,27 +154,27 @@ class Community(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 
-class Post(models.Model):
+class Post(AtomicSaveMixin, models.Model):
     '''
     Post Class
     '''
-    title = models.CharField(max_length=200)
+    title = models.CharField(max_length=200, db_index=True)
     content = models.TextField()
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts", null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-class Comment(models.Model):
+class Comment(AtomicSaveMixin, models.Model):
     '''
     Comment Class
     '''
     content = models.TextField()
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
 
-class Note(models.Model):
+class Note(AtomicSaveMixin, models.Model):
     '''
     Note Class
     '''
@@ -105,6 +183,36 @@ class Note(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Position of the note's last change in its user's change sequence
+    seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        # Delta sync reads a user's notes changed after a sequence number
+        indexes = [models.Index(fields=["user", "seq"])]
+
+
+class NoteSequence(models.Model):
+    '''
+    Note Sequence Class: the last change sequence number handed out for a
+    user's notes. Not constrained to the user, so the counter can still be
+    bumped while the user's notes are deleted with the user
+    '''
+    user = models.OneToOneField(User, on_delete=models.DO_NOTHING, db_constraint=False, primary_key=True, related_name="+")
+    value = models.BigIntegerField(default=0)
+
+
+class NoteTombstone(models.Model):
+    '''
+    Note Tombstone Class: records a deleted note so syncing clients can
+    drop it. Purged by the retention job once no sync token can predate it
+    '''
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    note_id = models.BigIntegerField()
+    seq = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "seq"])]
 
 
 class Rating(models.Model):
@@ -134,7 +242,7 @@ class UserBadge(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="badges")
     badge = models.ForeignKey(Badge, on_delete=models.CASCADE)
     awarded_at = models.DateTimeField(auto_now_add=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
 class Notification(models.Model):
     '''
@@ -144,7 +252,7 @@ class Notification(models.Model):
     content = models.TextField()
     link = models.URLField(null=True, blank=True)
     read = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
 
 class Analytics(models.Model):
@@ -156,4 +264,55 @@ class Analytics(models.Model):
     upvotes = models.IntegerField(default=0)
     downvotes = models.IntegerField(default=0)
     total_votes = models.IntegerField(default=0)
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class TableVersion(models.Model):
+    '''
+    Table Version Class: a counter bumped on every write to a table, used
+    to build ETags without reading the rows themselves
+    '''
+    label = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+
+class ChangeEvent(models.Model):
+    '''
+    Change Event Class: one row per create, update or delete of an
+    outbox model, appended in the transaction that made the change. The
+    position, handed out after commit (see meme.outbox.sequence), is the
+    offset consumers of /api/changes/ resume from
+    '''
+    OPERATION_CHOICES = [
+        ("create", "Create"),
+        ("update", "Update"),
+        ("delete", "Delete"),
+    ]
+    label = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64)
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    position = models.BigIntegerField(null=True, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        # Compaction looks for later events of the same object
+        indexes = [models.Index(fields=["label", "object_id", "id"])]
+
+
+class ChangeSequence(models.Model):
+    '''
+    Change Sequence Class: the last position handed out to change
+    events. Its single row is locked while positions are assigned, so
+    sequencing runs one step at a time
+    '''
+    value = models.BigIntegerField(default=0)
+
+
+class ChangeConsumer(models.Model):
+    '''
+    Change Consumer Class: the last offset a named consumer of the change
+    feed has acknowledged
+    '''
+    name = models.CharField(max_length=100, primary_key=True)
+    offset = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,169 @@
+"""
+Transactional outbox and change feed.
+
+Every create, update and delete of an outbox model appends a ChangeEvent in
+the transaction that made the change (post_save and post_delete handlers in
+meme.signals; saves are made atomic by AtomicSaveMixin). Downstream consumers
+tail the feed from an offset through /api/changes/ and acknowledge what
+they processed, so they never re-read whole tables.
+
+Offsets are not event ids: ids are handed out at insert, and a transaction
+holding id N can commit after one holding N + 1, which a consumer may
+already have read. Events are given positions after they commit instead,
+by sequence(), one locked step at a time, so a position is only ever
+handed out above every position already visible.
+
+Writes that skip signals (``bulk_create()``, ``QuerySet.update()``, the
+seeding command) are not recorded, except retention purges, which record
+the rows they delete with record_deletes().
+"""
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Exists, F, Max, Min, OuterRef
+
+from .models import Coin, Vote, Community, Post, Comment, ChangeEvent, ChangeConsumer, ChangeSequence
+
+OUTBOX_MODELS = (Coin, Vote, Community, Post, Comment)
+
+# Events returned per read by default and at most
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Events positioned per sequence() statement
+SEQUENCE_BATCH = 1000
+
+
+def serialize(instance):
+    """
+    The concrete column values of ``instance``, keyed by attname
+    (``coin_id`` rather than ``coin``); files are stored by name.
+    """
+    payload = {}
+    for field in instance._meta.concrete_fields:
+        value = field.value_from_object(instance)
+        payload[field.attname] = getattr(value, "name", value) if hasattr(value, "storage") else value
+    return payload
+
+
+def record(instance, operation, payload=None):
+    if not getattr(settings, "OUTBOX_ENABLED", True):
+        return None
+    return ChangeEvent.objects.using(instance._state.db or "default").create(
+        label=instance._meta.label_lower,
+        object_id=str(instance.pk),
+        operation=operation,
+        payload=serialize(instance) if payload is None else payload,
+    )
+
+
+def record_deletes(model, pks, using):
+    """
+    Record the deletes of the ``model`` rows ``pks`` before they are
+    removed with raw SQL (retention purges), one event per row written in
+    a single insert.
+    """
+    if not getattr(settings, "OUTBOX_ENABLED", True):
+        return
+    ChangeEvent.objects.using(using).bulk_create([
+        ChangeEvent(label=model._meta.label_lower, object_id=str(instance.pk), operation="delete",
+                    payload=serialize(instance))
+        for instance in model._default_manager.using(using).filter(pk__in=pks)
+    ])
+
+
+def sequence():
+    """
+    Give the committed events without a position the next positions, in
+    id order. The counter row stays locked until the step commits, so the
+    next step waits for it and only hands out higher positions. Returns
+    the number of events positioned.
+    """
+    using = router.db_for_write(ChangeEvent)
+    pending = ChangeEvent.objects.using(using).filter(position__isnull=True)
+    if not pending.exists():
+        return 0
+    with transaction.atomic(using=using):
+        counter = ChangeSequence.objects.using(using).filter(pk=1)
+        if not counter.update(value=F("value")):
+            ChangeSequence.objects.using(using).get_or_create(pk=1)
+        value = counter.select_for_update().values_list("value", flat=True).get()
+        positioned = 0
+        while True:
+            batch = list(pending.order_by("pk").values_list("pk", flat=True)[:SEQUENCE_BATCH])
+            if not batch:
+                break
+            events = [ChangeEvent(pk=pk, position=value + i) for i, pk in enumerate(batch, 1)]
+            ChangeEvent.objects.using(using).bulk_update(events, ["position"])
+            value += len(batch)
+            positioned += len(batch)
+        counter.update(value=value)
+    return positioned
+
+
+def latest_offset():
+    """
+    The highest position, once the committed events are positioned.
+    """
+    sequence()
+    return ChangeEvent.objects.aggregate(last=Max("position"))["last"] or 0
+
+
+def read(after=0, limit=DEFAULT_LIMIT, labels=None):
+    """
+    Return (events, has_more): up to ``limit`` events with an offset
+    greater than ``after``, oldest first, as dicts. Committed events are
+    positioned first.
+    """
+    sequence()
+    limit = max(1, min(limit, MAX_LIMIT))
+    queryset = ChangeEvent.objects.filter(position__gt=after).order_by("position")
+    if labels:
+        queryset = queryset.filter(label__in=labels)
+    events = list(queryset.values(
+        "id", "label", "object_id", "operation", "payload", "created_at", offset=F("position"),
+    )[:limit + 1])
+    return events[:limit], len(events) > limit
+
+
+def get_offset(consumer):
+    return ChangeConsumer.objects.filter(pk=consumer).values_list("offset", flat=True).first() or 0
+
+
+def acknowledge(consumer, offset):
+    """
+    Store ``offset`` as the position of ``consumer``. Offsets only move
+    forward, so a late or repeated acknowledgement is harmless.
+    """
+    with transaction.atomic():
+        position, _ = ChangeConsumer.objects.select_for_update().get_or_create(pk=consumer)
+        if offset > position.offset:
+            position.offset = offset
+            position.save(update_fields=["offset", "updated_at"])
+    return position.offset
+
+
+def compact(horizon=None, batch_size=1000):
+    """
+    Delete events superseded by a later event for the same object, up to
+    offset ``horizon`` (by default the lowest acknowledged consumer
+    offset). A consumer starting from zero still ends up with the latest
+    state of every object. Deletes run in batches of ``batch_size``;
+    returns the number of events removed.
+    """
+    sequence()
+    if horizon is None:
+        horizon = ChangeConsumer.objects.aggregate(offset=Min("offset"))["offset"]
+        if horizon is None:
+            horizon = latest_offset()
+    # Writes to one object are serialized by its row lock, so among its
+    # events id order is commit order
+    superseded = ChangeEvent.objects.filter(position__lte=horizon).filter(Exists(
+        ChangeEvent.objects.filter(label=OuterRef("label"), object_id=OuterRef("object_id"), pk__gt=OuterRef("pk"))
+    ))
+    removed = last = 0
+    while True:
+        batch = list(superseded.filter(pk__gt=last).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            return removed
+        removed += ChangeEvent.objects.filter(pk__in=batch).delete()[0]
+        last = batch[-1]
@@ -0,0 +1,303 @@
+"""
+"Users who upvoted this coin also upvoted…" recommendations.
+
+An offline job (``manage.py recommendations``) streams upvotes into a
+sparse user x coin matrix and scores every pair of coins by the cosine
+similarity of their voters:
+
+    score(a, b) = voters(a & b) / sqrt(voters(a) * voters(b))
+
+The top neighbours of each coin are stored in one CoinNeighbors row and
+served by /api/coins/{id}/similar/. With NumPy and SciPy installed the
+scores are computed with sparse matrix products, a chunk of coins at a
+time; without them a pure Python version gives the same results, more
+slowly.
+
+Incremental runs only recompute the coins that received votes since the
+last run, found through the change feed (meme.outbox). They build the
+matrix from the upvotes of those coins' voters alone and take the voter
+counts of the other coins they reach from the previous run, so their cost
+follows the new votes rather than the size of the vote table. Users with
+more than MAX_USER_UPVOTES upvotes (bots, mostly) are left out: they add
+noise and cost quadratic work.
+"""
+import heapq
+import math
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count
+from django.utils import timezone
+
+from . import outbox
+from .models import Vote, CoinNeighbors
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+TOP_K = 20
+MAX_USER_UPVOTES = 1000
+CHUNK_SIZE = 100000
+
+# Coins whose neighbours are computed and saved together
+SAVE_BATCH = 1000
+
+# Voters whose upvotes are read per query by incremental runs
+USER_BATCH = 1000
+
+# Change feed consumer recording how far incremental runs got
+CONSUMER = "recommendations"
+
+
+def stream_upvotes(chunk_size=CHUNK_SIZE):
+    """
+    Yield lists of (user_id, coin_id) upvote pairs, ``chunk_size`` at a
+    time, walking the vote table in primary key order.
+    """
+    last = 0
+    while True:
+        rows = list(
+            Vote.objects.filter(vote_type="upvote", pk__gt=last).order_by("pk")
+            .values_list("pk", "user_id", "coin_id")[:chunk_size]
+        )
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield [(user_id, coin_id) for _, user_id, coin_id in rows]
+
+
+def stream_voter_upvotes(coin_ids, chunk_size=USER_BATCH):
+    """
+    Yield lists of the (user_id, coin_id) upvote pairs of every user who
+    upvoted one of ``coin_ids``, ``chunk_size`` users at a time.
+    """
+    upvotes = Vote.objects.filter(vote_type="upvote")
+    voters = sorted(set(upvotes.filter(coin_id__in=coin_ids).values_list("user_id", flat=True)))
+    for start in range(0, len(voters), chunk_size):
+        yield list(upvotes.filter(user_id__in=voters[start:start + chunk_size]).values_list("user_id", "coin_id"))
+
+
+def stored_voter_counts(coin_ids):
+    """
+    {coin id: voter count} of ``coin_ids`` as of their last computation.
+    Coins never computed are counted from the vote table, heavy voters
+    included.
+    """
+    counts = {}
+    coin_ids = list(coin_ids)
+    for start in range(0, len(coin_ids), SAVE_BATCH):
+        batch = coin_ids[start:start + SAVE_BATCH]
+        counts.update(CoinNeighbors.objects.filter(coin_id__in=batch, voters__isnull=False).values_list("coin_id", "voters"))
+        missing = [coin for coin in batch if coin not in counts]
+        if missing:
+            counts.update(Vote.objects.filter(vote_type="upvote", coin_id__in=missing).order_by()
+                          .values_list("coin_id").annotate(n=Count("user_id", distinct=True)))
+    return counts
+
+
+class PythonMatrix:
+    """
+    The upvote matrix as user -> coins and coin -> users arrays.
+    """
+
+    def __init__(self, chunks, max_user_upvotes=MAX_USER_UPVOTES):
+        user_coins = defaultdict(lambda: array("q"))
+        for chunk in chunks:
+            for user_id, coin_id in chunk:
+                user_coins[user_id].append(coin_id)
+        self.user_coins = {user: coins for user, coins in user_coins.items() if len(coins) <= max_user_upvotes}
+        self.coin_users = defaultdict(lambda: array("q"))
+        for user, coins in self.user_coins.items():
+            for coin in coins:
+                self.coin_users[coin].append(user)
+        self.counts = {coin: len(users) for coin, users in self.coin_users.items()}
+
+    @property
+    def coins(self):
+        return list(self.coin_users)
+
+    def voter_counts(self, coin_ids):
+        return {coin: self.counts.get(coin, 0) for coin in coin_ids}
+
+    def set_voter_counts(self, counts):
+        """
+        Score against ``counts`` voters for these coins, for a matrix
+        holding only some of their voters (which it still counts when
+        ``counts`` is stale).
+        """
+        for coin, count in counts.items():
+            if coin in self.counts:
+                self.counts[coin] = max(self.counts[coin], count)
+
+    def neighbors(self, coin_ids, k=TOP_K):
+        coin_users, user_coins, counts = self.coin_users, self.user_coins, self.counts
+        results = {}
+        for coin in coin_ids:
+            voters = coin_users.get(coin)
+            if not voters:
+                results[coin] = []
+                continue
+            together = Counter()
+            for user in voters:
+                together.update(user_coins[user])
+            del together[coin]
+            size = counts[coin]
+            scores = ((-count / math.sqrt(size * counts[other]), other) for other, count in together.items())
+            results[coin] = [(other, -score) for score, other in heapq.nsmallest(k, scores)]
+        return results
+
+
+class VectorizedMatrix:
+    """
+    The upvote matrix as a SciPy sparse matrix. Similarities are computed
+    for ``batch`` coins per sparse product.
+    """
+    batch = 512
+
+    def __init__(self, chunks, max_user_upvotes=MAX_USER_UPVOTES):
+        pairs = [np.asarray(chunk, dtype=np.int64).reshape(-1, 2) for chunk in chunks]
+        pairs = np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+        users, rows = np.unique(pairs[:, 0], return_inverse=True)
+        self.coin_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(pairs), dtype=np.float32), (rows, columns)), shape=(len(users), len(self.coin_ids))
+        )
+        matrix.data[:] = 1
+        heavy = np.diff(matrix.indptr) > max_user_upvotes
+        if heavy.any():
+            matrix = sparse.diags((~heavy).astype(np.float32)) @ matrix
+            matrix.eliminate_zeros()
+        self.matrix = matrix.tocsr()
+        self.by_coin = self.matrix.T.tocsr()
+        self.norms = np.sqrt(np.asarray(self.matrix.sum(axis=0)).ravel())
+        self.column = {int(coin): index for index, coin in enumerate(self.coin_ids)}
+
+    @property
+    def coins(self):
+        return self.coin_ids.tolist()
+
+    def voter_counts(self, coin_ids):
+        return {coin: int(round(self.norms[self.column[coin]] ** 2)) if coin in self.column else 0 for coin in coin_ids}
+
+    def set_voter_counts(self, counts):
+        """
+        Score against ``counts`` voters for these coins, for a matrix
+        holding only some of their voters (which it still counts when
+        ``counts`` is stale).
+        """
+        for coin, count in counts.items():
+            if coin in self.column:
+                column = self.column[coin]
+                self.norms[column] = max(self.norms[column], math.sqrt(count))
+
+    def neighbors(self, coin_ids, k=TOP_K):
+        results = {coin: [] for coin in coin_ids}
+        columns = np.array([self.column[coin] for coin in coin_ids if coin in self.column], dtype=np.int64)
+        for start in range(0, len(columns), self.batch):
+            batch = columns[start:start + self.batch]
+            # Rows: the batch's coins; columns: every coin; values: shared voters
+            together = (self.by_coin[batch] @ self.matrix).tocsr()
+            for row, column in enumerate(batch):
+                begin, end = together.indptr[row], together.indptr[row + 1]
+                others = together.indices[begin:end]
+                scores = together.data[begin:end] / (self.norms[column] * self.norms[others])
+                scores[others == column] = 0
+                if len(scores) > k:
+                    best = np.argpartition(-scores, k)[:k]
+                else:
+                    best = np.arange(len(scores))
+                best = best[np.lexsort((others[best], -scores[best]))]
+                coin = int(self.coin_ids[column])
+                results[coin] = [(int(self.coin_ids[others[i]]), float(scores[i])) for i in best if scores[i] > 0]
+        return results
+
+
+def build_matrix(chunks, vectorized=None):
+    """
+    The upvote matrix of ``chunks`` of (user_id, coin_id) pairs, vectorized
+    when NumPy and SciPy are available (or as ``vectorized`` says).
+    """
+    if vectorized is None:
+        vectorized = np is not None
+    if vectorized and np is None:
+        raise ImproperlyConfigured("Vectorized recommendations need numpy and scipy.")
+    return (VectorizedMatrix if vectorized else PythonMatrix)(chunks)
+
+
+def changed_coins(after):
+    """
+    Return (coin ids, offset): the coins whose votes changed after change
+    feed offset ``after`` and the offset reached.
+    """
+    coins = set()
+    while True:
+        events, has_more = outbox.read(after, outbox.MAX_LIMIT, ["meme.vote"])
+        coins.update(event["payload"]["coin_id"] for event in events)
+        if events:
+            after = events[-1]["offset"]
+        if not has_more:
+            return coins, after
+
+
+def save_neighbors(neighbors, voters):
+    now = timezone.now()
+    CoinNeighbors.objects.bulk_create(
+        [
+            CoinNeighbors(coin_id=coin, neighbor_ids=[other for other, _ in best],
+                          scores=[round(score, 6) for _, score in best], voters=voters[coin], computed_at=now)
+            for coin, best in neighbors.items()
+        ],
+        batch_size=SAVE_BATCH,
+        update_conflicts=True,
+        unique_fields=["coin"],
+        update_fields=["neighbor_ids", "scores", "voters", "computed_at"],
+    )
+
+
+def refresh(full=False, k=TOP_K, chunk_size=CHUNK_SIZE, vectorized=None, log=None):
+    """
+    Recompute the stored neighbours: of every coin with ``full`` (or when
+    the change feed is off), else only of coins with votes since the last
+    run. Returns the number of coins recomputed.
+    """
+    incremental = not full and settings.OUTBOX_ENABLED
+    started = timezone.now()
+    offset = outbox.latest_offset()
+    if incremental:
+        coins, offset = changed_coins(outbox.get_offset(CONSUMER))
+        if not coins:
+            return 0
+        # The changed coins' voters hold all their votes; the other coins
+        # they reach are scored with the voter counts stored last time
+        matrix = build_matrix(stream_voter_upvotes(coins), vectorized)
+        matrix.set_voter_counts(stored_voter_counts(set(matrix.coins) - coins))
+    else:
+        matrix = build_matrix(stream_upvotes(chunk_size), vectorized)
+        coins = matrix.coins
+    coins = sorted(coins)
+    if log is not None:
+        log(f"{len(coins)} coins to recompute")
+    for start in range(0, len(coins), SAVE_BATCH):
+        batch = coins[start:start + SAVE_BATCH]
+        save_neighbors(matrix.neighbors(batch, k), matrix.voter_counts(batch))
+    if not incremental:
+        # Coins that lost all their upvotes
+        CoinNeighbors.objects.filter(computed_at__lt=started).delete()
+    if settings.OUTBOX_ENABLED:
+        outbox.acknowledge(CONSUMER, offset)
+    return len(coins)
+
+
+def similar(coin_id):
+    """
+    [(coin id, score)] of the stored neighbours of ``coin_id``, best first.
+    """
+    row = CoinNeighbors.objects.filter(coin_id=coin_id).values_list("neighbor_ids", "scores").first()
+    if row is None:
+        return []
+    return list(zip(*row))
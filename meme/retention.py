@@ -0,0 +1,255 @@
+"""
+Retention: purging and archiving rows past a per-table age.
+
+Policies come from ``settings.RETENTION``, keyed by model label (or
+"logs" for the rotated log files):
+
+    'meme.notification': {'days': 30, 'filter': {'read': True}},
+    'meme.vote': {'days': 365, 'archive': True},
+    'logs': {'days': 14, 'path': BASE_DIR / 'debug.log'},
+
+Expired rows are removed in small batches walked in primary key order, each
+batch in its own short transaction, so no statement holds locks for long.
+Tables with ``archive`` have their rows copied into the archive table (see
+ARCHIVES) in the same transaction. Rows are deleted with plain SQL and no
+signals run, so policies only suit tables nothing else references; rows of
+outbox models get their delete events written in the same transaction, so
+change feed consumers see archived votes leave the vote table.
+
+On PostgreSQL, a table converted to monthly range partitions (see
+partition_sql) whose policy neither filters nor archives has whole expired
+partitions dropped instead.
+"""
+import datetime
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from . import outbox
+from .db import estimate_row_count, table_size_bytes
+from .models import Vote, VoteArchive
+from .versions import bump_versions
+
+BATCH_SIZE = 1000
+
+# Tables whose expired rows are moved to an archive table instead of dropped
+ARCHIVES = {Vote: VoteArchive}
+
+Report = namedtuple("Report", ["label", "rows", "bytes", "seconds"])
+
+
+class RetentionPolicy:
+    """
+    How long rows of one table (or the rotated log files) are kept.
+    """
+
+    def __init__(self, label, days, filter=None, archive=False, path=None):
+        self.label = label
+        self.days = days
+        self.filter = filter or {}
+        self.archive = archive
+        self.path = path
+
+    def cutoff(self, now=None):
+        return (now or timezone.now()) - datetime.timedelta(days=self.days)
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+    def expired(self, now=None):
+        """
+        The queryset of rows this policy removes.
+        """
+        return self.model._default_manager.filter(created_at__lt=self.cutoff(now), **self.filter)
+
+
+def get_policies(labels=None):
+    policies = [RetentionPolicy(label, **options) for label, options in getattr(settings, "RETENTION", {}).items()]
+    if labels:
+        policies = [policy for policy in policies if policy.label in labels]
+    return policies
+
+
+def delete_rows(model, pks, using):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM {} WHERE {} IN ({})".format(
+            connection.ops.quote_name(model._meta.db_table),
+            connection.ops.quote_name(model._meta.pk.column),
+            ", ".join(["%s"] * len(pks)),
+        ), pks)
+
+
+def archive_rows(model, pks, using):
+    archive = ARCHIVES[model]
+    fields = [field.attname for field in archive._meta.concrete_fields if field.attname != "archived_at"]
+    rows = model._default_manager.using(using).filter(pk__in=pks).values(*fields)
+    archive._default_manager.using(using).bulk_create([archive(**row) for row in rows])
+
+
+def estimate_bytes(model, rows, using):
+    """
+    ``rows`` times the table's average row size (indexes included).
+    """
+    size = table_size_bytes(model, using)
+    count = estimate_row_count(model, using)
+    if not size or not count:
+        return None
+    return int(size / count * rows)
+
+
+def purge(policy, now=None, batch_size=BATCH_SIZE, dry_run=False, pause=0):
+    """
+    Apply ``policy`` and return a Report of the rows and (estimated) bytes
+    reclaimed; with ``dry_run`` only count them. ``pause`` seconds are
+    slept between batches to leave room for other writers.
+    """
+    if policy.label == "logs":
+        return purge_logs(policy, now, dry_run)
+    start = time.perf_counter()
+    model = policy.model
+    using = router.db_for_write(model)
+    if policy.archive and model not in ARCHIVES:
+        raise ValueError(f"{policy.label} has no archive table.")
+    if not policy.archive and not policy.filter and is_partitioned(model, using):
+        rows = drop_expired_partitions(model, policy.cutoff(now), using, dry_run)
+        return Report(policy.label, rows, estimate_bytes(model, rows, using), time.perf_counter() - start)
+
+    queryset = policy.expired(now).using(using)
+    if dry_run:
+        rows = queryset.count()
+        return Report(policy.label, rows, estimate_bytes(model, rows, using), time.perf_counter() - start)
+
+    size_before = estimate_bytes(model, 1, using)
+    rows, last = 0, None
+    while True:
+        batch_queryset = queryset if last is None else queryset.filter(pk__gt=last)
+        batch = list(batch_queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic(using=using):
+            if policy.archive:
+                archive_rows(model, batch, using)
+            if model in outbox.OUTBOX_MODELS:
+                outbox.record_deletes(model, batch, using)
+            delete_rows(model, batch, using)
+        rows += len(batch)
+        last = batch[-1]
+        if pause:
+            time.sleep(pause)
+    if rows:
+        # Raw deletes skip the signals that keep ETags fresh
+        bump_versions(model)
+    reclaimed = size_before * rows if size_before is not None else None
+    return Report(policy.label, rows, reclaimed, time.perf_counter() - start)
+
+
+def purge_logs(policy, now=None, dry_run=False):
+    """
+    Delete rotated log files (``debug.log.1``, ``debug.log.2``…) last
+    written before the cutoff. The live log file is never touched.
+    """
+    start = time.perf_counter()
+    cutoff = policy.cutoff(now).timestamp()
+    path = Path(policy.path)
+    rows = reclaimed = 0
+    for rotated in path.parent.glob(f"{path.name}.*"):
+        stat = rotated.stat()
+        if stat.st_mtime >= cutoff:
+            continue
+        rows += 1
+        reclaimed += stat.st_size
+        if not dry_run:
+            rotated.unlink()
+    return Report(policy.label, rows, reclaimed, time.perf_counter() - start)
+
+
+def is_partitioned(model, using):
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [model._meta.db_table]
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_name(model, month):
+    return f"{model._meta.db_table}_p{month:%Y_%m}"
+
+
+def months(start, count):
+    month = datetime.date(start.year, start.month, 1)
+    for _ in range(count):
+        following = (month + datetime.timedelta(days=32)).replace(day=1)
+        yield month, following
+        month = following
+
+
+def partition_sql(model, start, count, column="created_at"):
+    """
+    Statements converting ``model``'s table into monthly range partitions
+    on ``column``, starting at ``start`` and covering ``count`` months, plus
+    a default partition. The primary key becomes (pk, column) as
+    PostgreSQL requires. Run them in a maintenance window.
+    """
+    table = model._meta.db_table
+    pk = model._meta.pk.column
+    statements = [
+        f'ALTER TABLE "{table}" RENAME TO "{table}_old"',
+        f'CREATE TABLE "{table}" (LIKE "{table}_old" INCLUDING DEFAULTS INCLUDING IDENTITY) PARTITION BY RANGE ("{column}")',
+        f'ALTER TABLE "{table}" ADD PRIMARY KEY ("{pk}", "{column}")',
+    ]
+    for month, following in months(start, count):
+        statements.append(
+            f'CREATE TABLE "{partition_name(model, month)}" PARTITION OF "{table}" '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+        )
+    statements.append(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+    statements.append(f'INSERT INTO "{table}" SELECT * FROM "{table}_old"')
+    statements.append(f'DROP TABLE "{table}_old" CASCADE')
+    for index in model._meta.indexes:
+        columns = ", ".join(f'"{model._meta.get_field(name).column}"' for name in index.fields)
+        statements.append(f'CREATE INDEX "{index.name}" ON "{table}" ({columns})')
+    return statements
+
+
+def drop_expired_partitions(model, cutoff, using, dry_run=False):
+    """
+    Drop the monthly partitions of ``model`` that end before ``cutoff``
+    and create the next month's partition. Returns the number of rows
+    dropped.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    rows = 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(%s)", [table]
+        )
+        for (name,) in cursor.fetchall():
+            if not name.startswith(f"{table}_p"):
+                continue
+            year, month = map(int, name[len(table) + 2:].split("_"))
+            _, end = next(months(datetime.date(year, month, 1), 1))
+            if end > cutoff.date():
+                continue
+            cursor.execute(f'SELECT COUNT(*) FROM "{name}"')
+            rows += cursor.fetchone()[0]
+            if not dry_run:
+                cursor.execute(f'DROP TABLE "{name}"')
+        if not dry_run:
+            month, following = next(months(timezone.now() + datetime.timedelta(days=31), 1))
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{partition_name(model, month)}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+            )
+    return rows
@@ -0,0 +1,158 @@
+"""
+Read-replica routing.
+
+ReplicaRoutingMiddleware marks safe-method requests to viewsets with
+``read_from_replica = True``; while such a request is handled, reads go to
+a healthy alias from ``settings.REPLICA_DATABASES``. Writes always go to the
+primary, and a client that just wrote is pinned to the primary for
+``REPLICA_PIN_SECONDS`` so it reads its own writes: by a cookie, and by a
+cache key of its user for API clients that keep no cookies. The user is
+only known once the view has authenticated the request, so the user pin
+is checked on the first read after that. A view can decide
+itself whether a request wrote by setting ``pin_primary`` on it (see
+/api/batch/); a request with ``pin_primary`` set before its view runs
+reads from the primary.
+"""
+import contextvars
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+PIN_COOKIE = "pin_primary"
+
+# The request whose reads may go to a replica
+_use_replica = contextvars.ContextVar("use_replica", default=None)
+_health = {}
+
+
+def replica_lag(alias):
+    """
+    Return the replication lag of ``alias`` in seconds. Backends without a
+    notion of lag (such as SQLite files standing in for a replica) report 0.
+    """
+    connection = connections[alias]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)")
+            return float(cursor.fetchone()[0])
+    return 0.0
+
+
+def is_healthy(alias):
+    """
+    Whether ``alias`` is reachable and within REPLICA_MAX_LAG seconds of the
+    primary. Checks are cached for REPLICA_CHECK_INTERVAL seconds.
+    """
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is None or now - checked_at > getattr(settings, "REPLICA_CHECK_INTERVAL", 5):
+        try:
+            healthy = replica_lag(alias) <= getattr(settings, "REPLICA_MAX_LAG", 10)
+        except Exception:
+            healthy = False
+        _health[alias] = (now, healthy)
+    return healthy
+
+
+def pin_key(user_id):
+    return f"pin_primary:{user_id}"
+
+
+def authenticated_user_id(request):
+    """
+    The id of the user ``request`` is authenticated as, or None. A session
+    user not loaded yet counts as unknown rather than being loaded here,
+    from inside a query.
+    """
+    user = request.__dict__.get("user")
+    if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+        return None
+    return user.pk if user.is_authenticated else None
+
+
+def is_pinned(request):
+    """
+    Whether the client of ``request`` wrote within REPLICA_PIN_SECONDS. The
+    user's pin is looked up once per request, when the user is known.
+    """
+    if PIN_COOKIE in request.COOKIES or getattr(request, "pin_primary", False):
+        return True
+    pinned = getattr(request, "_user_pinned", None)
+    if pinned is None:
+        user_id = authenticated_user_id(request)
+        if user_id is None:
+            return False
+        pinned = request._user_pinned = cache.get(pin_key(user_id)) is not None
+    return pinned
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        request = _use_replica.get()
+        if request is None or is_pinned(request):
+            return None
+        replicas = [alias for alias in getattr(settings, "REPLICA_DATABASES", []) if is_healthy(alias)]
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *getattr(settings, "REPLICA_DATABASES", [])}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Enables replica reads for safe requests to replica-eligible views and
+    pins clients to the primary after they write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        end_replica_reads(request)
+        replicated = bool(getattr(settings, "REPLICA_DATABASES", []))
+        wrote = getattr(request, "pin_primary", None)
+        if wrote is None:
+            wrote = request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400
+        if replicated and wrote:
+            pin_seconds = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+            response.set_cookie(PIN_COOKIE, "1", max_age=pin_seconds, httponly=True, samesite="Lax")
+            user_id = authenticated_user_id(request)
+            if user_id is not None:
+                cache.set(pin_key(user_id), 1, pin_seconds)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        start_replica_reads(request, view_func)
+        return None
+
+
+def start_replica_reads(request, view_func):
+    """
+    Send the reads made while handling ``request`` to a replica when
+    ``view_func`` allows it, the method is safe and neither the client nor
+    the request is pinned to the primary. end_replica_reads() turns them
+    off again.
+    """
+    eligible = getattr(getattr(view_func, "cls", None), "read_from_replica", False)
+    if eligible and request.method in ("GET", "HEAD", "OPTIONS") and not is_pinned(request):
+        request._replica_token = _use_replica.set(request)
+
+
+def end_replica_reads(request):
+    token = getattr(request, "_replica_token", None)
+    if token is not None:
+        _use_replica.reset(token)
+        request._replica_token = None
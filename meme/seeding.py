@@ -0,0 +1,252 @@
+"""
+Synthetic data generation.
+
+Every table is filled from a generator and written in batches, so rows are
+only ever held one batch at a time and no per-row signals run. Small
+entity tables go through ``bulk_create``; the high-volume ones (users,
+votes, memberships, comments, notifications) are plain tuples inserted
+with ``executemany`` in one transaction per batch, skipping model
+instantiation entirely.
+
+Distributions follow what real traffic looks like: a few coins get most of
+the votes (Zipf), a few users are very active and community sizes follow a
+power law. The same seed always produces the same data.
+"""
+import bisect
+import itertools
+import random
+import time
+
+from django.db import connection, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import User, Coin, Vote, VoteArchive, Community, Post, Comment, Notification
+from .versions import bump_versions
+
+BATCH_SIZE = 5000
+
+# Marks the password as unusable without running the hasher per user
+UNUSABLE_PASSWORD = "!"
+
+
+def bulk_insert(model, rows, batch_size=BATCH_SIZE):
+    """
+    Insert the instances yielded by ``rows`` in batches; return the count.
+    """
+    total = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return total
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        total += len(batch)
+
+
+def insert_rows(model, fields, rows, batch_size=BATCH_SIZE):
+    """
+    Insert tuples of ``fields`` values yielded by ``rows``; every other
+    column gets the field's default (or the current time for auto_now
+    fields). Returns the count.
+    """
+    opts = model._meta
+    given = [opts.get_field(name) for name in fields]
+    now = timezone.now()
+    defaults = []
+    for field in opts.concrete_fields:
+        if field in given or field.primary_key:
+            continue
+        value = now if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False) else field.get_default()
+        defaults.append((field, field.get_db_prep_save(value, connection)))
+    columns = [field.column for field in given] + [field.column for field, _ in defaults]
+    fixed = tuple(value for _, value in defaults)
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        connection.ops.quote_name(opts.db_table),
+        ", ".join(connection.ops.quote_name(column) for column in columns),
+        ", ".join(["%s"] * len(columns)),
+    )
+    total = 0
+    rows = iter(rows)
+    while True:
+        batch = [row + fixed for row in itertools.islice(rows, batch_size)]
+        if not batch:
+            return total
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+        total += len(batch)
+
+
+def new_ids(model, after):
+    return list(model.objects.filter(pk__gt=after).order_by("pk").values_list("pk", flat=True))
+
+
+def last_id(model):
+    return model.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+
+
+class ZipfSampler:
+    """
+    Draws items with probability proportional to 1 / rank ** s. The ranking
+    is shuffled so popular items are spread over the id range.
+    """
+
+    def __init__(self, items, rng, s=1.1):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cumulative = list(itertools.accumulate(1 / rank ** s for rank in range(1, len(self.items) + 1)))
+        self.rng = rng
+
+    def __call__(self):
+        index = bisect.bisect(self.cumulative, self.rng.random() * self.cumulative[-1])
+        return self.items[min(index, len(self.items) - 1)]
+
+    def distinct(self, k):
+        """
+        ``k`` different items, favouring popular ones. Draws are bounded:
+        rare items would take too long to hit, so any shortfall is filled
+        uniformly from the items not chosen yet.
+        """
+        chosen = set()
+        for _ in range(4 * k):
+            chosen.add(self())
+            if len(chosen) == k:
+                return chosen
+        rest = [item for item in self.items if item not in chosen]
+        chosen.update(self.rng.sample(rest, k - len(chosen)))
+        return chosen
+
+
+def power_law(rng, alpha, minimum, maximum):
+    """
+    A Pareto-distributed integer in [minimum, maximum].
+    """
+    return min(maximum, int(minimum * (1 - rng.random()) ** (-1 / (alpha - 1))))
+
+
+def allocate(total, slots, rng, alpha, cap):
+    """
+    Split ``total`` over ``slots`` power-law quotas, each at most ``cap``.
+    """
+    quotas = [power_law(rng, alpha, 1, cap) for _ in range(slots)]
+    factor = total / max(sum(quotas), 1)
+    quotas = [min(cap, round(quota * factor)) for quota in quotas]
+    remainder = total - sum(quotas)
+    while remainder:
+        index = rng.randrange(slots)
+        step = 1 if remainder > 0 else -1
+        if 0 <= quotas[index] + step <= cap:
+            quotas[index] += step
+            remainder -= step
+    return quotas
+
+
+def user_rows(count, prefix):
+    for i in range(count):
+        yield f"{prefix}-{i}", f"{prefix}-{i}@example.com", UNUSABLE_PASSWORD
+
+
+def coin_rows(count, creators, prefix):
+    for i in range(count):
+        yield Coin(name=f"{prefix} coin {i}", symbol=f"{prefix[:3].upper()}{i}", description="Synthetic coin", created_by_id=creators())
+
+
+def vote_rows(total, users, coins, rng, alpha=2.0):
+    """
+    ``total`` votes with at most one per (user, coin): per-user counts
+    follow a power law and the coins of each user a Zipf distribution.
+    """
+    quotas = allocate(total, len(users), rng, alpha, len(coins.items))
+    for user_id, quota in zip(users, quotas):
+        for coin_id in coins.distinct(quota):
+            yield user_id, coin_id, "upvote" if rng.random() < 0.8 else "downvote"
+
+
+def membership_rows(communities, users, rng, alpha=2.0):
+    for community_id in communities:
+        size = power_law(rng, alpha, 5, len(users))
+        for user_id in rng.sample(users, min(size, len(users))):
+            yield community_id, user_id
+
+
+def seed(users=1000, coins=100, votes=20000, communities=50, posts=2000, comments=10000, notifications=5000,
+         seed=0, prefix="seed", batch_size=BATCH_SIZE, zipf_s=1.1, log=None):
+    """
+    Generate a dataset and return the new ids by model. ``log`` is called
+    with (table, rows, seconds) after each table.
+    """
+    rng = random.Random(seed)
+    created = {}
+
+    def fill(model, rows, fields=None):
+        start = time.perf_counter()
+        if fields is None:
+            count = bulk_insert(model, rows, batch_size)
+        else:
+            count = insert_rows(model, fields, rows, batch_size)
+        if log is not None:
+            log(model._meta.db_table, count, time.perf_counter() - start)
+
+    before = last_id(User)
+    fill(User, user_rows(users, prefix), ["username", "email", "password"])
+    created["users"] = new_ids(User, before)
+    authors = ZipfSampler(created["users"], rng, zipf_s)
+
+    before = last_id(Coin)
+    fill(Coin, coin_rows(coins, authors, prefix))
+    created["coins"] = new_ids(Coin, before)
+
+    if created["coins"]:
+        total = min(votes, len(created["users"]) * len(created["coins"]))
+        coin_sampler = ZipfSampler(created["coins"], rng, zipf_s)
+        fill(Vote, vote_rows(total, created["users"], coin_sampler, rng), ["user", "coin", "vote_type"])
+        update_vote_totals(created["coins"])
+
+    before = last_id(Community)
+    fill(Community, (
+        Community(name=f"{prefix} community {i}", description="Synthetic community", created_by_id=authors())
+        for i in range(communities)
+    ))
+    created["communities"] = new_ids(Community, before)
+    fill(Community.members.through, membership_rows(created["communities"], created["users"], rng), ["community", "user"])
+
+    before = last_id(Post)
+    fill(Post, (
+        Post(title=f"{prefix} post {i}", content="lorem ipsum " * rng.randint(5, 50), author_id=authors())
+        for i in range(posts)
+    ))
+    created["posts"] = new_ids(Post, before)
+
+    if created["posts"]:
+        threads = ZipfSampler(created["posts"], rng, zipf_s)
+        fill(Comment, (("Synthetic comment", authors(), threads()) for _ in range(comments)), ["content", "author", "post"])
+
+    fill(Notification, (
+        (rng.choice(created["users"]), "Someone voted on your coin", rng.random() < 0.5) for _ in range(notifications)
+    ), ["user", "content", "read"])
+
+    # bulk_create() skips the post_save signals that keep ETags fresh
+    bump_versions(User, Coin, Vote, Community, Post, Comment, Notification)
+    return created
+
+
+def update_vote_totals(coin_ids, batch_size=BATCH_SIZE):
+    """
+    Recompute ``total_votes`` (upvotes minus downvotes) of ``coin_ids`` in
+    the database, one UPDATE per batch. Archived votes still count.
+    """
+    def count(model, vote_type):
+        return Coalesce(Subquery(
+            model.objects.filter(coin=OuterRef("pk"), vote_type=vote_type).order_by()
+            .values("coin").annotate(n=Count("pk")).values("n"),
+            output_field=IntegerField(),
+        ), Value(0))
+
+    def score(vote_type):
+        return count(Vote, vote_type) + count(VoteArchive, vote_type)
+
+    for start in range(0, len(coin_ids), batch_size):
+        Coin.objects.filter(pk__in=coin_ids[start:start + batch_size]).update(
+            total_votes=score("upvote") - score("downvote")
+        )
@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import autocomplete
+from .db import apply_sqlite_pragmas
+from .images import schedule_processing
+from .outbox import OUTBOX_MODELS, record
+from .sync import next_sequence
+from .models import User, Coin, Vote, Community, Post, Comment, Note, NoteTombstone, Rating, Badge, UserBadge, Notification, Analytics
+from .versions import bump_versions
+
+IMAGE_FIELDS = {User: "avatar", Coin: "logo", Badge: "icon"}
+
+VERSIONED_MODELS = (User, Coin, Vote, Community, Post, Comment, Note, Rating, Badge, UserBadge, Notification, Analytics)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Coin)
+@receiver(post_save, sender=Badge)
+def process_uploaded_image(sender, instance, **kwargs):
+    schedule_processing(instance, IMAGE_FIELDS[sender])
+
+
+def bump_table_version(sender, **kwargs):
+    bump_versions(sender)
+
+
+@receiver(m2m_changed)
+def bump_table_version_m2m(sender, instance, action, model, **kwargs):
+    if action.startswith("post_") and type(instance) in VERSIONED_MODELS:
+        bump_versions(type(instance), model)
+
+
+def record_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record(instance, "create" if created else "update")
+
+
+def record_delete(sender, instance, **kwargs):
+    record(instance, "delete")
+
+
+# Connected per model: a catch-all post_delete receiver would turn off
+# Django's fast delete for every model, so queryset deletes of unrelated
+# tables (change events, vote rings) would load and signal each row
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_table_version, sender=model)
+    post_delete.connect(bump_table_version, sender=model)
+
+for model in OUTBOX_MODELS:
+    post_save.connect(record_save, sender=model)
+    post_delete.connect(record_delete, sender=model)
+
+
+@receiver(m2m_changed, sender=Community.members.through)
+def record_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    # Membership changes are recorded as updates of the community
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        communities = Community.objects.filter(pk__in=pk_set) if pk_set else []
+        users = [instance.pk]
+    else:
+        communities = [instance]
+        users = sorted(pk_set) if pk_set else []
+    for community in communities:
+        record(community, "update", {"id": community.pk, "members": {"action": action[len("post_"):], "user_ids": users}})
+
+
+# The index is only changed once the change commits: a rolled back save or
+# delete never reaches the change feed, so it would never be undone
+@receiver(post_save, sender=Coin)
+def index_coin(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        payload = {"id": instance.pk, "name": instance.name, "symbol": instance.symbol, "total_votes": instance.total_votes}
+        transaction.on_commit(lambda: autocomplete.apply_change("update", payload), using=using)
+
+
+@receiver(post_delete, sender=Coin)
+def unindex_coin(sender, instance, using=None, **kwargs):
+    payload = {"id": instance.pk}
+    transaction.on_commit(lambda: autocomplete.apply_change("delete", payload), using=using)
+
+
+@receiver(pre_save, sender=Note)
+def sequence_note(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.seq = next_sequence(instance.user_id)
+
+
+@receiver(post_delete, sender=Note)
+def tombstone_note(sender, instance, **kwargs):
+    NoteTombstone.objects.create(user_id=instance.user_id, note_id=instance.pk, seq=next_sequence(instance.user_id))
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            apply_sqlite_pragmas(cursor)
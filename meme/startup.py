@@ -0,0 +1,108 @@
+"""
+Process startup: import-time profiling, cold-start measurement and the
+preloading done by the WSGI/ASGI entry points.
+"""
+import gc
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+ImportTime = namedtuple("ImportTime", ["module", "self_us", "cumulative_us", "depth"])
+
+# Python snippets run in a fresh interpreter, each stage including the
+# previous ones
+STAGES = {
+    "setup": "import django; django.setup()",
+    "urls": "import django; django.setup(); from django.urls import get_resolver; get_resolver().url_patterns",
+    "wsgi": "from memeplayers.wsgi import application",
+}
+
+# First request served by a fresh WSGI application
+FIRST_REQUEST = """
+import io, sys, time
+start = time.perf_counter()
+from memeplayers.wsgi import application
+ready = time.perf_counter()
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": %(path)r, "QUERY_STRING": "", "SERVER_NAME": "localhost",
+    "SERVER_PORT": "80", "HTTP_HOST": "localhost", "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr,
+    "wsgi.url_scheme": "http", "wsgi.multithread": False, "wsgi.multiprocess": True, "wsgi.run_once": False,
+}
+status = []
+b"".join(application(environ, lambda s, h, e=None: status.append(s)))
+done = time.perf_counter()
+print(ready - start, done - ready, status[0])
+"""
+
+
+def _environment(**overrides):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "memeplayers.settings"))
+    env.update(overrides)
+    return env
+
+
+def profile_imports(stage="urls", **env):
+    """
+    Run ``stage`` in a fresh interpreter with ``-X importtime`` and return
+    the ImportTime of every module imported, slowest (cumulative) first.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STAGES[stage]],
+        capture_output=True, text=True, cwd=settings.BASE_DIR, env=_environment(**env),
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.append(ImportTime(name.strip(), int(self_us), int(cumulative_us), depth))
+    return sorted(times, key=lambda item: item.cumulative_us, reverse=True)
+
+
+def cold_start(path="/api/", **env):
+    """
+    Start a fresh interpreter, load the WSGI application and serve one
+    request. Returns (total_seconds, load_seconds, first_request_seconds).
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_REQUEST % {"path": path}],
+        capture_output=True, text=True, cwd=settings.BASE_DIR, env=_environment(**env),
+    )
+    total = time.perf_counter() - start
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    load, first_request = result.stdout.split()[:2]
+    return total, float(load), float(first_request)
+
+
+def preload():
+    """
+    Do the work every worker would otherwise repeat on its first request:
+    import the URLconf (and with it every viewset, serializer and
+    renderer) and the admin, and build the coin autocomplete index. Then
+    move everything allocated so far out of the garbage collector's reach,
+    so workers forked from this process keep sharing those pages instead of
+    copying them when the collector runs.
+    """
+    from django.db import DatabaseError, connections
+    from django.urls import get_resolver
+
+    from .autocomplete import coin_index
+
+    get_resolver().url_patterns
+    try:
+        coin_index()
+    except DatabaseError:
+        # Not migrated yet; the first autocomplete request builds it
+        pass
+    # Connections must not be shared with forked workers
+    connections.close_all()
+    gc.freeze()
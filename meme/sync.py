@@ -0,0 +1,95 @@
+"""
+Incremental sync of a user's notes.
+
+Every save of a note stamps it with the next number of its user's change
+sequence and every delete leaves a tombstone with one, both in the
+transaction of the change (see meme.signals). A client keeps the token
+returned by /api/notes/sync/ and sends it back as ``?since=``; the answer
+holds only the notes saved and the ids deleted after it, read from the
+(user, seq) indexes, so its cost follows what changed rather than how many
+notes the user has.
+
+Tokens are signed and expire after NOTES_SYNC_MAX_AGE_DAYS, the age at
+which the retention job drops tombstones. An expired token gets a full
+resync.
+"""
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import F
+
+from .models import Note, NoteSequence, NoteTombstone
+
+SALT = "meme.notes.sync"
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def next_sequence(user_id):
+    """
+    Reserve the next change sequence number of ``user_id``. The counter row
+    stays locked until the surrounding transaction ends, so a user's
+    changes commit in sequence order.
+    """
+    with transaction.atomic():
+        if not NoteSequence.objects.filter(pk=user_id).update(value=F("value") + 1):
+            NoteSequence.objects.get_or_create(pk=user_id)
+            NoteSequence.objects.filter(pk=user_id).update(value=F("value") + 1)
+        return NoteSequence.objects.values_list("value", flat=True).get(pk=user_id)
+
+
+def current_sequence(user_id):
+    return NoteSequence.objects.filter(pk=user_id).values_list("value", flat=True).first() or 0
+
+
+def make_token(seq):
+    return signing.dumps(seq, salt=SALT, compress=False)
+
+
+def read_token(token):
+    """
+    Return the sequence number of ``token``, or None when it has expired.
+    Raises InvalidToken for anything that was not issued by make_token().
+    """
+    max_age = settings.NOTES_SYNC_MAX_AGE_DAYS * 24 * 60 * 60
+    try:
+        return int(signing.loads(token, salt=SALT, max_age=max_age))
+    except signing.SignatureExpired:
+        return None
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidToken(token)
+
+
+def changes(queryset, user_id, since=None, limit=DEFAULT_LIMIT):
+    """
+    Return (notes, deleted_ids, seq, has_more): the notes of ``queryset``
+    saved and the ids of notes deleted after sequence number ``since``,
+    oldest change first, at most ``limit`` of them together. ``seq`` is
+    where the next call resumes. Without ``since`` (a full sync) every
+    note is returned and no deletions.
+
+    Both reads stop at the sequence number read first: a change committed
+    between them would otherwise move the token past changes the first
+    read missed.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    upper = current_sequence(user_id)
+    notes = list(queryset.filter(seq__gt=since or 0, seq__lte=upper).order_by("seq")[:limit + 1])
+    changed = [(note.seq, note) for note in notes]
+    if since is not None:
+        changed += NoteTombstone.objects.filter(user_id=user_id, seq__gt=since, seq__lte=upper).order_by("seq").values_list("seq", "note_id")[:limit + 1]
+        changed.sort(key=lambda change: change[0])
+    has_more = len(changed) > limit
+    changed = changed[:limit]
+    seq = changed[-1][0] if has_more else max(upper, since or 0)
+    return (
+        [change for _, change in changed if isinstance(change, Note)],
+        [change for _, change in changed if not isinstance(change, Note)],
+        seq,
+        has_more,
+    )
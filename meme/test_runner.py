@@ -0,0 +1,54 @@
+from unittest import TextTestResult
+
+from django.test.runner import DiscoverRunner, ParallelTestSuite, RemoteTestResult, RemoteTestRunner
+
+from meme.api.ratelimit import get_backend
+
+
+class RateLimitIsolationMixin:
+    """
+    Empties the rate limit counters before each test. Test databases are
+    rolled back between tests, so user ids (and the throttle keys built
+    from them) are reused by the next test.
+    """
+
+    def startTest(self, test):
+        get_backend().reset()
+        super().startTest(test)
+
+
+class IsolatedTextTestResult(RateLimitIsolationMixin, TextTestResult):
+    pass
+
+
+class IsolatedRemoteTestResult(RateLimitIsolationMixin, RemoteTestResult):
+    pass
+
+
+class IsolatedRemoteTestRunner(RemoteTestRunner):
+    resultclass = IsolatedRemoteTestResult
+
+
+class IsolatedParallelTestSuite(ParallelTestSuite):
+    runner_class = IsolatedRemoteTestRunner
+
+
+class ParallelDiscoverRunner(DiscoverRunner):
+    """
+    Runs tests in parallel processes by default; ``--parallel 1`` restores
+    a single process (for debugging with pdb, for instance). Each test
+    starts with empty rate limit counters.
+    """
+    parallel_test_suite = IsolatedParallelTestSuite
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(parallel="auto")
+
+    def get_resultclass(self):
+        resultclass = super().get_resultclass()
+        if resultclass is None:
+            return IsolatedTextTestResult
+        # --debug-sql and --pdb results
+        return type(resultclass.__name__, (RateLimitIsolationMixin, resultclass), {})
@@ -1,12 +1,13 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
-from .api.viewsets import UserViewSet, CoinViewSet, VoteViewSet, CommunityViewSet, PostViewSet, CommentViewSet, NoteViewSet, RatingViewSet, BadgeViewSet, UserBadgeViewSet, NotificationViewSet, AnalyticsViewSet
+from .api.viewsets import UserViewSet, CoinViewSet, VoteViewSet, VoteRingViewSet, CommunityViewSet, PostViewSet, CommentViewSet, NoteViewSet, RatingViewSet, BadgeViewSet, UserBadgeViewSet, NotificationViewSet, AnalyticsViewSet, MetricsViewSet, ChangeViewSet, BatchViewSet
 
 router = DefaultRouter()
 router.register("users", UserViewSet, basename="user")
 router.register("coins", CoinViewSet, basename="coin")
 router.register("votes", VoteViewSet, basename="vote")
+router.register("vote-rings", VoteRingViewSet, basename="votering")
 router.register("communities", CommunityViewSet, basename="community")
 router.register("posts", PostViewSet, basename="post")
 router.register("comments", CommentViewSet, basename="comment")
@@ -16,6 +17,9 @@ router.register("badges", BadgeViewSet, basename="badge")
 router.register("user-badges", UserBadgeViewSet, basename="userbadge")
 router.register("notifications", NotificationViewSet, basename="notification")
 router.register("analytics", AnalyticsViewSet, basename="analytics")
+router.register("metrics", MetricsViewSet, basename="metrics")
+router.register("changes", ChangeViewSet, basename="change")
+router.register("batch", BatchViewSet, basename="batch")
 
 urlpatterns = [
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
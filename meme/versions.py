@@ -0,0 +1,29 @@
+"""
+Per-table version stamps.
+
+Every write to a tracked model bumps its TableVersion row in the same
+transaction, so a list response can be identified by the versions of the
+tables it reads instead of by hashing the rendered body.
+"""
+from django.db.models import F
+
+from .models import TableVersion
+
+
+def bump_versions(*models):
+    labels = {model._meta.label_lower for model in models}
+    updated = TableVersion.objects.filter(label__in=labels).update(version=F("version") + 1)
+    if updated < len(labels):
+        TableVersion.objects.bulk_create(
+            [TableVersion(label=label, version=0) for label in labels], ignore_conflicts=True
+        )
+        TableVersion.objects.filter(label__in=labels, version=0).update(version=1)
+
+
+def get_versions(models):
+    """
+    Return {label: version} for ``models``, with 0 for untouched tables.
+    """
+    labels = sorted({model._meta.label_lower for model in models})
+    versions = dict(TableVersion.objects.filter(label__in=labels).values_list("label", "version"))
+    return {label: versions.get(label, 0) for label in labels}
@@ -1,3 +1,74 @@
+import secrets
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+from django.views.static import serve
+
+from . import metrics
+from .images import HASHED_FILE
 
 # Create your views here.
+
+def serve_media(request, path):
+    """
+    Development media server. Processed images have content-hashed names,
+    so they are marked as cacheable forever.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if HASHED_FILE.search(path):
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+def prometheus_metrics(request):
+    """
+    Request metrics in the Prometheus text format. When METRICS_TOKEN is set
+    the scraper must send it as a bearer token; otherwise only INTERNAL_IPS
+    may read them.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        supplied = request.META.get("HTTP_AUTHORIZATION", "")
+        if not secrets.compare_digest(supplied, f"Bearer {token}"):
+            return HttpResponseForbidden()
+    elif request.META.get("REMOTE_ADDR") not in settings.INTERNAL_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.registry.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def lazy_view(dotted_path, **initkwargs):
+    """
+    A view that imports the class-based view at ``dotted_path`` on its first
+    call, keeping rarely used, import-heavy views (the OpenAPI schema and
+    docs) out of process startup.
+    """
+    view = None
+
+    @csrf_exempt
+    def dispatch(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(dotted_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+    return dispatch
+
+
+def openapi_schema(request, generate=None):
+    """
+    Serve the prebuilt schema from OPENAPI_SCHEMA_FILE when it exists
+    (``manage.py spectacular --file ...`` at build time), otherwise generate
+    it with ``generate`` (None when API_DOCS is off).
+    """
+    path = getattr(settings, "OPENAPI_SCHEMA_FILE", "")
+    if path and Path(path).is_file():
+        content_type = "application/json" if str(path).endswith(".json") else "application/vnd.oai.openapi"
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Cache-Control"] = "public, max-age=3600"
+        return response
+    if generate is None:
+        raise Http404("No OpenAPI schema available.")
+    return generate(request)
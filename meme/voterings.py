@@ -0,0 +1,286 @@
+"""
+Vote ring detection.
+
+A vote ring is a group of accounts that vote together: the same vote on
+the same coins, within minutes of each other, over and over. Checking that
+on every vote would slow down the vote endpoint, so an offline job
+(``manage.py vote_rings``) looks at the last days of votes at once:
+
+1. Votes are streamed in primary key order and put into slots of the same
+   coin, vote type and WINDOW seconds of time. Two users in one slot cast
+   the same vote on a coin at nearly the same time. Slots with one voter
+   say nothing; slots with more than MAX_SLOT_VOTERS are organic bursts
+   (a coin going viral) and would cost quadratic work, so both are left
+   out.
+2. Every pair of users is scored by the number of slots they share. Pairs
+   sharing at least MIN_SHARED slots are linked, and groups of at least
+   MIN_RING_SIZE linked users are rings.
+3. The votes a ring cast together (two members or more in a slot) are
+   summed per coin: the coin's tally without them is its corrected tally.
+
+Rings are stored as VoteRing rows for moderators to confirm or dismiss
+(/api/vote-rings/). A ring found again, even with members gained or
+lost since its review, updates its row and keeps its review; pending rings
+not found again are dropped. With NumPy and SciPy
+installed the pair counts come from a sparse matrix product; without them
+a pure Python version gives the same rings, more slowly.
+"""
+import hashlib
+import itertools
+from collections import Counter, defaultdict, namedtuple
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .models import Coin, Vote, VoteRing
+
+try:
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse import csgraph
+except ImportError:
+    np = sparse = csgraph = None
+
+DAYS = 30
+WINDOW = 600
+MIN_SHARED = 3
+MIN_RING_SIZE = 3
+MAX_SLOT_VOTERS = 50
+CHUNK_SIZE = 100000
+
+SIGNS = {"upvote": 1, "downvote": -1}
+
+Ring = namedtuple("Ring", ["members", "coin_votes", "votes", "pairs"])
+
+
+def stream_votes(since=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield lists of (user_id, coin_id, sign, unix seconds) of the votes cast
+    after ``since``, ``chunk_size`` at a time, walking the vote table in
+    primary key order. ``sign`` is 1 for upvotes and -1 for downvotes.
+    """
+    votes = Vote.objects.all()
+    if since is not None:
+        votes = votes.filter(created_at__gte=since)
+    last = 0
+    while True:
+        rows = list(
+            votes.filter(pk__gt=last).order_by("pk")
+            .values_list("pk", "user_id", "coin_id", "vote_type", "created_at")[:chunk_size]
+        )
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield [(user_id, coin_id, SIGNS[vote_type], int(created_at.timestamp()))
+               for _, user_id, coin_id, vote_type, created_at in rows]
+
+
+def _ring(members, coin_votes, pairs):
+    coin_votes = {coin: net for coin, net in sorted(coin_votes.items()) if net}
+    return Ring(sorted(members), coin_votes, sum(map(abs, coin_votes.values())), pairs)
+
+
+def _ordered(rings):
+    return sorted(rings, key=lambda ring: (-ring.votes, ring.members))
+
+
+class PythonDetector:
+    """
+    Slots as a dict of voter lists; pairs counted with a Counter and linked
+    with union-find.
+    """
+
+    def __init__(self, chunks, window=WINDOW, max_slot_voters=MAX_SLOT_VOTERS):
+        slots = defaultdict(list)
+        for chunk in chunks:
+            for user, coin, sign, seconds in chunk:
+                slots[coin, sign, seconds // window].append(user)
+        self.slots = {slot: users for slot, users in slots.items() if 2 <= len(users) <= max_slot_voters}
+
+    def rings(self, min_shared=MIN_SHARED, min_size=MIN_RING_SIZE):
+        together = Counter()
+        for users in self.slots.values():
+            together.update(itertools.combinations(sorted(users), 2))
+
+        parent = {}
+
+        def find(user):
+            root = parent.setdefault(user, user)
+            while root != parent[root]:
+                parent[root] = root = parent[parent[root]]
+            return root
+
+        edges = [pair for pair, count in together.items() if count >= min_shared]
+        for a, b in edges:
+            parent[find(a)] = find(b)
+        groups = defaultdict(list)
+        for user in parent:
+            groups[find(user)].append(user)
+        ring_of = {user: root for root, users in groups.items() if len(users) >= min_size for user in users}
+
+        pairs = Counter(ring_of[a] for a, _ in edges if a in ring_of)
+        coin_votes = defaultdict(Counter)
+        for (coin, sign, _), users in self.slots.items():
+            present = Counter(ring_of[user] for user in users if user in ring_of)
+            for root, count in present.items():
+                if count >= 2:
+                    coin_votes[root][coin] += sign * count
+        return _ordered(_ring(groups[root], coin_votes[root], pairs[root]) for root in pairs)
+
+
+class VectorizedDetector:
+    """
+    Slots as a sparse slot x user matrix M: M.T @ M counts the slots every
+    pair of users shares, and SciPy's connected components links them.
+    """
+    batch = 20000
+
+    def __init__(self, chunks, window=WINDOW, max_slot_voters=MAX_SLOT_VOTERS):
+        votes = [np.asarray(chunk, dtype=np.int64).reshape(-1, 4) for chunk in chunks]
+        votes = np.concatenate(votes) if votes else np.empty((0, 4), dtype=np.int64)
+        users, coins, signs, seconds = votes.T
+        buckets = seconds // window
+        if len(buckets):
+            buckets -= buckets.min()
+        # One integer per (coin, vote type, time slot)
+        keys = (coins * 2 + (signs > 0)) * (buckets.max(initial=0) + 1) + buckets
+        _, slots, sizes = np.unique(keys, return_inverse=True, return_counts=True)
+        keep = (sizes[slots] >= 2) & (sizes[slots] <= max_slot_voters)
+        _, self.slots = np.unique(slots[keep], return_inverse=True)
+        self.user_ids, self.users = np.unique(users[keep], return_inverse=True)
+        self.coins, self.signs = coins[keep], signs[keep]
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(self.slots), dtype=np.float32), (self.slots, self.users)),
+            shape=(self.slots.max(initial=-1) + 1, len(self.user_ids)),
+        )
+
+    def rings(self, min_shared=MIN_SHARED, min_size=MIN_RING_SIZE):
+        if not len(self.user_ids):
+            return []
+        # Pairs sharing enough slots, ``batch`` users at a time to bound memory
+        a, b = [], []
+        by_user = self.matrix.T.tocsr()
+        for start in range(0, len(self.user_ids), self.batch):
+            together = (by_user[start:start + self.batch] @ self.matrix).tocoo()
+            linked = (together.data >= min_shared) & (together.col > together.row + start)
+            a.append(together.row[linked] + start)
+            b.append(together.col[linked])
+        a, b = np.concatenate(a), np.concatenate(b)
+        graph = sparse.csr_matrix((np.ones(len(a), dtype=np.int8), (a, b)), shape=(len(self.user_ids),) * 2)
+        count, labels = csgraph.connected_components(graph, directed=False)
+        in_ring = np.bincount(labels, minlength=count) >= min_size
+        pairs = np.bincount(labels[a], minlength=count)
+
+        # Votes cast by two ring members or more in one slot
+        member = in_ring[labels[self.users]]
+        slots, groups = self.slots[member], labels[self.users[member]]
+        _, together_index, sizes = np.unique(slots.astype(np.int64) * count + groups, return_inverse=True, return_counts=True)
+        joint = sizes[together_index] >= 2
+        groups, coins, signs = groups[joint], self.coins[member][joint], self.signs[member][joint]
+
+        coin_votes = defaultdict(Counter)
+        for group, coin, sign in zip(groups.tolist(), coins.tolist(), signs.tolist()):
+            coin_votes[group][coin] += sign
+        members = defaultdict(list)
+        ringed = np.nonzero(in_ring[labels])[0]
+        for user, group in zip(self.user_ids[ringed].tolist(), labels[ringed].tolist()):
+            members[group].append(user)
+        return _ordered(_ring(users, coin_votes[group], int(pairs[group])) for group, users in members.items())
+
+
+def build_detector(chunks, window=WINDOW, vectorized=None):
+    """
+    The detector of ``chunks`` of votes, vectorized when NumPy and SciPy
+    are available (or as ``vectorized`` says).
+    """
+    if vectorized is None:
+        vectorized = np is not None
+    if vectorized and np is None:
+        raise ImproperlyConfigured("Vectorized vote ring detection needs numpy and scipy.")
+    return (VectorizedDetector if vectorized else PythonDetector)(chunks, window)
+
+
+def fingerprint(members):
+    return hashlib.sha1(",".join(map(str, members)).encode()).hexdigest()
+
+
+def match_reviewed(rings):
+    """
+    Split ``rings`` into ({reviewed VoteRing: [rings sharing members with
+    it]}, other rings). A ring sharing members with several reviewed rings
+    goes to the one it shares most with.
+    """
+    reviewed = list(VoteRing.objects.exclude(status="pending").only("pk", "member_ids"))
+    owners = {member: row for row in reviewed for member in row.member_ids}
+    matched, unmatched = defaultdict(list), []
+    for ring in rings:
+        shared = Counter(owners[member] for member in ring.members if member in owners)
+        if shared:
+            matched[shared.most_common(1)[0][0]].append(ring)
+        else:
+            unmatched.append(ring)
+    return matched, unmatched
+
+
+def save_rings(rings, now):
+    """
+    Store the rings found at ``now``, then drop the pending rings not found
+    this time. A ring sharing members with a reviewed ring updates that
+    ring and keeps its review, so a confirmed ring that gained or lost
+    members is not stored (and subtracted from the tallies) twice. Other
+    rings are inserted or updated by fingerprint.
+    """
+    matched, rings = match_reviewed(rings)
+    for row, found in matched.items():
+        coin_votes = Counter()
+        for ring in found:
+            coin_votes.update(ring.coin_votes)
+        row.member_ids = sorted(member for ring in found for member in ring.members)
+        row.coin_votes = {str(coin): net for coin, net in coin_votes.items()}
+        row.votes = sum(ring.votes for ring in found)
+        row.pairs = sum(ring.pairs for ring in found)
+        row.detected_at = now
+    VoteRing.objects.bulk_update(list(matched), ["member_ids", "coin_votes", "votes", "pairs", "detected_at"],
+                                 batch_size=1000)
+    VoteRing.objects.bulk_create(
+        [
+            VoteRing(fingerprint=fingerprint(ring.members), member_ids=ring.members,
+                     coin_votes={str(coin): net for coin, net in ring.coin_votes.items()},
+                     votes=ring.votes, pairs=ring.pairs, detected_at=now)
+            for ring in rings
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["fingerprint"],
+        update_fields=["coin_votes", "votes", "pairs", "detected_at"],
+    )
+    VoteRing.objects.filter(status="pending", detected_at__lt=now).delete()
+
+
+def detect(days=DAYS, window=WINDOW, min_shared=MIN_SHARED, min_size=MIN_RING_SIZE,
+           chunk_size=CHUNK_SIZE, vectorized=None, log=None):
+    """
+    Look for rings in the votes of the last ``days`` and store them.
+    Returns the rings found.
+    """
+    now = timezone.now()
+    detector = build_detector(stream_votes(now - timedelta(days=days), chunk_size), window, vectorized)
+    rings = detector.rings(min_shared, min_size)
+    if log is not None:
+        log(f"{len(rings)} rings, {sum(len(ring.members) for ring in rings)} accounts")
+    save_rings(rings, now)
+    return rings
+
+
+def corrected_tallies(limit=None):
+    """
+    [(coin id, total_votes, ring votes, corrected total)] of the coins voted
+    on by rings not dismissed, the most ring votes first.
+    """
+    ring_votes = Counter()
+    for coin_votes in VoteRing.objects.exclude(status="dismissed").values_list("coin_votes", flat=True).iterator():
+        ring_votes.update({int(coin): net for coin, net in coin_votes.items()})
+    coins = sorted(ring_votes, key=lambda coin: (-abs(ring_votes[coin]), coin))[:limit]
+    totals = dict(Coin.objects.filter(pk__in=coins).values_list("pk", "total_votes"))
+    return [(coin, totals[coin], ring_votes[coin], totals[coin] - ring_votes[coin]) for coin in coins if coin in totals]
@@ -0,0 +1,49 @@
+"""
+Vote lookups spanning the live vote table and its archive.
+
+Retention moves votes older than its policy into VoteArchive (see
+meme.retention). An archived vote still counts: it is looked up alongside
+the live ones and moved back when its user votes on the coin again.
+"""
+from django.db import transaction
+
+from .models import Vote, VoteArchive
+
+# Longest coin id list user_votes() sends as an IN list
+IN_LIST_MAX = 100
+
+
+def restore_vote(user, coin):
+    """
+    Move the archived vote of ``user`` on ``coin`` back into the vote table,
+    keeping its id and timestamp, and return it (None when there is none).
+    Voting again on an archived vote then behaves like on a live one.
+    """
+    with transaction.atomic():
+        archived = VoteArchive.objects.select_for_update().filter(user=user, coin=coin).first()
+        if archived is None:
+            return None
+        vote = Vote(id=archived.id, user_id=archived.user_id, coin_id=archived.coin_id, vote_type=archived.vote_type)
+        vote.save(force_insert=True)
+        # created_at is auto_now_add; put the original back
+        Vote.objects.filter(pk=vote.pk).update(created_at=archived.created_at)
+        vote.created_at = archived.created_at
+        archived.delete()
+    return vote
+
+
+def user_votes(user_id, coin_ids):
+    """
+    {coin id: vote type} of the votes of ``user_id`` on ``coin_ids``,
+    archived ones included, in one query on the (user, coin) indexes.
+    Long id lists are matched as a range of the index instead of a large
+    IN list, which planners handle far worse.
+    """
+    coin_ids = set(coin_ids)
+    if len(coin_ids) <= IN_LIST_MAX:
+        lookup = {"coin_id__in": coin_ids}
+    else:
+        lookup = {"coin_id__gte": min(coin_ids), "coin_id__lte": max(coin_ids)}
+    live = Vote.objects.filter(user_id=user_id, **lookup).values_list("coin_id", "vote_type")
+    archived = VoteArchive.objects.filter(user_id=user_id, **lookup).values_list("coin_id", "vote_type")
+    return {coin_id: vote_type for coin_id, vote_type in live.union(archived, all=True) if coin_id in coin_ids}
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'memeplayers.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+if settings.PRELOAD_APP:
+    from meme.startup import preload
+    preload()
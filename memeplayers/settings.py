@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -39,14 +40,22 @@ INSTALLED_APPS = [
 
     # Third Party Apps
     'rest_framework',
-    'drf_spectacular',
     'corsheaders',
 ]
 
+# Schema generation and the Swagger/ReDoc pages. Production can set
+# API_DOCS=False to skip loading drf_spectacular at startup and serve the
+# prebuilt OPENAPI_SCHEMA_FILE instead.
+API_DOCS = os.getenv('API_DOCS', 'True') == 'True'
+if API_DOCS:
+    INSTALLED_APPS.append('drf_spectacular')
+
 AUTH_USER_MODEL = 'meme.User'
 
 MIDDLEWARE = [
+    'meme.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'meme.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,6 +63,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'meme.middleware.RateLimitHeadersMiddleware',
+    'meme.routers.ReplicaRoutingMiddleware',
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -83,23 +94,75 @@ WSGI_APPLICATION = 'memeplayers.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
-DATABASES = {
+# DB_PROFILE selects the backend: "sqlite" (default) or "postgres"
+DB_PROFILE = os.getenv('DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME'),
+            'USER': os.getenv('DB_USER'),
+            'PASSWORD': os.getenv('DB_PASSWORD'),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            # Keep connections open between requests and check them before reuse
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+            },
+        }
+    }
+    # DB_POOL=pgbouncer: HOST/PORT point at a PgBouncer in transaction
+    # pooling mode, which cannot keep server-side cursors across statements
+    if os.getenv('DB_POOL') == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# Read replicas: DB_REPLICAS is a comma-separated list of replica hosts
+# (postgres) or database files (sqlite). Safe requests to viewsets marked
+# read_from_replica are served from them (see meme.routers).
+REPLICA_DATABASES = []
+for index, replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST' if DB_PROFILE == 'postgres' else 'NAME': replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['meme.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
+# Users who just wrote are pinned to the primary through this cache, which
+# every worker must share. Use django.core.cache.backends.redis.RedisCache
+# with a redis:// LOCATION when running on more than one host.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
     }
 }
-
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': os.getenv('DB_NAME'),
-#         'USER': os.getenv('DB_USER'),
-#         'PASSWORD': os.getenv('DB_PASSWORD'),
-#         'HOST': os.getenv('DB_HOST', 'localhost'),
-#         'PORT': os.getenv('DB_PORT', '5432'),
-#     }
-# }
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', '10'))
+REPLICA_CHECK_INTERVAL = 5
+
+# Applied to every new SQLite connection (see meme.signals). busy_timeout
+# (milliseconds) is the only setting for how long a connection waits on a
+# locked database.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000')),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -132,6 +195,21 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 STATIC_URL = 'static/'
 
+# Uploaded media (avatars, coin logos, badge icons)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Image pipeline: thumbnail edge lengths in pixels, selectable through
+# ?image_size=, and the size of the worker pool that re-encodes uploads
+IMAGE_SIZES = {
+    'small': 64,
+    'medium': 256,
+    'large': 512,
+}
+IMAGE_MAX_DIMENSION = 1024
+IMAGE_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '2'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -143,10 +221,15 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated'
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'meme.api.renderers.FastJSONRenderer',
+        'meme.api.renderers.CompactJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.UserRateThrottle",
-        "rest_framework.throttling.AnonRateThrottle",
+        "meme.api.throttles.UserRateThrottle",
+        "meme.api.throttles.AnonRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "user": "1000/day", 
@@ -159,6 +242,74 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Binary formats for bots and internal services, negotiated with the
+# Accept and Content-Type headers when their packages are installed
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(2, 'meme.api.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('meme.api.parsers.MessagePackParser')
+if find_spec('cbor2'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(2, 'meme.api.renderers.CBORRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('meme.api.parsers.CBORParser')
+
+# Responses smaller than this many bytes are not compressed
+COMPRESSION_MIN_SIZE = 512
+
+# Per-route request metrics, exported at /metrics and summarised for admins
+# at /api/metrics/. Scrapers send METRICS_TOKEN as a bearer token; without
+# a token /metrics only answers INTERNAL_IPS (comma separated).
+# A request running the same SQL this many times is flagged as N+1.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+INTERNAL_IPS = list(filter(None, os.getenv('INTERNAL_IPS', '127.0.0.1').split(',')))
+METRICS_N_PLUS_ONE_THRESHOLD = int(os.getenv('METRICS_N_PLUS_ONE_THRESHOLD', '5'))
+
+# Changes to coins, votes, communities, posts and comments are appended to
+# an outbox table in the same transaction and served to downstream
+# consumers at /api/changes/ (see meme.outbox). Superseded events are
+# removed by `python manage.py compact_changes`.
+OUTBOX_ENABLED = os.getenv('OUTBOX_ENABLED', 'True') == 'True'
+
+# Notes delta sync (/api/notes/sync/, see meme.sync): tokens older than
+# this get a full resync, and tombstones of deleted notes are kept as long
+NOTES_SYNC_MAX_AGE_DAYS = int(os.getenv('NOTES_SYNC_MAX_AGE_DAYS', '90'))
+
+# Retention policies applied by `python manage.py retention` (see
+# meme.retention): rows older than 'days' matching 'filter' are deleted in
+# small batches, or moved to the archive table with 'archive'. 'logs'
+# covers the rotated debug.log files.
+RETENTION = {
+    'meme.notification': {'days': int(os.getenv('RETENTION_NOTIFICATION_DAYS', '30')), 'filter': {'read': True}},
+    'meme.vote': {'days': int(os.getenv('RETENTION_VOTE_DAYS', '365')), 'archive': True},
+    'meme.notetombstone': {'days': NOTES_SYNC_MAX_AGE_DAYS},
+    'logs': {'days': int(os.getenv('RETENTION_LOG_DAYS', '14')), 'path': BASE_DIR / 'debug.log'},
+}
+
+# Coin autocomplete (/api/coins/autocomplete/) answers from an in-process
+# prefix index of at most AUTOCOMPLETE_MAX_COINS coins (the most voted),
+# catching up with other processes' changes every
+# AUTOCOMPLETE_REFRESH_SECONDS (see meme.autocomplete)
+AUTOCOMPLETE_MAX_COINS = int(os.getenv('AUTOCOMPLETE_MAX_COINS', '50000'))
+AUTOCOMPLETE_REFRESH_SECONDS = float(os.getenv('AUTOCOMPLETE_REFRESH_SECONDS', '5'))
+
+# /api/batch/ runs at most BATCH_MAX_REQUESTS sub-requests per call;
+# consecutive reads run concurrently on BATCH_WORKERS threads shared by the
+# process (0 runs everything inline, see meme.api.batch)
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', '20'))
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', '4'))
+
+# Rate limit counters are shared by every worker through this backend.
+# Use meme.api.ratelimit.RedisBackend with a redis:// LOCATION when running
+# on more than one host.
+RATELIMIT = {
+    'BACKEND': os.getenv('RATELIMIT_BACKEND', 'meme.api.ratelimit.SQLiteBackend'),
+    'LOCATION': os.getenv('RATELIMIT_LOCATION', str(BASE_DIR / 'ratelimit.sqlite3')),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -168,6 +319,23 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# Prebuilt OpenAPI schema served as a static file at /api/schema/, built in
+# production with `python manage.py spectacular --file openapi.yaml`.
+# When the file is missing the schema is generated on request.
+OPENAPI_SCHEMA_FILE = os.getenv('OPENAPI_SCHEMA_FILE', '')
+
+# Load the URLconf and API modules in the WSGI/ASGI entry points instead of
+# on each worker's first request, so pre-forking servers (gunicorn
+# --preload) share them between workers. See meme/startup.py and
+# `python manage.py startup_profile`.
+PRELOAD_APP = os.getenv('PRELOAD_APP', 'True') == 'True'
+
+# Loggers hand records to the "queue" handler; a background thread writes
+# them to the rotating JSON log file and the console. High-volume vote
+# events are sampled at LOG_VOTE_SAMPLE_RATE. SQL is only logged with
+# LOG_SQL=True.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -180,30 +348,51 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'meme.log.JSONFormatter',
+        },
+    },
+    'filters': {
+        'sample_votes': {
+            '()': 'meme.log.SamplingFilter',
+            'rate': float(os.getenv('LOG_VOTE_SAMPLE_RATE', '0.1')),
+        },
     },
     'handlers': {
         'file': {
             'level': 'DEBUG',
-            'class': 'logging.FileHandler',
+            'class': 'logging.handlers.RotatingFileHandler',
             'filename': BASE_DIR / 'debug.log',
-            'formatter': 'verbose',
+            'maxBytes': int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+            'backupCount': int(os.getenv('LOG_BACKUP_COUNT', '5')),
+            'formatter': 'json',
         },
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
         },
+        'queue': {
+            '()': 'meme.log.QueueHandler',
+            'handlers': ['cfg://handlers.file', 'cfg://handlers.console'],
+        },
     },
     'loggers': {
         'django': {
-            'handlers': ['file', 'console'],
-            'level': 'DEBUG',
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
             'propagate': True,
         },
+        'django.db.backends': {
+            'level': 'DEBUG' if os.getenv('LOG_SQL') == 'True' else 'INFO',
+        },
         'app': {
-            'handlers': ['file', 'console'],
-            'level': 'DEBUG',
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
             'propagate': True,
         },
+        'app.votes': {
+            'filters': ['sample_votes'],
+        },
     },
 }
 
@@ -2,5 +2,74 @@
 
 from .settings import *
 
+# Run test modules in parallel processes (one per CPU); Django gives each
+# worker its own copy of the test databases
+TEST_RUNNER = 'meme.test_runner.ParallelDiscoverRunner'
+
+# In-memory test databases when running on SQLite; other engines keep
+# their default test database names
+SQLITE = DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3'
+if SQLITE:
+    DATABASES['default']['TEST'] = {'NAME': ':memory:'}
+
+# Hashing test users' passwords with PBKDF2 dominates fixture setup
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Discard log output instead of writing debug.log and the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'null': {
+            'class': 'logging.NullHandler',
+        },
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['null'],
+            'propagate': False,
+        },
+        'app': {
+            'handlers': ['null'],
+            'propagate': False,
+        },
+    },
+}
+
 # Disable throttling for tests
-REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = []
\ No newline at end of file
+REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = []
+
+# Keep rate limit counters in memory so test runs leave no files behind;
+# the test runner empties them before each test
+RATELIMIT = {
+    'BACKEND': 'meme.api.ratelimit.LocMemBackend',
+}
+
+# Keep cached replica pins in memory
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Process uploaded images inline
+IMAGE_WORKERS = 0
+
+# Run batch sub-requests inline: worker threads use their own connections,
+# which cannot see a test case's open transaction
+BATCH_WORKERS = 0
+
+# A second database standing in for a read replica. Routing to it is
+# enabled per test with override_settings(REPLICA_DATABASES=['replica']).
+if SQLITE:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / 'replica.sqlite3',
+        'TEST': {'NAME': ':memory:'},
+    }
+else:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'TEST': {'NAME': f"test_{DATABASES['default']['NAME']}_replica"},
+    }
+REPLICA_DATABASES = []
@@ -1,12 +1,28 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.views.decorators.cache import cache_page
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from meme.views import lazy_view, openapi_schema, prometheus_metrics, serve_media
+
+# The schema views import drf_spectacular's generator on first use only
+generate_schema = None
+if settings.API_DOCS:
+    generate_schema = cache_page(60*15)(lazy_view('drf_spectacular.views.SpectacularAPIView'))
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', prometheus_metrics, name='metrics'),
     path('api/', include('meme.urls')),
-    path('api/schema/', cache_page(60*15)(SpectacularAPIView.as_view()), name='schema'),
-    path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
-]
\ No newline at end of file
+    path('api/schema/', openapi_schema, {'generate': generate_schema}, name='schema'),
+]
+
+if settings.API_DOCS:
+    urlpatterns += [
+        path('api/schema/swagger-ui/', lazy_view('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'), name='swagger-ui'),
+        path('api/schema/redoc/', lazy_view('drf_spectacular.views.SpectacularRedocView', url_name='schema'), name='redoc'),
+    ]
+
+if settings.DEBUG:
+    urlpatterns += [
+        re_path(r'^media/(?P<path>.*)$', serve_media, name='media'),
+    ]
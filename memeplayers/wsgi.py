@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'memeplayers.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings
+
+if settings.PRELOAD_APP:
+    from meme.startup import preload
+    preload()